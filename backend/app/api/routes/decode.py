@@ -1,40 +1,97 @@
 import csv
 import json
-from datetime import datetime
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from io import StringIO
 from pathlib import Path
-from typing import Any
+from time import perf_counter
+from typing import Any, Iterable, Iterator
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db, require_roles
+from app.api.routes.decoders import decoder_pool
 from app.api.routes.files import scan_cache
 from app.db.models import DeviceCredential, LogFile, User, UserDecoder
 from app.core.config import get_settings
-from app.services.decode import DecodeCache, DecodeRow, _load_decoder_source, decode_jsonl_lines
+from app.core.metrics import StageTimings, registry, timings_block
+from app.services.cache_backend import build_cache_backend
+from app.services.decode import (
+    DecodeRow,
+    DecoderRoutes,
+    DecodeSummary,
+    _load_decoder_source,
+    iter_decode_rows,
+)
+from app.services.decode_cache import DecodeCache, DecodeResult
+from app.services.decode_parallel import iter_decode_path_parallel
+from app.services.decode_store import (
+    DecodeStore,
+    StoredDecode,
+    changed_devaddrs,
+    credential_fingerprints,
+    decode_base_key,
+    decode_key,
+    file_digest,
+)
+from app.services.decoder_runtime import DecoderMemo, decoder_hash
+from app.services.frame_index import FrameIndex, load_frame_index
+from app.services.log_io import log_compression, open_log_text
 
 router = APIRouter(prefix="/decode", tags=["decode"])
 
 _settings = get_settings()
 _decode_cache = DecodeCache(
     ttl_minutes=_settings.decode_cache_ttl_minutes,
-    max_items=_settings.decode_cache_max_items,
+    storage_dir=Path(_settings.data_dir) / "decode_results",
+    backend=build_cache_backend(
+        _settings.cache_backend,
+        Path(_settings.cache_sqlite_path),
+        "decode",
+        _settings.decode_cache_max_items,
+        _settings.decode_cache_max_disk_bytes,
+    ),
+)
+registry.register_cache("decode", _decode_cache)
+_decode_store = (
+    DecodeStore(Path(_settings.data_dir) / "decode_store", max_bytes=_settings.decode_store_max_bytes)
+    if _settings.decode_store_max_bytes > 0
+    else None
 )
+_decoder_memo = (
+    DecoderMemo(max_items=_settings.decoder_memo_max_items) if _settings.decoder_memo_max_items > 0 else None
+)
+_STREAM_CHUNK_ROWS = 200
 
 
 class DecodeRequest(BaseModel):
     scan_token: str | None = None
     file_id: str | None = None
     decoder_id: str | None = None
+    device_decoders: dict[str, str] | None = None
+    port_decoders: dict[int, str] | None = None
     devaddrs: list[str] | None = None
+    memoize: bool = True
+    verify_mic: bool = False
+
+
+class DecodeRowsResponse(BaseModel):
+    token: str
+    total_rows: int
+    next_cursor: int | None
+    rows: list[dict[str, Any]]
 
 
 class DecodeResponse(BaseModel):
     token: str
     expires_at: datetime
+    summary: dict[str, Any]
     rows: list[dict[str, Any]]
+    timings: dict[str, Any] | None = None
 
 
 def _normalize_hex(value: str) -> str:
@@ -69,6 +126,30 @@ def _load_decoder(db: Session, decoder_id: str, user: User) -> str | None:
     return _load_decoder_source(decoder_id, decoder)
 
 
+def _load_routes(payload: DecodeRequest, db: Session, user: User) -> DecoderRoutes | None:
+    if not payload.device_decoders and not payload.port_decoders:
+        return None
+
+    sources: dict[str, str | None] = {}
+
+    def _source(decoder_id: str) -> str | None:
+        if decoder_id not in sources:
+            sources[decoder_id] = _load_decoder(db, decoder_id, user)
+        return sources[decoder_id]
+
+    by_devaddr = {
+        _normalize_hex(devaddr): _source(decoder_id)
+        for devaddr, decoder_id in (payload.device_decoders or {}).items()
+        if devaddr.strip()
+    }
+    by_fport = {}
+    for fport, decoder_id in (payload.port_decoders or {}).items():
+        if not 0 <= fport <= 255:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid fPort {fport}")
+        by_fport[fport] = _source(decoder_id)
+    return DecoderRoutes(by_devaddr=by_devaddr, by_fport=by_fport)
+
+
 def _load_credentials(db: Session, user: User) -> dict[str, DeviceCredential]:
     query = db.query(DeviceCredential)
     if user.role != "admin":
@@ -77,32 +158,38 @@ def _load_credentials(db: Session, user: User) -> dict[str, DeviceCredential]:
     return {cred.devaddr.upper(): cred for cred in creds}
 
 
-def _serialize_rows(rows: list[DecodeRow]) -> list[dict[str, Any]]:
-    return [
-        {
-            "status": row.status,
-            "devaddr": row.devaddr,
-            "fcnt": row.fcnt,
-            "fport": row.fport,
-            "time": row.time,
-            "payload_hex": row.payload_hex,
-            "decoded_json": row.decoded_json,
-            "error": row.error,
-        }
-        for row in rows
-    ]
-
-
-@router.post(
-    "",
-    response_model=DecodeResponse,
-    dependencies=[Depends(require_roles(["editor", "admin"]))],
-)
-def decode_logs(
+def _serialize_row(row: DecodeRow) -> dict[str, Any]:
+    return {
+        "status": row.status,
+        "devaddr": row.devaddr,
+        "fcnt": row.fcnt,
+        "fport": row.fport,
+        "time": row.time,
+        "payload_hex": row.payload_hex,
+        "decoded_json": row.decoded_json,
+        "error": row.error,
+        "mic_ok": row.mic_ok,
+    }
+
+
+def _json_chunks(rows: Iterable[DecodeRow], timings: StageTimings, separator: str) -> Iterator[str]:
+    chunk: list[str] = []
+    for row in rows:
+        started = perf_counter()
+        chunk.append(json.dumps(_serialize_row(row)))
+        timings.add("serialize", perf_counter() - started)
+        if len(chunk) >= _STREAM_CHUNK_ROWS:
+            yield separator.join(chunk)
+            chunk = []
+    if chunk:
+        yield separator.join(chunk)
+
+
+def _prepare_decode(
     payload: DecodeRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> DecodeResponse:
+    db: Session,
+    user: User,
+) -> tuple[Path, str | None, DecoderRoutes | None, dict[str, DeviceCredential], set[str] | None]:
     if not payload.scan_token and not payload.file_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -119,70 +206,409 @@ def decode_logs(
     if not logfile_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing logfile reference")
 
-    logfile = _get_logfile(db, logfile_id, current_user)
+    logfile = _get_logfile(db, logfile_id, user)
     path = Path(logfile.storage_path)
     if not path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File missing")
 
-    decoder_source = _load_decoder(db, payload.decoder_id or "raw", current_user)
-    credentials = _load_credentials(db, current_user)
+    decoder_source = _load_decoder(db, payload.decoder_id or "raw", user)
+    decoder_routes = _load_routes(payload, db, user)
+    credentials = _load_credentials(db, user)
 
     allowed_devaddrs = None
     if payload.devaddrs:
         allowed_devaddrs = {_normalize_hex(item) for item in payload.devaddrs if item.strip()}
 
-    with path.open("r", encoding="utf-8") as handle:
-        rows = decode_jsonl_lines(handle, credentials, decoder_source, allowed_devaddrs)
+    return path, decoder_source, decoder_routes, credentials, allowed_devaddrs
+
+
+@dataclass(frozen=True)
+class _ResultKey:
+    base: str
+    full: str
+    credentials: dict[str, str]
+
+
+def _source_hash(source: str | None) -> str | None:
+    return decoder_hash(source) if source else None
+
+
+def _result_key(
+    path: Path,
+    decoder_source: str | None,
+    decoder_routes: DecoderRoutes | None,
+    credentials: dict[str, DeviceCredential],
+    allowed_devaddrs: set[str] | None,
+    verify_mic: bool,
+) -> _ResultKey:
+    options = {
+        "devaddrs": sorted(allowed_devaddrs) if allowed_devaddrs is not None else None,
+        "verify_mic": verify_mic,
+        "decoder_time_limit_ms": _settings.decoder_time_limit_ms,
+        "decoder_memory_limit_bytes": _settings.decoder_memory_limit_bytes,
+        "decoder_max_limit_trips": _settings.decoder_max_limit_trips,
+    }
+    if decoder_routes is not None:
+        options["device_decoders"] = {
+            devaddr: _source_hash(source) for devaddr, source in decoder_routes.by_devaddr.items()
+        }
+        options["port_decoders"] = {
+            str(fport): _source_hash(source) for fport, source in decoder_routes.by_fport.items()
+        }
+    base = decode_base_key(file_digest(path), _source_hash(decoder_source), options)
+    fingerprints = credential_fingerprints(credentials, allowed_devaddrs)
+    return _ResultKey(base=base, full=decode_key(base, fingerprints), credentials=fingerprints)
 
-    result = _decode_cache.create(rows)
-    return DecodeResponse(token=result.token, expires_at=result.expires_at, rows=_serialize_rows(rows))
+
+def _stored_result(key: _ResultKey) -> DecodeResult | None:
+    if _decode_store is None:
+        return None
+    stored = _decode_store.get(key.full)
+    if stored is None:
+        return None
+    try:
+        return _decode_cache.attach(
+            stored.rows_path, stored.row_count, stored.size_bytes, stored.index_path, stored.summary
+        )
+    except OSError:
+        return None
+
+
+def _previous_result(key: _ResultKey) -> StoredDecode | None:
+    if _decode_store is None:
+        return None
+    return _decode_store.latest(key.base)
+
+
+def _store_result(key: _ResultKey, result: DecodeResult) -> None:
+    if _decode_store is not None:
+        _decode_store.put(key.full, result, base_key=key.base, credentials=key.credentials)
+
+
+@contextmanager
+def _log_lines(path: Path, index: FrameIndex | None, allowed_devaddrs: set[str] | None) -> Iterator[Iterable[str]]:
+    if index is not None and allowed_devaddrs:
+        # Only the selected devices' frames are read, plus lines without a readable frame header,
+        # which become error rows whatever the filter.
+        yield index.read_lines(path, index.select(devaddrs=allowed_devaddrs, include_unaddressed=True))
+        return
+    with open_log_text(path) as handle:
+        yield handle
+
+
+def _iter_decoded_rows(
+    path: Path,
+    decoder_source: str | None,
+    decoder_routes: DecoderRoutes | None,
+    credentials: dict[str, DeviceCredential],
+    allowed_devaddrs: set[str] | None,
+    memoize: bool,
+    verify_mic: bool,
+    summary: DecodeSummary,
+    timings: StageTimings,
+    key: _ResultKey,
+) -> Iterator[DecodeRow]:
+    previous = _previous_result(key)
+    previous_rows = None
+    if previous is not None:
+        try:
+            previous_rows = previous.open_rows()
+        except OSError:
+            previous = None
+
+    index = load_frame_index(path) if allowed_devaddrs else None
+    if previous is not None:
+        # Same log, decoder and options as an earlier decode: only devices whose keys changed
+        # are decrypted and decoded again, every other row is copied from that result.
+        with _log_lines(path, index, allowed_devaddrs) as lines:
+            yield from iter_decode_rows(
+                lines,
+                credentials,
+                decoder_source,
+                allowed_devaddrs,
+                decoder_pool=decoder_pool,
+                batch_size=_settings.decode_batch_size,
+                decoder_memo=_decoder_memo if memoize else None,
+                summary=summary,
+                verify_mic=verify_mic,
+                max_limit_trips=_settings.decoder_max_limit_trips,
+                previous_rows=previous_rows,
+                changed_devaddrs=changed_devaddrs(previous.credentials, key.credentials),
+                decoder_routes=decoder_routes,
+                timings=timings,
+            )
+        return
+
+    if (
+        index is None
+        and _settings.decode_workers > 1
+        and path.stat().st_size >= _settings.decode_parallel_threshold_bytes
+        and log_compression(path) is None
+    ):
+        yield from iter_decode_path_parallel(
+            path,
+            credentials,
+            decoder_source,
+            allowed_devaddrs,
+            workers=_settings.decode_workers,
+            batch_size=_settings.decode_batch_size,
+            memo_max_items=_settings.decoder_memo_max_items if memoize else 0,
+            summary=summary,
+            verify_mic=verify_mic,
+            time_limit_ms=_settings.decoder_time_limit_ms or None,
+            memory_limit_bytes=_settings.decoder_memory_limit_bytes or None,
+            max_limit_trips=_settings.decoder_max_limit_trips,
+            decoder_routes=decoder_routes,
+            timings=timings,
+        )
+        return
+
+    with _log_lines(path, index, allowed_devaddrs) as lines:
+        yield from iter_decode_rows(
+            lines,
+            credentials,
+            decoder_source,
+            allowed_devaddrs,
+            decoder_pool=decoder_pool,
+            batch_size=_settings.decode_batch_size,
+            decoder_memo=_decoder_memo if memoize else None,
+            summary=summary,
+            verify_mic=verify_mic,
+            max_limit_trips=_settings.decoder_max_limit_trips,
+            decoder_routes=decoder_routes,
+            timings=timings,
+        )
+
+
+@router.post(
+    "",
+    # The body is streamed, so DecodeResponse only documents its shape; FastAPI does not validate it.
+    responses={200: {"model": DecodeResponse}},
+    dependencies=[Depends(require_roles(["editor", "admin"]))],
+)
+def decode_logs(
+    payload: DecodeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    path, decoder_source, decoder_routes, credentials, allowed_devaddrs = _prepare_decode(payload, db, current_user)
+    key = _result_key(path, decoder_source, decoder_routes, credentials, allowed_devaddrs, payload.verify_mic)
+    started = perf_counter()
+    timings = StageTimings()
+
+    result = _stored_result(key)
+    if result is None:
+        summary = DecodeSummary()
+        writer = _decode_cache.writer()
+        try:
+            for row in _iter_decoded_rows(
+                path,
+                decoder_source,
+                decoder_routes,
+                credentials,
+                allowed_devaddrs,
+                payload.memoize,
+                payload.verify_mic,
+                summary,
+                timings,
+                key,
+            ):
+                appended = perf_counter()
+                writer.append(row)
+                timings.add("store", perf_counter() - appended)
+        except BaseException:
+            writer.abort()
+            raise
+        result = writer.commit(summary.as_dict())
+        _store_result(key, result)
+
+    # Same body as DecodeResponse, but rows are read back from the spilled result
+    # instead of being held as one dict per row until the response is rendered.
+    def _response_body() -> Iterator[str]:
+        head = json.dumps(
+            {"token": result.token, "expires_at": result.expires_at.isoformat(), "summary": result.summary}
+        )
+        yield head[:-1] + ', "rows": ['
+        for index, chunk in enumerate(_json_chunks(result.iter_rows(), timings, ", ")):
+            yield (", " if index else "") + chunk
+        registry.observe_timings("decode", timings)
+        yield '], "timings": ' + json.dumps(timings_block(timings, perf_counter() - started)) + "}"
+
+    return StreamingResponse(_response_body(), media_type="application/json")
+
+
+@router.post(
+    "/stream",
+    dependencies=[Depends(require_roles(["editor", "admin"]))],
+)
+def decode_logs_stream(
+    payload: DecodeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    path, decoder_source, decoder_routes, credentials, allowed_devaddrs = _prepare_decode(payload, db, current_user)
+
+    key = _result_key(path, decoder_source, decoder_routes, credentials, allowed_devaddrs, payload.verify_mic)
+    started = perf_counter()
+    timings = StageTimings()
+
+    def _chunks(rows: Iterable[DecodeRow]) -> Iterator[str]:
+        for chunk in _json_chunks(rows, timings, "\n"):
+            yield chunk + "\n"
+
+    def _ndjson() -> Iterator[str]:
+        result = _stored_result(key)
+        if result is not None:
+            yield from _chunks(result.iter_rows())
+        else:
+            summary = DecodeSummary()
+            writer = _decode_cache.writer()
+
+            def _written(rows: Iterable[DecodeRow]) -> Iterator[DecodeRow]:
+                for row in rows:
+                    appended = perf_counter()
+                    writer.append(row)
+                    timings.add("store", perf_counter() - appended)
+                    yield row
+
+            try:
+                yield from _chunks(
+                    _written(
+                        _iter_decoded_rows(
+                            path,
+                            decoder_source,
+                            decoder_routes,
+                            credentials,
+                            allowed_devaddrs,
+                            payload.memoize,
+                            payload.verify_mic,
+                            summary,
+                            timings,
+                            key,
+                        )
+                    )
+                )
+            except BaseException:
+                writer.abort()
+                raise
+            result = writer.commit(summary.as_dict())
+            _store_result(key, result)
+
+        registry.observe_timings("decode", timings)
+        trailer = {
+            "type": "summary",
+            "token": result.token,
+            "expires_at": result.expires_at.isoformat(),
+            "summary": result.summary,
+            "timings": timings_block(timings, perf_counter() - started),
+        }
+        yield json.dumps(trailer) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+def _get_result(token: str) -> DecodeResult:
+    result = _decode_cache.get(token)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Decode token expired")
+    return result
+
+
+def _epoch(value: datetime | None) -> float | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@router.get("/{token}/rows", response_model=DecodeRowsResponse)
+def get_rows(
+    token: str,
+    offset: int = Query(default=0, ge=0),
+    cursor: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    devaddr: str | None = None,
+    fport: int | None = Query(default=None, ge=0, le=255),
+    row_status: str | None = Query(default=None, alias="status"),
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+    _user: User = Depends(get_current_user),
+) -> DecodeRowsResponse:
+    result = _get_result(token)
+    rows, next_cursor = result.page(
+        start=cursor or 0,
+        offset=offset,
+        limit=limit,
+        devaddr=_normalize_hex(devaddr) if devaddr else None,
+        fport=fport,
+        status=row_status,
+        time_from=_epoch(time_from),
+        time_to=_epoch(time_to),
+    )
+    return DecodeRowsResponse(
+        token=result.token,
+        total_rows=result.row_count,
+        next_cursor=next_cursor,
+        rows=[_serialize_row(row) for row in rows],
+    )
 
 
 @router.get("/{token}/export/json")
 def export_json(
     token: str,
     _user: User = Depends(get_current_user),
-) -> Response:
-    result = _decode_cache.get(token)
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Decode token expired")
+) -> StreamingResponse:
+    result = _get_result(token)
 
-    payload = _serialize_rows(result.rows)
-    return Response(content=json.dumps(payload), media_type="application/json")
+    def _json_array() -> Iterator[str]:
+        yield "["
+        for index, chunk in enumerate(_json_chunks(result.iter_rows(), StageTimings(), ", ")):
+            yield (", " if index else "") + chunk
+        yield "]"
+
+    return StreamingResponse(_json_array(), media_type="application/json")
 
 
 @router.get("/{token}/export/csv")
 def export_csv(
     token: str,
     _user: User = Depends(get_current_user),
-) -> Response:
-    result = _decode_cache.get(token)
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Decode token expired")
+) -> StreamingResponse:
+    result = _get_result(token)
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "status",
-        "devaddr",
-        "fcnt",
-        "fport",
-        "time",
-        "payload_hex",
-        "decoded_json",
-        "error",
-    ])
-
-    for row in result.rows:
+    def _csv_chunks() -> Iterator[str]:
+        output = StringIO()
+        writer = csv.writer(output)
         writer.writerow([
-            row.status,
-            row.devaddr,
-            row.fcnt,
-            row.fport,
-            row.time,
-            row.payload_hex,
-            json.dumps(row.decoded_json) if row.decoded_json is not None else None,
-            row.error,
+            "status",
+            "devaddr",
+            "fcnt",
+            "fport",
+            "time",
+            "payload_hex",
+            "decoded_json",
+            "error",
+            "mic_ok",
         ])
 
-    return Response(content=output.getvalue(), media_type="text/csv")
+        for index, row in enumerate(result.iter_rows(), start=1):
+            writer.writerow([
+                row.status,
+                row.devaddr,
+                row.fcnt,
+                row.fport,
+                row.time,
+                row.payload_hex,
+                json.dumps(row.decoded_json) if row.decoded_json is not None else None,
+                row.error,
+                row.mic_ok,
+            ])
+            if index % _STREAM_CHUNK_ROWS == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+
+        yield output.getvalue()
+
+    return StreamingResponse(_csv_chunks(), media_type="text/csv")
@@ -5,11 +5,20 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db, require_roles
+from app.core.config import get_settings
 from app.db.models import User, UserDecoder
+from app.services.decoder_runtime import DecoderError, DecoderPool
 from app.storage.decoders import delete_decoder, save_decoder_upload
 
 router = APIRouter(prefix="/decoders", tags=["decoders"])
 
+_settings = get_settings()
+decoder_pool = DecoderPool(
+    max_size=_settings.decoder_pool_max_size,
+    time_limit_ms=_settings.decoder_time_limit_ms or None,
+    memory_limit_bytes=_settings.decoder_memory_limit_bytes or None,
+)
+
 
 class DecoderResponse(BaseModel):
     id: str
@@ -50,6 +59,18 @@ def _builtin_decoders() -> list[DecoderResponse]:
     return results
 
 
+def precompile_builtin_decoders() -> None:
+    directory = _builtin_dir()
+    if not directory.exists():
+        return
+    for entry in sorted(directory.glob("*.js")):
+        try:
+            decoder_pool.compile(entry.read_text(encoding="utf-8"))
+        except (DecoderError, UnicodeDecodeError):
+            # A broken built-in still surfaces as a per-row decoder error when it is used.
+            continue
+
+
 def _get_builtin_path(decoder_id: str) -> Path:
     name = decoder_id.replace("builtin:", "", 1)
     path = _builtin_dir() / name
@@ -106,6 +127,14 @@ def upload_decoder(
     current_user: User = Depends(get_current_user),
 ) -> UploadResponse:
     original_name, storage_path, size_bytes = save_decoder_upload(upload)
+    try:
+        decoder_pool.compile(Path(storage_path).read_text(encoding="utf-8"))
+    except (DecoderError, UnicodeDecodeError) as exc:
+        delete_decoder(storage_path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid decoder: {exc}",
+        ) from exc
 
     decoder = UserDecoder(
         owner_user_id=current_user.id,
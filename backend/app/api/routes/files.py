@@ -1,18 +1,25 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from time import perf_counter
+from typing import Any, Iterator
+from urllib.parse import quote
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db, require_roles
 from app.db.models import LogFile, User
 from app.core.config import get_settings
+from app.core.metrics import StageTimings, registry, timings_block
+from app.services.cache_backend import build_cache_backend
+from app.services.frame_index import FrameIndex, load_frame_index, save_frame_index
 from app.services.generate_log import GenerateLogParams, generate_jsonl
-from app.services.scan import scan_jsonl_path
+from app.services.log_io import log_compression, open_log, open_log_text, strip_compression_suffix
+from app.services.scan import compact_scan_summary, load_scan_summary, save_scan_summary, scan_jsonl_path
 from app.services.scan_context import ScanContextCache
+from app.services.scan_parallel import scan_jsonl_path_parallel
 from app.storage.files import delete_file, save_generated, save_upload
 
 router = APIRouter(prefix="/files", tags=["files"])
@@ -20,8 +27,11 @@ router = APIRouter(prefix="/files", tags=["files"])
 _settings = get_settings()
 scan_cache = ScanContextCache(
     ttl_minutes=_settings.scan_cache_ttl_minutes,
-    max_items=_settings.scan_cache_max_items,
+    backend=build_cache_backend(
+        _settings.cache_backend, Path(_settings.cache_sqlite_path), "scan", _settings.scan_cache_max_items
+    ),
 )
+registry.register_cache("scan", scan_cache)
 
 
 class LogFileResponse(BaseModel):
@@ -37,6 +47,7 @@ class ScanResponse(BaseModel):
     token: str
     expires_at: datetime
     summary: dict[str, Any]
+    timings: dict[str, Any] | None = None
 
 
 class GenerateRequest(BaseModel):
@@ -52,6 +63,57 @@ class GenerateRequest(BaseModel):
     filename: str | None = None
 
 
+def epoch_seconds(value: datetime | None) -> float | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _rescan(db: Session, logfile: LogFile, path: Path, timings: StageTimings) -> tuple[dict[str, Any], FrameIndex]:
+    # Uploads and generated files are scanned and indexed while they are written; files stored
+    # before that, or whose index is gone, are scanned once and the results kept alongside them.
+    index = FrameIndex()
+    if (
+        _settings.scan_workers > 1
+        and path.stat().st_size >= _settings.scan_parallel_threshold_bytes
+        and log_compression(path) is None
+    ):
+        summary = scan_jsonl_path_parallel(
+            path, _settings.scan_workers, timings, index, _settings.scan_stats_exact_max_keys
+        )
+    else:
+        summary = scan_jsonl_path(path, timings, index, _settings.scan_stats_exact_max_keys)
+    save_frame_index(path, index)
+    save_scan_summary(path, summary)
+    logfile.metadata_json = {**(logfile.metadata_json or {}), "scan": compact_scan_summary(summary)}
+    db.commit()
+    return summary, index
+
+
+def frame_index_for(db: Session, logfile: LogFile, path: Path) -> FrameIndex:
+    index = load_frame_index(path)
+    if index is None:
+        _, index = _rescan(db, logfile, path, StageTimings())
+    return index
+
+
+def _metadata_view(metadata: dict[str, Any] | None) -> dict[str, Any] | None:
+    # File listings carry only scan counts; rows written before the full summary moved next
+    # to the log still hold all of it.
+    scan = (metadata or {}).get("scan")
+    if isinstance(scan, dict):
+        return {**metadata, "scan": compact_scan_summary(scan)}
+    return metadata
+
+
+def _iter_log_chunks(path: Path) -> Iterator[bytes]:
+    with open_log(path) as handle:
+        while chunk := handle.read(1024 * 1024):
+            yield chunk
+
+
 def _get_logfile(db: Session, logfile_id: str, user: User) -> LogFile:
     query = db.query(LogFile).filter(LogFile.id == logfile_id)
     if user.role != "admin":
@@ -72,7 +134,7 @@ def upload_file(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> LogFileResponse:
-    original_name, storage_path, size_bytes = save_upload(upload)
+    original_name, storage_path, size_bytes, scan_summary = save_upload(upload)
 
     logfile = LogFile(
         owner_user_id=current_user.id,
@@ -80,7 +142,7 @@ def upload_file(
         storage_path=storage_path,
         size_bytes=size_bytes,
         source_type="uploaded",
-        metadata_json=None,
+        metadata_json={"scan": compact_scan_summary(scan_summary)},
     )
     db.add(logfile)
     db.commit()
@@ -119,7 +181,7 @@ def generate_file(
             payload_hex=payload.payload_hex,
         )
         lines = generate_jsonl(params)
-        original_name, storage_path, size_bytes = save_generated(lines, payload.filename)
+        original_name, storage_path, size_bytes, scan_summary = save_generated(lines, payload.filename)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
@@ -140,7 +202,8 @@ def generate_file(
                 "datarate": payload.datarate,
                 "coding_rate": payload.coding_rate,
                 "payload_hex": payload.payload_hex,
-            }
+            },
+            "scan": compact_scan_summary(scan_summary),
         },
     )
     db.add(logfile)
@@ -172,7 +235,7 @@ def list_files(
             size_bytes=logfile.size_bytes,
             uploaded_at=logfile.uploaded_at,
             source_type=logfile.source_type,
-            metadata_json=logfile.metadata_json,
+            metadata_json=_metadata_view(logfile.metadata_json),
         )
         for logfile in files
     ]
@@ -191,13 +254,17 @@ def get_file(
         size_bytes=logfile.size_bytes,
         uploaded_at=logfile.uploaded_at,
         source_type=logfile.source_type,
-        metadata_json=logfile.metadata_json,
+        metadata_json=_metadata_view(logfile.metadata_json),
     )
 
 
 @router.get("/{logfile_id}/preview")
 def preview_file(
     logfile_id: str,
+    devaddr: str | None = None,
+    gateway_eui: str | None = None,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> dict[str, Any]:
@@ -209,17 +276,40 @@ def preview_file(
     max_bytes = 200 * 1024
     content = []
     total = 0
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
+    if devaddr or gateway_eui or time_from or time_to:
+        index = frame_index_for(db, logfile, path)
+        numbers = index.select(
+            devaddrs=[devaddr.strip().upper()] if devaddr else None,
+            gateways=[gateway_eui.strip()] if gateway_eui else None,
+            time_from=epoch_seconds(time_from),
+            time_to=epoch_seconds(time_to),
+        )
+        for line in index.read_lines(path, numbers):
+            line = line.rstrip("\r\n") + "\n"
             total += len(line.encode("utf-8"))
             if total > max_bytes:
                 break
             content.append(line)
+    else:
+        with open_log_text(path) as handle:
+            for line in handle:
+                total += len(line.encode("utf-8"))
+                if total > max_bytes:
+                    break
+                content.append(line)
 
     truncated = total > max_bytes
     return {"content": "".join(content), "truncated": truncated}
 
 
+def _content_disposition(filename: str) -> str:
+    # Plain ASCII names go out as is; anything else gets an ASCII stand-in plus the RFC 6266 UTF-8 form.
+    fallback = "".join(char if " " <= char <= "~" and char not in '"\\' else "_" for char in filename)
+    if fallback == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
 @router.get("/{logfile_id}/download")
 def download_file(
     logfile_id: str,
@@ -231,7 +321,10 @@ def download_file(
     if not path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File missing")
 
-    return FileResponse(path, filename=logfile.original_filename)
+    headers = {"Content-Disposition": _content_disposition(strip_compression_suffix(logfile.original_filename))}
+    if log_compression(path) is None:
+        return FileResponse(path, headers=headers)
+    return StreamingResponse(_iter_log_chunks(path), media_type="application/octet-stream", headers=headers)
 
 
 @router.delete(
@@ -265,6 +358,20 @@ def scan_file(
     if not path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File missing")
 
-    summary = scan_jsonl_path(path)
+    started = perf_counter()
+    timings = StageTimings()
+    summary = load_scan_summary(path)
+    # Files scanned before full summaries were kept next to the log, or before they listed
+    # truncated keys, are scanned once more.
+    if summary is not None and "devaddrs_truncated" in summary:
+        timings.add("metadata", perf_counter() - started)
+    else:
+        summary, _ = _rescan(db, logfile, path, timings)
+    registry.observe_timings("scan", timings)
     context = scan_cache.create(logfile_id, summary)
-    return ScanResponse(token=context.token, expires_at=context.expires_at, summary=summary)
+    return ScanResponse(
+        token=context.token,
+        expires_at=context.expires_at,
+        summary=summary,
+        timings=timings_block(timings, perf_counter() - started),
+    )
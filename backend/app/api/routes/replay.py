@@ -1,4 +1,6 @@
+from datetime import datetime
 from pathlib import Path
+from time import perf_counter
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -6,8 +8,10 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db, require_roles
-from app.api.routes.files import scan_cache
+from app.api.routes.files import epoch_seconds, frame_index_for, scan_cache
+from app.core.metrics import StageTimings, registry, timings_block
 from app.db.models import LogFile, ReplayJob, User
+from app.services.log_io import open_log_text
 from app.services.replay import ReplayRow, replay_jsonl_lines
 
 router = APIRouter(prefix="/replay", tags=["replay"])
@@ -18,12 +22,17 @@ class ReplayRequest(BaseModel):
     file_id: str | None = None
     udp_host: str
     udp_port: int = Field(ge=1, le=65535)
+    devaddrs: list[str] | None = None
+    gateway_euis: list[str] | None = None
+    time_from: datetime | None = None
+    time_to: datetime | None = None
 
 
 class ReplayResponse(BaseModel):
     id: str
     status: str
     rows: list[dict[str, Any]]
+    timings: dict[str, Any] | None = None
 
 
 def _get_logfile(db: Session, logfile_id: str, user: User) -> LogFile:
@@ -80,8 +89,23 @@ def replay_logs(
     if not path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File missing")
 
-    with path.open("r", encoding="utf-8") as handle:
-        rows = replay_jsonl_lines(handle, payload.udp_host, payload.udp_port)
+    started = perf_counter()
+    timings = StageTimings()
+    if payload.devaddrs or payload.gateway_euis or payload.time_from or payload.time_to:
+        index = frame_index_for(db, logfile, path)
+        numbers = index.select(
+            devaddrs=[item.strip().upper() for item in payload.devaddrs] if payload.devaddrs else None,
+            gateways=[item.strip() for item in payload.gateway_euis] if payload.gateway_euis else None,
+            time_from=epoch_seconds(payload.time_from),
+            time_to=epoch_seconds(payload.time_to),
+        )
+        timings.add("index", perf_counter() - started, len(numbers))
+        lines = index.read_lines(path, numbers)
+        rows = replay_jsonl_lines(lines, payload.udp_host, payload.udp_port, timings=timings)
+    else:
+        with open_log_text(path) as handle:
+            rows = replay_jsonl_lines(handle, payload.udp_host, payload.udp_port, timings=timings)
+    registry.observe_timings("replay", timings)
 
     job = ReplayJob(
         log_file_id=logfile.id,
@@ -94,7 +118,12 @@ def replay_logs(
     db.commit()
     db.refresh(job)
 
-    return ReplayResponse(id=job.id, status=job.status, rows=_serialize_rows(rows))
+    return ReplayResponse(
+        id=job.id,
+        status=job.status,
+        rows=_serialize_rows(rows),
+        timings=timings_block(timings, perf_counter() - started),
+    )
 
 
 @router.get("/{job_id}", response_model=ReplayResponse)
@@ -9,10 +9,26 @@ class Settings(BaseSettings):
     data_dir: str = "/data"
     database_url: str | None = None
     upload_max_bytes: int = 25 * 1024 * 1024
+    log_storage_compression: str = "none"
+    cache_backend: str = "memory"
+    cache_sqlite_path: str | None = None
     scan_cache_ttl_minutes: int = 30
     scan_cache_max_items: int = 200
+    scan_stats_exact_max_keys: int = 4096
+    scan_workers: int = 4
+    scan_parallel_threshold_bytes: int = 16 * 1024 * 1024
     decode_cache_ttl_minutes: int = 30
     decode_cache_max_items: int = 100
+    decode_cache_max_disk_bytes: int = 2 * 1024 * 1024 * 1024
+    decode_store_max_bytes: int = 4 * 1024 * 1024 * 1024
+    decoder_pool_max_size: int = 16
+    decode_batch_size: int = 64
+    decoder_memo_max_items: int = 10000
+    decode_workers: int = 4
+    decode_parallel_threshold_bytes: int = 8 * 1024 * 1024
+    decoder_time_limit_ms: int = 1000
+    decoder_memory_limit_bytes: int = 32 * 1024 * 1024
+    decoder_max_limit_trips: int = 3
     jwt_secret: str = "dev-secret-change-me"
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
@@ -26,6 +42,8 @@ class Settings(BaseSettings):
         if not self.database_url:
             base_dir = self.data_dir.rstrip("/")
             self.database_url = f"sqlite:///{base_dir}/app.db"
+        if not self.cache_sqlite_path:
+            self.cache_sqlite_path = f"{self.data_dir.rstrip('/')}/cache.db"
 
 
 @lru_cache(maxsize=1)
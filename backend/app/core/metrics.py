@@ -0,0 +1,155 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Protocol
+
+_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@dataclass
+class StageTimings:
+    seconds: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+
+    def add(self, stage: str, elapsed: float, count: int = 1) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+        self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def merge(self, other: "StageTimings") -> None:
+        for stage, elapsed in other.seconds.items():
+            self.add(stage, elapsed, other.counts.get(stage, 0))
+
+    def as_dict(self) -> dict[str, dict[str, float | int]]:
+        return {
+            stage: {"ms": round(elapsed * 1000, 3), "count": self.counts.get(stage, 0)}
+            for stage, elapsed in self.seconds.items()
+        }
+
+
+class _StatsSource(Protocol):
+    def stats(self) -> dict[str, int]: ...
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: tuple[tuple[str, str], ...], extra: tuple[str, str] | None = None) -> str:
+    items = labels + ((extra,) if extra else ())
+    if not items:
+        return ""
+    pairs = []
+    for key, value in items:
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = {}
+        self._histograms: dict[str, dict[tuple[tuple[str, str], ...], _Histogram]] = {}
+        self._caches: dict[str, _StatsSource] = {}
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._meta:
+            self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, help_text: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, help_text: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(_SECONDS_BUCKETS)
+            histogram.observe(value)
+
+    def observe_timings(self, operation: str, timings: StageTimings) -> None:
+        self.inc("lp0_operations_total", "Completed scan, decode and replay runs.", operation=operation)
+        for stage, elapsed in timings.seconds.items():
+            self.observe(
+                "lp0_stage_duration_seconds",
+                "Time spent per stage in one scan, decode or replay run.",
+                elapsed,
+                operation=operation,
+                stage=stage,
+            )
+            self.inc(
+                "lp0_stage_items_total",
+                "Lines, frames or rows handled per stage.",
+                timings.counts.get(stage, 0),
+                operation=operation,
+                stage=stage,
+            )
+
+    def register_cache(self, name: str, cache: _StatsSource) -> None:
+        with self._lock:
+            self._caches[name] = cache
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._meta):
+                kind, help_text = self._meta[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels, ('le', repr(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            caches = sorted(self._caches.items())
+
+        stats = [(name, cache.stats()) for name, cache in caches]
+        for metric, kind, help_text in (
+            ("hits", "counter", "Cache lookups that found a live entry."),
+            ("misses", "counter", "Cache lookups that found nothing or an expired entry."),
+            ("items", "gauge", "Entries currently held by the cache."),
+            ("disk_bytes", "gauge", "Bytes the cache holds on disk."),
+        ):
+            samples = [(name, values[metric]) for name, values in stats if metric in values]
+            if not samples:
+                continue
+            name = f"lp0_cache_{metric}_total" if kind == "counter" else f"lp0_cache_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache_name, value in samples:
+                lines.append(f"{name}{_labels((('cache', cache_name),))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def timings_block(timings: StageTimings, total_seconds: float) -> dict[str, Any]:
+    return {"total_ms": round(total_seconds * 1000, 3), "stages": timings.as_dict()}
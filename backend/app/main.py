@@ -1,13 +1,18 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
+from time import perf_counter
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.metrics import registry
 from app.db.bootstrap import bootstrap_admin
 from app.db.base import Base
 from app.db.session import SessionLocal
-from app.api.routes import admin, auth, decode, decoders, devices, files, replay, scan
+from app.api.routes import admin, auth, decode, decoders, devices, files, metrics, replay, scan
+from app.services.worker_pool import shutdown_worker_pool
 
 
 def _build_cors_origins(settings):
@@ -27,10 +32,9 @@ def _build_cors_origins(settings):
 
 def create_app() -> FastAPI:
     settings = get_settings()
-    app = FastAPI(title="Smart Parks LP0 Platform")
 
-    @app.on_event("startup")
-    def _on_startup() -> None:
+    @asynccontextmanager
+    async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
         db = SessionLocal()
         try:
             Path(settings.data_dir).mkdir(parents=True, exist_ok=True)
@@ -38,6 +42,13 @@ def create_app() -> FastAPI:
             bootstrap_admin(db)
         finally:
             db.close()
+        decoders.precompile_builtin_decoders()
+        try:
+            yield
+        finally:
+            shutdown_worker_pool()
+
+    app = FastAPI(title="Smart Parks LP0 Platform", lifespan=_lifespan)
 
     cors_origins = _build_cors_origins(settings)
     if cors_origins:
@@ -49,6 +60,25 @@ def create_app() -> FastAPI:
             allow_headers=["*"],
         )
 
+    @app.middleware("http")
+    async def _record_latency(request: Request, call_next):
+        started = perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            registry.observe(
+                "lp0_http_request_duration_seconds",
+                "Time until the response starts, per route.",
+                perf_counter() - started,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            )
+
     @app.get(f"{settings.api_prefix}/health")
     def health():
         return {"status": "ok"}
@@ -61,6 +91,7 @@ def create_app() -> FastAPI:
     app.include_router(files.router, prefix=settings.api_prefix)
     app.include_router(replay.router, prefix=settings.api_prefix)
     app.include_router(scan.router, prefix=settings.api_prefix)
+    app.include_router(metrics.router)
 
     return app
 
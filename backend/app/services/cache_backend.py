@@ -0,0 +1,220 @@
+import pickle
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock, local
+from typing import Any, Protocol
+
+MEMORY = "memory"
+SQLITE = "sqlite"
+
+
+class CacheBackend(Protocol):
+    # Token-keyed storage behind the scan and decode caches. put returns the values it dropped,
+    # expired or evicted (oldest first, never the one just stored), so callers can clean up after them.
+    def put(
+        self, token: str, value: Any, created_at: datetime, expires_at: datetime, size_bytes: int = 0
+    ) -> list[Any]: ...
+
+    def get(self, token: str) -> Any | None: ...
+
+    def remove(self, token: str) -> Any | None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_items: int = 100, max_bytes: int | None = None) -> None:
+        self._max_items = max(1, max_items)
+        self._max_bytes = max_bytes
+        self._items: dict[str, tuple[datetime, datetime, int, Any]] = {}
+        self._bytes = 0
+        self._lock = Lock()
+
+    def _pop(self, token: str) -> Any | None:
+        entry = self._items.pop(token, None)
+        if entry is None:
+            return None
+        self._bytes -= entry[2]
+        return entry[3]
+
+    def _over_limits(self) -> bool:
+        return len(self._items) > self._max_items or (self._max_bytes is not None and self._bytes > self._max_bytes)
+
+    def put(self, token: str, value: Any, created_at: datetime, expires_at: datetime, size_bytes: int = 0) -> list[Any]:
+        with self._lock:
+            expired = [key for key, entry in self._items.items() if entry[1] <= created_at]
+            dropped = [self._pop(key) for key in expired]
+            self._items[token] = (created_at, expires_at, size_bytes, value)
+            self._bytes += size_bytes
+            if self._over_limits():
+                oldest = sorted(self._items.items(), key=lambda item: item[1][0])
+                for key, _ in oldest:
+                    if key == token or not self._over_limits():
+                        continue
+                    dropped.append(self._pop(key))
+            return dropped
+
+    def get(self, token: str) -> Any | None:
+        with self._lock:
+            entry = self._items.get(token)
+            return entry[3] if entry else None
+
+    def remove(self, token: str) -> Any | None:
+        with self._lock:
+            return self._pop(token)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"items": len(self._items), "bytes": self._bytes}
+
+
+def _epoch(value: datetime) -> float:
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class SQLiteCacheBackend:
+    # One SQLite file shared by every worker process on a host; each cache uses its own namespace.
+    # Values are immutable once stored, so each process keeps the ones it has unpickled and only
+    # checks that the row still exists on later lookups.
+    def __init__(self, path: str | Path, namespace: str, max_items: int = 100, max_bytes: int | None = None) -> None:
+        self._path = Path(path)
+        self._namespace = namespace
+        self._max_items = max(1, max_items)
+        self._max_bytes = max_bytes
+        self._local = local()
+        self._memo: dict[str, Any] = {}
+        self._memo_lock = Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, token TEXT NOT NULL, created_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL, size_bytes INTEGER NOT NULL, value BLOB NOT NULL, "
+                "PRIMARY KEY (namespace, token))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_created ON cache_entries (namespace, created_at)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _remember(self, token: str, value: Any) -> None:
+        with self._memo_lock:
+            self._memo[token] = value
+            while len(self._memo) > self._max_items:
+                del self._memo[next(iter(self._memo))]
+
+    def _forget(self, token: str) -> None:
+        with self._memo_lock:
+            self._memo.pop(token, None)
+
+    def _delete(self, connection: sqlite3.Connection, rows: list[tuple[str, bytes]]) -> list[Any]:
+        connection.executemany(
+            "DELETE FROM cache_entries WHERE namespace = ? AND token = ?",
+            [(self._namespace, token) for token, _ in rows],
+        )
+        for token, _ in rows:
+            self._forget(token)
+        return [pickle.loads(blob) for _, blob in rows]
+
+    def put(self, token: str, value: Any, created_at: datetime, expires_at: datetime, size_bytes: int = 0) -> list[Any]:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            expired = connection.execute(
+                "SELECT token, value FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                (self._namespace, _epoch(created_at)),
+            ).fetchall()
+            dropped = self._delete(connection, expired)
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+                (self._namespace, token, _epoch(created_at), _epoch(expires_at), size_bytes, blob),
+            )
+            count, total = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries WHERE namespace = ?",
+                (self._namespace,),
+            ).fetchone()
+            evicted = []
+            if count > self._max_items or (self._max_bytes is not None and total > self._max_bytes):
+                oldest = connection.execute(
+                    "SELECT token, size_bytes, value FROM cache_entries "
+                    "WHERE namespace = ? AND token != ? ORDER BY created_at",
+                    (self._namespace, token),
+                )
+                for old_token, old_size, old_blob in oldest:
+                    if count <= self._max_items and (self._max_bytes is None or total <= self._max_bytes):
+                        break
+                    evicted.append((old_token, old_blob))
+                    count -= 1
+                    total -= old_size
+            dropped += self._delete(connection, evicted)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._remember(token, value)
+        return dropped
+
+    def get(self, token: str) -> Any | None:
+        connection = self._connection()
+        if connection.execute(
+            "SELECT 1 FROM cache_entries WHERE namespace = ? AND token = ?", (self._namespace, token)
+        ).fetchone() is None:
+            self._forget(token)
+            return None
+        with self._memo_lock:
+            value = self._memo.get(token)
+        if value is not None:
+            return value
+        row = connection.execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND token = ?", (self._namespace, token)
+        ).fetchone()
+        if row is None:
+            return None
+        value = pickle.loads(row[0])
+        self._remember(token, value)
+        return value
+
+    def remove(self, token: str) -> Any | None:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT token, value FROM cache_entries WHERE namespace = ? AND token = ?",
+                (self._namespace, token),
+            ).fetchall()
+            dropped = self._delete(connection, rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return dropped[0] if dropped else None
+
+    def stats(self) -> dict[str, int]:
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries WHERE namespace = ?",
+            (self._namespace,),
+        ).fetchone()
+        return {"items": count, "bytes": total}
+
+
+def build_cache_backend(
+    kind: str,
+    sqlite_path: Path,
+    namespace: str,
+    max_items: int,
+    max_bytes: int | None = None,
+) -> CacheBackend:
+    if kind == MEMORY:
+        return MemoryCacheBackend(max_items, max_bytes)
+    if kind == SQLITE:
+        return SQLiteCacheBackend(sqlite_path, namespace, max_items, max_bytes)
+    raise ValueError(f"Unknown cache backend {kind!r}; expected {MEMORY!r} or {SQLITE!r}")
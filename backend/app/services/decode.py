@@ -1,19 +1,20 @@
 import base64
 import json
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import math
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from secrets import token_urlsafe
-from threading import Lock
-from typing import Any, Iterable
-
-import quickjs
-from Crypto.Cipher import AES
+from time import perf_counter
+from typing import Any, Iterable, Iterator
 
+from app.core.metrics import StageTimings
 from app.db.models import DeviceCredential, UserDecoder
+from app.services.decoder_runtime import DecoderCall, DecoderContext, DecoderMemo, DecoderPool
+from app.services.lorawan_crypto import UplinkCounters, decrypt_frm_payload, decrypt_frm_payloads, verify_mics
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DecodeRow:
     status: str
     devaddr: str | None
@@ -23,59 +24,89 @@ class DecodeRow:
     payload_hex: str | None
     decoded_json: Any | None
     error: str | None
-
-
-@dataclass(frozen=True)
-class DecodeResult:
-    token: str
-    rows: list[DecodeRow]
-    created_at: datetime
-    expires_at: datetime
-
-
-class DecodeCache:
-    def __init__(self, ttl_minutes: int = 30, max_items: int = 100) -> None:
-        self._ttl = timedelta(minutes=ttl_minutes)
-        self._max_items = max(1, max_items)
-        self._items: dict[str, DecodeResult] = {}
-        self._lock = Lock()
-
-    def _prune_expired(self, now: datetime) -> None:
-        expired = [token for token, result in self._items.items() if result.expires_at <= now]
-        for token in expired:
-            self._items.pop(token, None)
-
-    def _enforce_max(self) -> None:
-        if len(self._items) <= self._max_items:
-            return
-        overflow = len(self._items) - self._max_items
-        oldest = sorted(self._items.items(), key=lambda item: item[1].created_at)[:overflow]
-        for token, _ in oldest:
-            self._items.pop(token, None)
-
-    def create(self, rows: list[DecodeRow]) -> DecodeResult:
-        now = datetime.utcnow()
-        result = DecodeResult(
-            token=token_urlsafe(32),
-            rows=rows,
-            created_at=now,
-            expires_at=now + self._ttl,
-        )
-        with self._lock:
-            self._prune_expired(now)
-            self._items[result.token] = result
-            self._enforce_max()
-        return result
-
-    def get(self, token: str) -> DecodeResult | None:
-        with self._lock:
-            result = self._items.get(token)
-            if not result:
-                return None
-            if result.expires_at <= datetime.utcnow():
-                self._items.pop(token, None)
-                return None
-            return result
+    mic_ok: bool | None = None
+
+
+_LATENCY_FLOOR_MS = 0.001
+_LATENCY_GROWTH = math.log(1.1)
+
+
+@dataclass
+class LatencyHistogram:
+    counts: dict[int, int] = field(default_factory=dict)
+    count: int = 0
+    max_ms: float = 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        # Log-spaced buckets 10% wide: bounded memory, and shards merge by adding counts.
+        bucket = max(0, math.ceil(math.log(max(elapsed_ms, _LATENCY_FLOOR_MS) / _LATENCY_FLOOR_MS) / _LATENCY_GROWTH))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(_LATENCY_FLOOR_MS * math.exp(bucket * _LATENCY_GROWTH), self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> dict[str, float | None]:
+        return {
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max_ms if self.count else None,
+        }
+
+
+@dataclass
+class DecodeSummary:
+    total_rows: int = 0
+    ok_rows: int = 0
+    error_rows: int = 0
+    limit_rows: int = 0
+    decoder_calls: int = 0
+    decoder_cutoffs: int = 0
+    memo_hits: int = 0
+    memo_misses: int = 0
+    mic_ok: int = 0
+    mic_failed: int = 0
+    decoder_latency_ms: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def add(self, row: DecodeRow) -> None:
+        self.total_rows += 1
+        if row.status == "ok":
+            self.ok_rows += 1
+        elif row.status == "limit_exceeded":
+            self.limit_rows += 1
+        else:
+            self.error_rows += 1
+        if row.mic_ok is True:
+            self.mic_ok += 1
+        elif row.mic_ok is False:
+            self.mic_failed += 1
+
+    def merge(self, other: "DecodeSummary") -> None:
+        for item in fields(self):
+            if item.name == "decoder_latency_ms":
+                self.decoder_latency_ms.merge(other.decoder_latency_ms)
+            else:
+                setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["decoder_latency_ms"] = self.decoder_latency_ms.as_dict()
+        return data
 
 
 def _normalize_b64(data: str) -> str:
@@ -100,31 +131,7 @@ def _decrypt_frm_payload(
     fcnt: int,
     payload: bytes,
 ) -> bytes:
-    if not payload:
-        return b""
-    skey = bytes.fromhex(skey_hex)
-    cipher = AES.new(skey, AES.MODE_ECB)
-    num_blocks = (len(payload) + 15) // 16
-    output = bytearray(len(payload))
-
-    for block_index in range(1, num_blocks + 1):
-        a = bytearray(16)
-        a[0] = 0x01
-        a[5] = 0x00
-        a[6:10] = devaddr_le
-        a[10] = fcnt & 0xFF
-        a[11] = (fcnt >> 8) & 0xFF
-        a[12] = (fcnt >> 16) & 0xFF
-        a[13] = (fcnt >> 24) & 0xFF
-        a[15] = block_index & 0xFF
-
-        s = cipher.encrypt(bytes(a))
-        start = (block_index - 1) * 16
-        end = min(block_index * 16, len(payload))
-        for idx in range(start, end):
-            output[idx] = payload[idx] ^ s[idx - start]
-
-    return bytes(output)
+    return decrypt_frm_payload(skey_hex, devaddr_le, fcnt, payload)
 
 
 def _parse_phy_payload(raw: bytes) -> tuple[str, int, int | None, bytes]:
@@ -149,6 +156,21 @@ def _parse_phy_payload(raw: bytes) -> tuple[str, int, int | None, bytes]:
     return _devaddr_hex(devaddr_le), fcnt, fport, frm_payload
 
 
+def _row_time(rxpk: dict[str, Any]) -> str | None:
+    # Rows carry rxpk.time as text: numeric stamps are kept as their digits, anything else is dropped.
+    value = rxpk.get("time")
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+@lru_cache(maxsize=64)
+def _read_decoder_text(path: str, mtime_ns: int, size: int) -> str:
+    return Path(path).read_text(encoding="utf-8")
+
+
 def _load_decoder_source(decoder_id: str, user_decoder: UserDecoder | None = None) -> str:
     if decoder_id.startswith("builtin:"):
         repo_root = Path(__file__).resolve().parents[3]
@@ -158,154 +180,425 @@ def _load_decoder_source(decoder_id: str, user_decoder: UserDecoder | None = Non
             raise FileNotFoundError("Decoder not found")
         decoder_path = Path(user_decoder.storage_path)
 
-    return decoder_path.read_text(encoding="utf-8")
-
-
-def _run_js_decoder(source: str, payload: bytes, fport: int | None) -> Any:
-    ctx = quickjs.Context()
-    ctx.eval(source)
-    bytes_list = list(payload)
-    input_json = json.dumps({"bytes": bytes_list, "fPort": fport or 0})
-    wrapper = (
-        "(function() {"
-        f"const input = {input_json};"
-        "if (typeof decodeUplink === 'function') {"
-        "  return JSON.stringify(decodeUplink({bytes: input.bytes, fPort: input.fPort}));"
-        "}"
-        "if (typeof Decoder === 'function') {"
-        "  return JSON.stringify(Decoder(input.bytes, input.fPort));"
-        "}"
-        "return JSON.stringify(null);"
-        "})()"
-    )
-    result = ctx.eval(wrapper)
-    return json.loads(result) if result else None
+    stat = decoder_path.stat()
+    return _read_decoder_text(str(decoder_path), stat.st_mtime_ns, stat.st_size)
 
 
-def decode_jsonl_lines(
-    lines: Iterable[str],
-    credentials: dict[str, DeviceCredential],
-    decoder_source: str | None,
-    allowed_devaddrs: set[str] | None = None,
-) -> list[DecodeRow]:
-    rows: list[DecodeRow] = []
+@dataclass(frozen=True)
+class _PendingFrame:
+    devaddr: str
+    fcnt: int
+    fport: int | None
+    time: str | None
+    skey_hex: str | None
+    frm_payload: bytes
+    nwkskey_hex: str | None = None
+    phy_payload: bytes | None = None
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            record = json.loads(line)
-        except json.JSONDecodeError:
-            rows.append(
-                DecodeRow(
-                    status="error",
-                    devaddr=None,
-                    fcnt=None,
-                    fport=None,
-                    time=None,
-                    payload_hex=None,
-                    decoded_json=None,
-                    error="Invalid JSON",
-                )
-            )
-            continue
 
-        rxpk = record.get("rxpk")
-        if not isinstance(rxpk, dict):
-            rows.append(
-                DecodeRow(
-                    status="error",
-                    devaddr=None,
-                    fcnt=None,
-                    fport=None,
-                    time=None,
-                    payload_hex=None,
-                    decoded_json=None,
-                    error="Missing rxpk",
-                )
-            )
-            continue
+@dataclass(frozen=True)
+class DecoderRoutes:
+    by_devaddr: dict[str, str | None] = field(default_factory=dict)
+    by_fport: dict[int, str | None] = field(default_factory=dict)
+
+    def source_for(self, devaddr: str, fport: int | None, default: str | None) -> str | None:
+        if devaddr in self.by_devaddr:
+            return self.by_devaddr[devaddr]
+        if fport in self.by_fport:
+            return self.by_fport[fport]
+        return default
+
+
+class _DecoderSlot:
+    def __init__(self, context: DecoderContext | None, setup_error: str | None) -> None:
+        self.context = context
+        self.setup_error = setup_error
+        self.limit_trips = 0
+
+
+class _DecodeRun:
+    def __init__(
+        self,
+        decoder_source: str | None,
+        decoder_routes: DecoderRoutes | None,
+        decoder_pool: DecoderPool,
+        stack: ExitStack,
+        decoder_memo: DecoderMemo | None,
+        summary: DecodeSummary,
+        timings: StageTimings,
+        max_limit_trips: int = 0,
+    ) -> None:
+        self.decoder_source = decoder_source
+        self.decoder_routes = decoder_routes
+        self.decoder_pool = decoder_pool
+        self.decoder_memo = decoder_memo
+        self.summary = summary
+        self.timings = timings
+        self.max_limit_trips = max_limit_trips
+        self._stack = stack
+        self._slots: dict[str, _DecoderSlot] = {}
+        self._uplink_counters = UplinkCounters()
+
+    def _slot(self, frame: _PendingFrame) -> _DecoderSlot | None:
+        source = self.decoder_source
+        if self.decoder_routes is not None:
+            source = self.decoder_routes.source_for(frame.devaddr, frame.fport, source)
+        if not source:
+            return None
+        slot = self._slots.get(source)
+        if slot is None:
+            # Each decoder is checked out of the pool the first time a frame routes to it and
+            # stays warm for the rest of the pass.
+            try:
+                slot = _DecoderSlot(self._stack.enter_context(self.decoder_pool.acquire(source)), None)
+            except Exception as exc:
+                slot = _DecoderSlot(None, f"Decoder error: {exc}")
+            self._slots[source] = slot
+        return slot
 
-        data = rxpk.get("data")
-        if not isinstance(data, str):
-            rows.append(
-                DecodeRow(
-                    status="error",
-                    devaddr=None,
-                    fcnt=None,
-                    fport=None,
-                    time=rxpk.get("time"),
-                    payload_hex=None,
-                    decoded_json=None,
-                    error="Missing data",
-                )
-            )
-            continue
+    def _call_decoder(self, slot: _DecoderSlot, payload: bytes, fport: int | None) -> DecoderCall:
+        context = slot.context
+        if not context:
+            return DecoderCall(None, slot.setup_error)
 
+        self.summary.decoder_calls += 1
         try:
-            raw = _decode_b64(data)
-            devaddr, fcnt, fport, frm_payload = _parse_phy_payload(raw)
+            call = context.call(payload, fport)
         except Exception as exc:
+            return DecoderCall(None, f"Decoder error: {exc}")
+        self.summary.decoder_latency_ms.record(call.elapsed_ms)
+        if not call.limit_exceeded:
+            return DecoderCall(call.value, f"Decoder error: {call.error}" if call.error is not None else None)
+
+        slot.limit_trips += 1
+        if self.max_limit_trips and slot.limit_trips >= self.max_limit_trips:
+            slot.context = None
+            slot.setup_error = f"Decoder error: disabled after {slot.limit_trips} limit violations"
+            self.summary.decoder_cutoffs += 1
+        return DecoderCall(None, f"Decoder limit exceeded: {call.error}", True)
+
+    def _run_decoder(self, frames: list[_PendingFrame], payloads: list[bytes]) -> list[DecoderCall]:
+        memo = self.decoder_memo
+        results: list[DecoderCall | None] = [None] * len(frames)
+        calls: dict[Any, tuple[_DecoderSlot, list[int]]] = {}
+        # With a memo, identical (decoder, fPort, payload) triples share one decoder call within and across batches.
+        for index, (frame, payload) in enumerate(zip(frames, payloads)):
+            slot = self._slot(frame)
+            if slot is None or slot.context is None:
+                results[index] = DecoderCall(None, slot.setup_error if slot else None)
+                continue
+            if memo is None:
+                calls[index] = (slot, [index])
+                continue
+            key = (slot.context.source_hash, frame.fport or 0, payload)
+            if key in calls:
+                self.summary.memo_hits += 1
+                calls[key][1].append(index)
+                continue
+            cached = memo.get(key)
+            if cached is None:
+                self.summary.memo_misses += 1
+                calls[key] = (slot, [index])
+            else:
+                self.summary.memo_hits += 1
+                results[index] = DecoderCall(*cached)
+
+        for key, (slot, indices) in calls.items():
+            first = indices[0]
+            result = self._call_decoder(slot, payloads[first], frames[first].fport)
+            for index in indices:
+                results[index] = result
+            # Limit violations and cut-off errors depend on the run, not the payload; never memoize them.
+            if memo is not None and slot.context is not None and not result.limit_exceeded:
+                memo.put(key, (result.value, result.error))
+
+        return results
+
+    def flush(self, buffer: list[DecodeRow | _PendingFrame]) -> list[DecodeRow]:
+        frames = [item for item in buffer if isinstance(item, _PendingFrame)]
+        started = perf_counter()
+        payloads = decrypt_frm_payloads(
+            [
+                (frame.skey_hex or "", bytes.fromhex(frame.devaddr)[::-1], frame.fcnt, frame.frm_payload)
+                for frame in frames
+            ]
+        )
+        decrypted_at = perf_counter()
+        self.timings.add("aes", decrypted_at - started, len(frames))
+        results = self._run_decoder(frames, payloads)
+        decoded_at = perf_counter()
+        self.timings.add("decoder", decoded_at - decrypted_at, len(frames))
+        mic_checks = [
+            (frame.nwkskey_hex, bytes.fromhex(frame.devaddr)[::-1], frame.fcnt, frame.phy_payload)
+            for frame in frames
+            if frame.phy_payload is not None
+        ]
+        mic_results = iter(verify_mics(mic_checks, self._uplink_counters))
+        started = perf_counter()
+        if mic_checks:
+            self.timings.add("mic", started - decoded_at, len(mic_checks))
+
+        pending = iter(zip(payloads, results))
+        rows: list[DecodeRow] = []
+        for item in buffer:
+            if isinstance(item, DecodeRow):
+                rows.append(item)
+                continue
+            decrypted, result = next(pending)
+            if result.limit_exceeded:
+                row_status = "limit_exceeded"
+            else:
+                row_status = "ok" if result.error is None else "error"
             rows.append(
                 DecodeRow(
-                    status="error",
-                    devaddr=None,
-                    fcnt=None,
-                    fport=None,
-                    time=rxpk.get("time"),
-                    payload_hex=None,
-                    decoded_json=None,
-                    error=str(exc),
+                    status=row_status,
+                    devaddr=item.devaddr,
+                    fcnt=item.fcnt,
+                    fport=item.fport,
+                    time=item.time,
+                    payload_hex=decrypted.hex().upper() if decrypted else "",
+                    decoded_json=result.value,
+                    error=result.error,
+                    mic_ok=next(mic_results) if item.phy_payload is not None else None,
                 )
             )
-            continue
+        self.timings.add("rows", perf_counter() - started, len(frames))
+        return rows
 
-        if allowed_devaddrs and devaddr not in allowed_devaddrs:
-            continue
 
-        credential = credentials.get(devaddr)
-        if not credential:
-            rows.append(
-                DecodeRow(
-                    status="error",
-                    devaddr=devaddr,
-                    fcnt=fcnt,
-                    fport=fport,
-                    time=rxpk.get("time"),
-                    payload_hex=None,
-                    decoded_json=None,
-                    error="Missing device credentials",
-                )
-            )
-            continue
+def _decode_line(
+    line: str,
+    credentials: dict[str, DeviceCredential],
+    allowed_devaddrs: set[str] | None,
+    verify_mic: bool = False,
+    timings: StageTimings | None = None,
+) -> DecodeRow | _PendingFrame | None:
+    line = line.strip()
+    if not line:
+        return None
+    timings = timings if timings is not None else StageTimings()
+    started = perf_counter()
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return DecodeRow(
+            status="error",
+            devaddr=None,
+            fcnt=None,
+            fport=None,
+            time=None,
+            payload_hex=None,
+            decoded_json=None,
+            error="Invalid JSON",
+        )
+    finally:
+        timings.add("json", perf_counter() - started)
+
+    rxpk = record.get("rxpk")
+    if not isinstance(rxpk, dict):
+        return DecodeRow(
+            status="error",
+            devaddr=None,
+            fcnt=None,
+            fport=None,
+            time=None,
+            payload_hex=None,
+            decoded_json=None,
+            error="Missing rxpk",
+        )
 
-        decrypted = frm_payload
-        if fport is not None and frm_payload:
-            key = credential.appskey if fport > 0 else credential.nwkskey
-            decrypted = _decrypt_frm_payload(key, bytes.fromhex(devaddr)[::-1], fcnt, frm_payload)
+    data = rxpk.get("data")
+    if not isinstance(data, str):
+        return DecodeRow(
+            status="error",
+            devaddr=None,
+            fcnt=None,
+            fport=None,
+            time=_row_time(rxpk),
+            payload_hex=None,
+            decoded_json=None,
+            error="Missing data",
+        )
 
-        payload_hex = decrypted.hex().upper() if decrypted else ""
-        decoded_json = None
-        error = None
+    started = perf_counter()
+    try:
+        raw = _decode_b64(data)
+        devaddr, fcnt, fport, frm_payload = _parse_phy_payload(raw)
+    except Exception as exc:
+        return DecodeRow(
+            status="error",
+            devaddr=None,
+            fcnt=None,
+            fport=None,
+            time=_row_time(rxpk),
+            payload_hex=None,
+            decoded_json=None,
+            error=str(exc),
+        )
+    finally:
+        timings.add("base64", perf_counter() - started)
+
+    if allowed_devaddrs and devaddr not in allowed_devaddrs:
+        return None
+
+    credential = credentials.get(devaddr)
+    if not credential:
+        return DecodeRow(
+            status="error",
+            devaddr=devaddr,
+            fcnt=fcnt,
+            fport=fport,
+            time=_row_time(rxpk),
+            payload_hex=None,
+            decoded_json=None,
+            error="Missing device credentials",
+        )
 
-        if decoder_source:
-            try:
-                decoded_json = _run_js_decoder(decoder_source, decrypted, fport)
-            except Exception as exc:
-                error = f"Decoder error: {exc}"
-
-        rows.append(
-            DecodeRow(
-                status="ok" if not error else "error",
-                devaddr=devaddr,
-                fcnt=fcnt,
-                fport=fport,
-                time=rxpk.get("time"),
-                payload_hex=payload_hex,
-                decoded_json=decoded_json,
-                error=error,
-            )
+    skey_hex = None
+    if fport is not None and frm_payload:
+        skey_hex = credential.appskey if fport > 0 else credential.nwkskey
+
+    return _PendingFrame(
+        devaddr=devaddr,
+        fcnt=fcnt,
+        fport=fport,
+        time=_row_time(rxpk),
+        skey_hex=skey_hex,
+        frm_payload=frm_payload,
+        nwkskey_hex=credential.nwkskey if verify_mic else None,
+        phy_payload=raw if verify_mic else None,
+    )
+
+
+def iter_decode_rows(
+    lines: Iterable[str],
+    credentials: dict[str, DeviceCredential],
+    decoder_source: str | None,
+    allowed_devaddrs: set[str] | None = None,
+    decoder_pool: DecoderPool | None = None,
+    batch_size: int = 1,
+    decoder_memo: DecoderMemo | None = None,
+    summary: DecodeSummary | None = None,
+    verify_mic: bool = False,
+    max_limit_trips: int = 0,
+    previous_rows: Iterable[DecodeRow] | None = None,
+    changed_devaddrs: set[str] | None = None,
+    decoder_routes: DecoderRoutes | None = None,
+    timings: StageTimings | None = None,
+) -> Iterator[DecodeRow]:
+    summary = summary if summary is not None else DecodeSummary()
+    timings = timings if timings is not None else StageTimings()
+    items = _iter_line_items(lines, credentials, allowed_devaddrs, verify_mic, timings)
+    if previous_rows is not None:
+        items = _reuse_unchanged_rows(items, previous_rows, changed_devaddrs or set())
+    with ExitStack() as stack:
+        run = _DecodeRun(
+            decoder_source,
+            decoder_routes,
+            decoder_pool or DecoderPool(max_size=1),
+            stack,
+            decoder_memo,
+            summary,
+            timings,
+            max_limit_trips,
         )
+        for row in _iter_batched_rows(items, max(1, batch_size), run):
+            summary.add(row)
+            yield row
+
+
+def _iter_line_items(
+    lines: Iterable[str],
+    credentials: dict[str, DeviceCredential],
+    allowed_devaddrs: set[str] | None,
+    verify_mic: bool,
+    timings: StageTimings,
+) -> Iterator[DecodeRow | _PendingFrame]:
+    for line in lines:
+        item = _decode_line(line, credentials, allowed_devaddrs, verify_mic, timings)
+        if item is not None:
+            yield item
+
+
+def _reuse_unchanged_rows(
+    items: Iterable[DecodeRow | _PendingFrame],
+    previous_rows: Iterable[DecodeRow],
+    changed_devaddrs: set[str],
+) -> Iterator[DecodeRow | _PendingFrame]:
+    # Which lines yield a row does not depend on credentials, so the previous result lines up
+    # with the log one row per item; only frames of changed devices are decrypted and decoded again.
+    previous = iter(previous_rows)
+    for item in items:
+        old = next(previous, None)
+        if (
+            old is not None
+            and old.devaddr == item.devaddr
+            and old.fcnt == item.fcnt
+            and item.devaddr not in changed_devaddrs
+        ):
+            yield old
+        else:
+            yield item
+
+
+def _iter_batched_rows(
+    items: Iterable[DecodeRow | _PendingFrame],
+    batch_size: int,
+    run: _DecodeRun,
+) -> Iterator[DecodeRow]:
+    # Rows wait here, in file order, until the pending frames among them are decrypted together,
+    # one ECB call per session key per batch, and then passed to their decoders one frame per call.
+    buffer: list[DecodeRow | _PendingFrame] = []
+    pending = 0
+
+    for item in items:
+        if isinstance(item, _PendingFrame):
+            buffer.append(item)
+            pending += 1
+            if pending >= batch_size:
+                yield from run.flush(buffer)
+                buffer.clear()
+                pending = 0
+        elif pending:
+            buffer.append(item)
+        else:
+            yield item
+
+    if buffer:
+        yield from run.flush(buffer)
 
-    return rows
+
+def decode_jsonl_lines(
+    lines: Iterable[str],
+    credentials: dict[str, DeviceCredential],
+    decoder_source: str | None,
+    allowed_devaddrs: set[str] | None = None,
+    decoder_pool: DecoderPool | None = None,
+    batch_size: int = 1,
+    decoder_memo: DecoderMemo | None = None,
+    summary: DecodeSummary | None = None,
+    verify_mic: bool = False,
+    max_limit_trips: int = 0,
+    previous_rows: Iterable[DecodeRow] | None = None,
+    changed_devaddrs: set[str] | None = None,
+    decoder_routes: DecoderRoutes | None = None,
+    timings: StageTimings | None = None,
+) -> list[DecodeRow]:
+    return list(
+        iter_decode_rows(
+            lines,
+            credentials,
+            decoder_source,
+            allowed_devaddrs,
+            decoder_pool=decoder_pool,
+            batch_size=batch_size,
+            decoder_memo=decoder_memo,
+            summary=summary,
+            verify_mic=verify_mic,
+            max_limit_trips=max_limit_trips,
+            previous_rows=previous_rows,
+            changed_devaddrs=changed_devaddrs,
+            decoder_routes=decoder_routes,
+            timings=timings,
+        )
+    )
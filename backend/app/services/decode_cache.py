@@ -0,0 +1,374 @@
+import json
+import math
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from secrets import token_urlsafe
+from threading import Lock
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from app.services.cache_backend import CacheBackend, MemoryCacheBackend
+from app.services.decode import DecodeRow
+
+_ROWS_SUFFIX = ".rows"
+_INDEX_SUFFIX = ".index"
+
+
+def _encode_row(row: DecodeRow) -> bytes:
+    values = [
+        row.status,
+        row.devaddr,
+        row.fcnt,
+        row.fport,
+        row.time,
+        row.payload_hex,
+        row.decoded_json,
+        row.error,
+        row.mic_ok,
+    ]
+    return (json.dumps(values, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _decode_row(line: bytes) -> DecodeRow:
+    return DecodeRow(*json.loads(line))
+
+
+def iter_row_file(handle: BinaryIO) -> Iterator[DecodeRow]:
+    with handle:
+        for line in handle:
+            yield _decode_row(line)
+
+
+def link_file(source: Path, target: Path) -> None:
+    # Hard links make the copy free and let either side be deleted independently.
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _row_epoch(value: str | None) -> float:
+    if not value or not isinstance(value, str):
+        return math.nan
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return math.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class DecodeIndex:
+    def __init__(self) -> None:
+        self.offsets = array("Q")
+        self.times = array("d")
+        self.by_devaddr: dict[str | None, array] = {}
+        self.by_fport: dict[int | None, array] = {}
+        self.by_status: dict[str, array] = {}
+
+    def add(self, row: DecodeRow, offset: int) -> None:
+        number = len(self.offsets)
+        self.offsets.append(offset)
+        self.times.append(_row_epoch(row.time))
+        self.by_devaddr.setdefault(row.devaddr, array("I")).append(number)
+        self.by_fport.setdefault(row.fport, array("I")).append(number)
+        self.by_status.setdefault(row.status, array("I")).append(number)
+
+    def select(
+        self,
+        start: int = 0,
+        devaddr: str | None = None,
+        fport: int | None = None,
+        status: str | None = None,
+        time_from: float | None = None,
+        time_to: float | None = None,
+    ) -> Iterator[int]:
+        postings = []
+        if devaddr is not None:
+            postings.append(self.by_devaddr.get(devaddr, array("I")))
+        if fport is not None:
+            postings.append(self.by_fport.get(fport, array("I")))
+        if status is not None:
+            postings.append(self.by_status.get(status, array("I")))
+
+        # Walk the smallest posting list and probe the others, so cost follows the match count.
+        postings.sort(key=len)
+        if postings:
+            base = postings[0]
+            candidates: Iterable[int] = base[bisect_left(base, start) :]
+        else:
+            candidates = range(start, len(self.offsets))
+        others = postings[1:]
+
+        for number in candidates:
+            if any(not _contains(posting, number) for posting in others):
+                continue
+            if time_from is not None or time_to is not None:
+                moment = self.times[number]
+                if math.isnan(moment):
+                    continue
+                if time_from is not None and moment < time_from:
+                    continue
+                if time_to is not None and moment > time_to:
+                    continue
+            yield number
+
+
+def _contains(posting: array, number: int) -> bool:
+    position = bisect_left(posting, number)
+    return position < len(posting) and posting[position] == number
+
+
+def index_path_for(rows_path: Path) -> Path:
+    return rows_path.with_suffix(_INDEX_SUFFIX)
+
+
+def write_decode_index(index: DecodeIndex, path: Path) -> None:
+    with path.open("wb") as handle:
+        pickle.dump(index, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@lru_cache(maxsize=16)
+def _load_decode_index(path: str, mtime_ns: int, size: int) -> DecodeIndex:
+    with open(path, "rb") as handle:
+        return pickle.load(handle)
+
+
+def load_decode_index(path: Path) -> DecodeIndex:
+    stat = path.stat()
+    return _load_decode_index(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+# Cache backends hold only this handle; the index lives beside the rows and is read on first use.
+@dataclass(frozen=True)
+class DecodeResult:
+    token: str
+    path: Path
+    row_count: int
+    size_bytes: int
+    created_at: datetime
+    expires_at: datetime
+    summary: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def index_path(self) -> Path:
+        return index_path_for(self.path)
+
+    @property
+    def index(self) -> DecodeIndex:
+        return load_decode_index(self.index_path)
+
+    def iter_rows(self, start: int = 0, limit: int | None = None) -> Iterator[DecodeRow]:
+        if start >= self.row_count:
+            return
+        remaining = self.row_count - start
+        if limit is not None:
+            remaining = min(remaining, limit)
+
+        with self.path.open("rb") as handle:
+            if start:
+                handle.seek(self.index.offsets[start])
+            for line in handle:
+                if remaining <= 0:
+                    break
+                remaining -= 1
+                yield _decode_row(line)
+
+    def page(
+        self,
+        start: int = 0,
+        offset: int = 0,
+        limit: int = 100,
+        devaddr: str | None = None,
+        fport: int | None = None,
+        status: str | None = None,
+        time_from: float | None = None,
+        time_to: float | None = None,
+    ) -> tuple[list[DecodeRow], int | None]:
+        matches = self.index.select(start, devaddr, fport, status, time_from, time_to)
+        numbers = list(islice(matches, offset, offset + limit + 1))
+        next_cursor = numbers.pop() if len(numbers) > limit else None
+        return self.read_rows(numbers), next_cursor
+
+    def read_rows(self, numbers: Iterable[int]) -> list[DecodeRow]:
+        rows: list[DecodeRow] = []
+        offsets = self.index.offsets
+        with self.path.open("rb") as handle:
+            for number in numbers:
+                handle.seek(offsets[number])
+                rows.append(_decode_row(handle.readline()))
+        return rows
+
+
+class DecodeResultWriter:
+    def __init__(self, cache: "DecodeCache", token: str, path: Path) -> None:
+        self.token = token
+        self.path = path
+        self.row_count = 0
+        self._cache = cache
+        self._size = 0
+        self._index = DecodeIndex()
+        self._handle = path.open("wb")
+
+    def append(self, row: DecodeRow) -> None:
+        self._index.add(row, self._size)
+        data = _encode_row(row)
+        self._handle.write(data)
+        self._size += len(data)
+        self.row_count += 1
+
+    def commit(self, summary: dict[str, Any] | None = None) -> DecodeResult:
+        self._handle.close()
+        try:
+            write_decode_index(self._index, index_path_for(self.path))
+        except BaseException:
+            self.abort()
+            raise
+        return self._cache._register(self.token, self.path, self.row_count, self._size, summary)
+
+    def abort(self) -> None:
+        self._handle.close()
+        self.path.unlink(missing_ok=True)
+        index_path_for(self.path).unlink(missing_ok=True)
+
+
+class DecodeCache:
+    def __init__(
+        self,
+        ttl_minutes: int = 30,
+        max_items: int = 100,
+        storage_dir: str | Path | None = None,
+        max_disk_bytes: int = 2 * 1024 * 1024 * 1024,
+        backend: CacheBackend | None = None,
+    ) -> None:
+        # A shared backend needs a storage_dir every worker can reach; results live there as files.
+        self._ttl = timedelta(minutes=ttl_minutes)
+        self._backend = backend or MemoryCacheBackend(max_items, max_disk_bytes)
+        self._storage_dir = Path(storage_dir) if storage_dir else None
+        self._storage_ready = False
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    def _ensure_storage(self) -> Path:
+        with self._lock:
+            if self._storage_ready:
+                return self._storage_dir
+            if self._storage_dir is None:
+                self._storage_dir = Path(tempfile.mkdtemp(prefix="lp0-decode-"))
+            self._storage_dir.mkdir(parents=True, exist_ok=True)
+            # Result files can outlive the backend that tracked them; drop old ones no live token owns.
+            cutoff = time.time() - self._ttl.total_seconds()
+            now = datetime.utcnow()
+            for suffix in (_ROWS_SUFFIX, _INDEX_SUFFIX):
+                for stale in self._storage_dir.glob(f"*{suffix}"):
+                    try:
+                        if stale.stat().st_mtime > cutoff:
+                            continue
+                    except OSError:
+                        continue
+                    tracked = self._backend.get(stale.stem)
+                    if tracked is None or tracked.expires_at <= now:
+                        stale.unlink(missing_ok=True)
+            self._storage_ready = True
+            return self._storage_dir
+
+    @staticmethod
+    def _discard(results: Iterable[DecodeResult | None]) -> None:
+        for result in results:
+            if result is not None:
+                result.path.unlink(missing_ok=True)
+                result.index_path.unlink(missing_ok=True)
+
+    def _register(
+        self,
+        token: str,
+        path: Path,
+        row_count: int,
+        size_bytes: int,
+        summary: dict[str, Any] | None,
+    ) -> DecodeResult:
+        now = datetime.utcnow()
+        result = DecodeResult(
+            token=token,
+            path=path,
+            row_count=row_count,
+            size_bytes=size_bytes,
+            created_at=now,
+            expires_at=now + self._ttl,
+            summary=summary or {},
+        )
+        disk_bytes = size_bytes + result.index_path.stat().st_size
+        self._discard(self._backend.put(token, result, result.created_at, result.expires_at, disk_bytes))
+        return result
+
+    def writer(self) -> DecodeResultWriter:
+        storage_dir = self._ensure_storage()
+        token = token_urlsafe(32)
+        return DecodeResultWriter(self, token, storage_dir / f"{token}{_ROWS_SUFFIX}")
+
+    def create(self, rows: Iterable[DecodeRow], summary: dict[str, Any] | None = None) -> DecodeResult:
+        writer = self.writer()
+        try:
+            for row in rows:
+                writer.append(row)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(summary)
+
+    def attach(
+        self,
+        source: Path,
+        row_count: int,
+        size_bytes: int,
+        index_source: Path,
+        summary: dict[str, Any] | None = None,
+    ) -> DecodeResult:
+        storage_dir = self._ensure_storage()
+        token = token_urlsafe(32)
+        path = storage_dir / f"{token}{_ROWS_SUFFIX}"
+        index_path = index_path_for(path)
+        try:
+            link_file(source, path)
+            link_file(index_source, index_path)
+            # A link keeps the stored file's old mtime; restamp it so it reads as a new result.
+            os.utime(path)
+            os.utime(index_path)
+        except OSError:
+            path.unlink(missing_ok=True)
+            index_path.unlink(missing_ok=True)
+            raise
+        return self._register(token, path, row_count, size_bytes, summary)
+
+    def get(self, token: str) -> DecodeResult | None:
+        result = self._backend.get(token)
+        if result is not None and result.expires_at <= datetime.utcnow():
+            self._discard([self._backend.remove(token)])
+            result = None
+        with self._lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return result
+
+    def stats(self) -> dict[str, int]:
+        backend = self._backend.stats()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "items": backend["items"],
+                "disk_bytes": backend["bytes"],
+            }
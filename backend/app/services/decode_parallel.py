@@ -0,0 +1,210 @@
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from app.core.metrics import StageTimings
+from app.db.models import DeviceCredential
+from app.services.decode import DecodeRow, DecoderRoutes, DecodeSummary, iter_decode_rows
+from app.services.decode_rows import DecodeRowBatch
+from app.services.decoder_runtime import DecoderMemo, DecoderPool
+from app.services.worker_pool import map_in_order
+
+_WORKER_DECODER_POOL_SIZE = 4
+_worker_state: dict = {}
+
+
+def split_byte_ranges(path: Path, parts: int) -> list[tuple[int, int]]:
+    size = path.stat().st_size
+    if size == 0:
+        return []
+
+    step = max(1, size // max(1, parts))
+    bounds = [0]
+    with path.open("rb") as handle:
+        for index in range(1, max(1, parts)):
+            target = index * step
+            if target <= bounds[-1]:
+                continue
+            if target >= size:
+                break
+            handle.seek(target - 1)
+            handle.readline()
+            boundary = handle.tell()
+            if boundary >= size:
+                break
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _iter_range_lines(path: Path, start: int, end: int) -> Iterator[str]:
+    with path.open("rb") as handle:
+        handle.seek(start)
+        position = start
+        while position < end:
+            line = handle.readline()
+            if not line:
+                break
+            position += len(line)
+            text = line.decode("utf-8")
+            if "\r" not in text:
+                yield text
+                continue
+            # Split and translate \r and \r\n the way the sequential path's universal-newline text mode does.
+            yield from io.StringIO(text, newline=None)
+
+
+def _detach_credentials(credentials: dict[str, DeviceCredential]) -> dict[str, DeviceCredential]:
+    return {
+        devaddr: DeviceCredential(devaddr=cred.devaddr, nwkskey=cred.nwkskey, appskey=cred.appskey)
+        for devaddr, cred in credentials.items()
+    }
+
+
+def _route_sources(decoder_routes: DecoderRoutes | None) -> set[str]:
+    if decoder_routes is None:
+        return set()
+    sources = {*decoder_routes.by_devaddr.values(), *decoder_routes.by_fport.values()}
+    return {source for source in sources if source}
+
+
+@dataclass(frozen=True)
+class _ShardJob:
+    credentials: dict[str, DeviceCredential]
+    decoder_source: str | None
+    allowed_devaddrs: set[str] | None
+    batch_size: int
+    memo_max_items: int
+    verify_mic: bool
+    time_limit_ms: int | None
+    memory_limit_bytes: int | None
+    max_limit_trips: int
+    decoder_routes: DecoderRoutes | None
+
+
+def _worker_decoders(job: _ShardJob) -> tuple[DecoderPool, DecoderMemo | None]:
+    # Pool workers outlive requests: warm decoder contexts and memoised frames carry over
+    # to every later shard run under the same limits.
+    key = (job.time_limit_ms, job.memory_limit_bytes, job.memo_max_items)
+    pool_size = max(_WORKER_DECODER_POOL_SIZE, 1 + len(_route_sources(job.decoder_routes)))
+    cached = _worker_state.get("decoders")
+    if cached is None or cached[0] != key or cached[1] < pool_size:
+        pool = DecoderPool(
+            max_size=pool_size,
+            time_limit_ms=job.time_limit_ms,
+            memory_limit_bytes=job.memory_limit_bytes,
+        )
+        memo = DecoderMemo(max_items=job.memo_max_items) if job.memo_max_items > 0 else None
+        cached = (key, pool_size, pool, memo)
+        _worker_state["decoders"] = cached
+    return cached[2], cached[3]
+
+
+def _decode_shard(
+    path: str, start: int, end: int, job: _ShardJob
+) -> tuple[DecodeRowBatch, DecodeSummary, StageTimings]:
+    summary = DecodeSummary()
+    timings = StageTimings()
+    decoder_pool, decoder_memo = _worker_decoders(job)
+    rows = iter_decode_rows(
+        _iter_range_lines(Path(path), start, end),
+        job.credentials,
+        job.decoder_source,
+        job.allowed_devaddrs,
+        decoder_pool=decoder_pool,
+        batch_size=job.batch_size,
+        decoder_memo=decoder_memo,
+        summary=summary,
+        verify_mic=job.verify_mic,
+        max_limit_trips=job.max_limit_trips,
+        decoder_routes=job.decoder_routes,
+        timings=timings,
+    )
+    # Shards travel back to the parent, and may wait there, as compact columns.
+    return DecodeRowBatch(rows), summary, timings
+
+
+def iter_decode_path_parallel(
+    path: Path,
+    credentials: dict[str, DeviceCredential],
+    decoder_source: str | None,
+    allowed_devaddrs: set[str] | None = None,
+    workers: int = 2,
+    batch_size: int = 1,
+    memo_max_items: int = 0,
+    summary: DecodeSummary | None = None,
+    verify_mic: bool = False,
+    time_limit_ms: int | None = None,
+    memory_limit_bytes: int | None = None,
+    max_limit_trips: int = 0,
+    decoder_routes: DecoderRoutes | None = None,
+    timings: StageTimings | None = None,
+) -> Iterator[DecodeRow]:
+    workers = max(1, workers)
+    ranges = split_byte_ranges(path, workers * 2)
+    if not ranges:
+        return
+
+    job = _ShardJob(
+        _detach_credentials(credentials),
+        decoder_source,
+        allowed_devaddrs,
+        batch_size,
+        memo_max_items,
+        verify_mic,
+        time_limit_ms,
+        memory_limit_bytes,
+        max_limit_trips,
+        decoder_routes,
+    )
+    # Spawned workers do not inherit the server's threads or locks. At most `workers`
+    # shards are in flight, and each batch is yielded, in file order, as soon as it is next.
+    shards = map_in_order(
+        _decode_shard,
+        ((str(path), start, end, job) for start, end in ranges),
+        workers,
+    )
+    for shard_rows, shard_summary, shard_timings in shards:
+        if summary is not None:
+            summary.merge(shard_summary)
+        if timings is not None:
+            timings.merge(shard_timings)
+        yield from shard_rows
+
+
+def decode_jsonl_path_parallel(
+    path: Path,
+    credentials: dict[str, DeviceCredential],
+    decoder_source: str | None,
+    allowed_devaddrs: set[str] | None = None,
+    workers: int = 2,
+    batch_size: int = 1,
+    memo_max_items: int = 0,
+    summary: DecodeSummary | None = None,
+    verify_mic: bool = False,
+    time_limit_ms: int | None = None,
+    memory_limit_bytes: int | None = None,
+    max_limit_trips: int = 0,
+    decoder_routes: DecoderRoutes | None = None,
+    timings: StageTimings | None = None,
+) -> list[DecodeRow]:
+    return list(
+        iter_decode_path_parallel(
+            path,
+            credentials,
+            decoder_source,
+            allowed_devaddrs,
+            workers=workers,
+            batch_size=batch_size,
+            memo_max_items=memo_max_items,
+            summary=summary,
+            verify_mic=verify_mic,
+            time_limit_ms=time_limit_ms,
+            memory_limit_bytes=memory_limit_bytes,
+            max_limit_trips=max_limit_trips,
+            decoder_routes=decoder_routes,
+            timings=timings,
+        )
+    )
@@ -0,0 +1,100 @@
+import json
+from array import array
+from typing import Iterable, Iterator
+
+from app.services.decode import DecodeRow
+
+_NO_INT = -1
+_MIC_CODES = {None: -1, False: 0, True: 1}
+_MIC_VALUES = {-1: None, 0: False, 1: True}
+
+
+class _BlobColumn:
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._ends = array("Q")
+        self._present = bytearray()
+
+    def append(self, value: bytes | None) -> None:
+        if value is not None:
+            self._data += value
+        self._ends.append(len(self._data))
+        self._present.append(value is not None)
+
+    def get(self, index: int) -> bytes | None:
+        if not self._present[index]:
+            return None
+        start = self._ends[index - 1] if index else 0
+        return bytes(self._data[start : self._ends[index]])
+
+
+class DecodeRowBatch:
+    def __init__(self, rows: Iterable[DecodeRow] = ()) -> None:
+        self._strings: list[str | None] = [None]
+        self._string_ids: dict[str | None, int] = {None: 0}
+        self._status = array("I")
+        self._devaddr = array("I")
+        self._error = array("I")
+        self._fcnt = array("q")
+        self._fport = array("i")
+        self._mic_ok = array("b")
+        self._time = _BlobColumn()
+        self._payload = _BlobColumn()
+        self._decoded = _BlobColumn()
+        self.extend(rows)
+
+    def _intern(self, value: str | None) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def append(self, row: DecodeRow) -> None:
+        self._status.append(self._intern(row.status))
+        self._devaddr.append(self._intern(row.devaddr))
+        self._error.append(self._intern(row.error))
+        self._fcnt.append(_NO_INT if row.fcnt is None else row.fcnt)
+        self._fport.append(_NO_INT if row.fport is None else row.fport)
+        self._mic_ok.append(_MIC_CODES[row.mic_ok])
+        self._time.append(str(row.time).encode("utf-8") if row.time is not None else None)
+        self._payload.append(bytes.fromhex(row.payload_hex) if row.payload_hex is not None else None)
+        decoded = None
+        if row.decoded_json is not None:
+            decoded = json.dumps(row.decoded_json, separators=(",", ":")).encode("utf-8")
+        self._decoded.append(decoded)
+
+    def extend(self, rows: Iterable[DecodeRow]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    def __getitem__(self, index: int) -> DecodeRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DecodeRowBatch index out of range")
+
+        fcnt = self._fcnt[index]
+        fport = self._fport[index]
+        time = self._time.get(index)
+        payload = self._payload.get(index)
+        decoded = self._decoded.get(index)
+        return DecodeRow(
+            status=self._strings[self._status[index]],
+            devaddr=self._strings[self._devaddr[index]],
+            fcnt=None if fcnt == _NO_INT else fcnt,
+            fport=None if fport == _NO_INT else fport,
+            time=time.decode("utf-8") if time is not None else None,
+            payload_hex=payload.hex().upper() if payload is not None else None,
+            decoded_json=json.loads(decoded) if decoded is not None else None,
+            error=self._strings[self._error[index]],
+            mic_ok=_MIC_VALUES[self._mic_ok[index]],
+        )
+
+    def __iter__(self) -> Iterator[DecodeRow]:
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator
+from uuid import uuid4
+
+from app.db.models import DeviceCredential
+from app.services.decode import DecodeRow
+from app.services.decode_cache import DecodeIndex, DecodeResult, iter_row_file, link_file, load_decode_index
+
+_ROWS_SUFFIX = ".rows"
+_INDEX_SUFFIX = ".index"
+_META_SUFFIX = ".json"
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    stat = path.stat()
+    return _file_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def credential_fingerprints(
+    credentials: dict[str, DeviceCredential],
+    allowed_devaddrs: set[str] | None = None,
+) -> dict[str, str]:
+    fingerprints = {}
+    for devaddr, credential in credentials.items():
+        if allowed_devaddrs is not None and devaddr not in allowed_devaddrs:
+            continue
+        material = f"{devaddr}:{credential.nwkskey}:{credential.appskey}".upper().encode("ascii")
+        fingerprints[devaddr] = hashlib.sha256(material).hexdigest()
+    return fingerprints
+
+
+def changed_devaddrs(before: dict[str, str], after: dict[str, str]) -> set[str]:
+    return {devaddr for devaddr in before.keys() | after.keys() if before.get(devaddr) != after.get(devaddr)}
+
+
+def decode_base_key(file_hash: str, decoder_hash: str | None, options: dict[str, Any]) -> str:
+    material = json.dumps([file_hash, decoder_hash, options], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def decode_key(base_key: str, fingerprints: dict[str, str]) -> str:
+    material = json.dumps([base_key, fingerprints], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _tmp_path(path: Path) -> Path:
+    # Two workers may store the same key at once; each writes its own file before the rename.
+    return path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+
+
+def _replace(tmp: Path, path: Path) -> None:
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+@dataclass(frozen=True)
+class StoredDecode:
+    key: str
+    rows_path: Path
+    row_count: int
+    size_bytes: int
+    index_path: Path
+    summary: dict[str, Any]
+    base_key: str | None = None
+    credentials: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def index(self) -> DecodeIndex:
+        return load_decode_index(self.index_path)
+
+    def open_rows(self) -> Iterator[DecodeRow]:
+        return iter_row_file(self.rows_path.open("rb"))
+
+
+class DecodeStore:
+    # Every worker process shares the directory: the files are the source of truth, and each process
+    # rescans them on a miss and before evicting, so results written and the byte cap hold across processes.
+    def __init__(self, storage_dir: str | Path, max_bytes: int = 4 * 1024 * 1024 * 1024) -> None:
+        self._storage_dir = Path(storage_dir)
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] | None = None
+        self._latest: dict[str, str] = {}
+        self._metas: dict[str, tuple[str | None, int]] = {}
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    def _paths(self, key: str) -> tuple[Path, Path, Path]:
+        base = self._storage_dir / key
+        return (
+            base.with_suffix(_ROWS_SUFFIX),
+            base.with_suffix(_INDEX_SUFFIX),
+            base.with_suffix(_META_SUFFIX),
+        )
+
+    def _entry_bytes(self, key: str) -> int:
+        size = 0
+        for path in self._paths(key):
+            try:
+                size += path.stat().st_size
+            except OSError:
+                continue
+        return size
+
+    def _meta(self, key: str, meta: Path, mtime_ns: int) -> tuple[str | None, int]:
+        known = self._metas.get(key)
+        if known is None:
+            try:
+                metadata = json.loads(meta.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                metadata = {}
+            known = self._metas[key] = (metadata.get("base_key"), metadata.get("created_at", mtime_ns))
+        return known
+
+    def _load_entries(self, refresh: bool = False) -> OrderedDict[str, int]:
+        if self._entries is not None and not refresh:
+            return self._entries
+        self._storage_dir.mkdir(parents=True, exist_ok=True)
+        # The metadata file is written last, so it marks complete entries; its mtime is the LRU clock.
+        metas = []
+        for meta in self._storage_dir.glob(f"*{_META_SUFFIX}"):
+            try:
+                metas.append((meta.stat().st_mtime_ns, meta))
+            except OSError:
+                continue
+        known = self._entries or OrderedDict()
+        # File times can be coarser than successive requests; ties keep this process's own LRU order.
+        rank = {key: position for position, key in enumerate(known)}
+        metas.sort(key=lambda item: (item[0], rank.get(item[1].stem, len(rank))))
+        self._entries = OrderedDict(
+            (meta.stem, known[meta.stem] if meta.stem in known else self._entry_bytes(meta.stem)) for _, meta in metas
+        )
+        self._total_bytes = sum(self._entries.values())
+        self._metas = {key: value for key, value in self._metas.items() if key in self._entries}
+        newest: dict[str, tuple[int, str]] = {}
+        for mtime_ns, meta in metas:
+            base_key, created_at = self._meta(meta.stem, meta, mtime_ns)
+            if base_key and created_at >= newest.get(base_key, (-1, ""))[0]:
+                newest[base_key] = (created_at, meta.stem)
+        self._latest = {base_key: key for base_key, (_, key) in newest.items()}
+        return self._entries
+
+    def _remove(self, key: str) -> None:
+        entries = self._load_entries()
+        self._total_bytes -= entries.pop(key, 0)
+        self._metas.pop(key, None)
+        for base_key in [base for base, latest in self._latest.items() if latest == key]:
+            del self._latest[base_key]
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = self._load_entries(refresh=True)
+        while self._total_bytes > self._max_bytes and len(entries) > 1:
+            self._remove(next(iter(entries)))
+
+    def latest(self, base_key: str) -> StoredDecode | None:
+        # Another process may have written a newer result for the base key, or evicted the one known here.
+        for refresh in (False, True):
+            with self._lock:
+                self._load_entries(refresh)
+                key = self._latest.get(base_key)
+            stored = self.get(key) if key else None
+            if stored is not None:
+                return stored
+        return None
+
+    def get(self, key: str) -> StoredDecode | None:
+        with self._lock:
+            entries = self._load_entries()
+            if key not in entries:
+                entries = self._load_entries(refresh=True)
+                if key not in entries:
+                    return None
+            rows_path, index_path, meta_path = self._paths(key)
+            try:
+                metadata = json.loads(meta_path.read_text(encoding="utf-8"))
+                index_path.stat()
+                os.utime(meta_path)
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            entries.move_to_end(key)
+            return StoredDecode(
+                key=key,
+                rows_path=rows_path,
+                row_count=metadata["row_count"],
+                size_bytes=metadata["size_bytes"],
+                index_path=index_path,
+                summary=metadata["summary"],
+                base_key=metadata.get("base_key"),
+                credentials=metadata.get("credentials", {}),
+            )
+
+    def put(
+        self,
+        key: str,
+        result: DecodeResult,
+        base_key: str | None = None,
+        credentials: dict[str, str] | None = None,
+    ) -> None:
+        with self._lock:
+            self._load_entries()
+            self._remove(key)
+            rows_path, index_path, meta_path = self._paths(key)
+            rows_tmp = _tmp_path(rows_path)
+            link_file(result.path, rows_tmp)
+            _replace(rows_tmp, rows_path)
+
+            index_tmp = _tmp_path(index_path)
+            link_file(result.index_path, index_tmp)
+            _replace(index_tmp, index_path)
+
+            metadata = {
+                "row_count": result.row_count,
+                "size_bytes": result.size_bytes,
+                "summary": result.summary,
+                "base_key": base_key,
+                "credentials": credentials or {},
+                "created_at": time.time_ns(),
+            }
+            meta_tmp = _tmp_path(meta_path)
+            try:
+                meta_tmp.write_text(json.dumps(metadata), encoding="utf-8")
+            except OSError:
+                meta_tmp.unlink(missing_ok=True)
+                raise
+            _replace(meta_tmp, meta_path)
+
+            size = self._entry_bytes(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._metas[key] = (base_key, metadata["created_at"])
+            if base_key:
+                self._latest[base_key] = key
+            self._evict()
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            self._load_entries(refresh=True)
+            return self._total_bytes
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Iterator
+
+import quickjs
+
+# The decoder's top level is compiled once as the body of a factory and rerun for every
+# frame, so its var/let/const state starts from its declared values on each call.
+_SOURCE_PREFIX = "globalThis.__lp0_load = function() {"
+_SOURCE_SUFFIX = (
+    "\n;return {"
+    "decodeUplink: typeof decodeUplink === 'function' ? decodeUplink : null,"
+    "Decoder: typeof Decoder === 'function' ? Decoder : null"
+    "};};"
+)
+
+_RUNTIME_PRELUDE = (
+    "(function() {"
+    "let lastError = null;"
+    "const load = globalThis.__lp0_load;"
+    "delete globalThis.__lp0_load;"
+    "globalThis.__lp0_last_error = function() { return lastError; };"
+    "globalThis.__lp0_entry_point = function() {"
+    "  try {"
+    "    const entry = load.call(globalThis);"
+    "    return entry.decodeUplink ? 'decodeUplink' : entry.Decoder ? 'Decoder' : null;"
+    "  } finally {"
+    "    __lp0_reset();"
+    "  }"
+    "};"
+    "globalThis.__lp0_decode_frame = function(data, fPort) {"
+    "  const bytes = new Array(data.length);"
+    "  for (let i = 0; i < data.length; i++) { bytes[i] = data.charCodeAt(i) & 0xFF; }"
+    "  try {"
+    "    const entry = load.call(globalThis);"
+    "    let value = null;"
+    "    if (entry.decodeUplink) {"
+    "      value = entry.decodeUplink({bytes: bytes, fPort: fPort});"
+    "    } else if (entry.Decoder) {"
+    "      value = entry.Decoder(bytes, fPort);"
+    "    }"
+    "    const text = JSON.stringify(value);"
+    "    return text === undefined ? 'null' : text;"
+    "  } catch (err) {"
+    "    const stack = err === null || err === undefined ? undefined : err.stack;"
+    "    lastError = String(err) + '\\n' + String(stack);"
+    "    return undefined;"
+    "  } finally {"
+    "    __lp0_reset();"
+    "  }"
+    "};"
+    "const baseline = new Set(Object.getOwnPropertyNames(globalThis));"
+    "baseline.add('__lp0_reset');"
+    "globalThis.__lp0_reset = function() {"
+    "  for (const name of Object.getOwnPropertyNames(globalThis)) {"
+    "    if (!baseline.has(name)) { delete globalThis[name]; }"
+    "  }"
+    "};"
+    "})()"
+)
+
+# Payload bytes cross into JS as a string of U+0100..U+01FF code points: the binding
+# cannot pass bytes and cuts strings at NUL, and JS masks each code unit back to 0..255.
+_BYTE_CHARS = {index: 0x100 | index for index in range(256)}
+_OUT_OF_MEMORY = "InternalError: out of memory"
+_INTERRUPTED = "InternalError: interrupted"
+# Loading is bounded even with the per-call limit off, so a top level that never returns
+# fails the upload or the frame instead of hanging the worker that loads it.
+_LOAD_TIME_LIMIT_MS = 5000
+
+
+class DecoderError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class DecoderCall:
+    value: Any
+    error: str | None = None
+    limit_exceeded: bool = False
+    elapsed_ms: float = 0.0
+
+
+def decoder_hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class DecoderContext:
+    def __init__(
+        self,
+        source: str,
+        source_hash: str | None = None,
+        time_limit_ms: int | None = None,
+        memory_limit_bytes: int | None = None,
+    ) -> None:
+        self.source_hash = source_hash or decoder_hash(source)
+        self.time_limit_ms = time_limit_ms
+        self.memory_limit_bytes = memory_limit_bytes
+        self._context = quickjs.Context()
+        # QuickJS restarts the CPU-time clock on every call into the runtime, so this bounds
+        # loading the source and then each decode call separately.
+        self._context.set_time_limit((time_limit_ms or _LOAD_TIME_LIMIT_MS) / 1000)
+        self._context.eval(_SOURCE_PREFIX + source + _SOURCE_SUFFIX)
+        # Snapshot the runtime's globals; anything a frame adds is deleted after the call.
+        self._context.eval(_RUNTIME_PRELUDE)
+        self._decode_frame = self._context.get("__lp0_decode_frame")
+        self._last_error = self._context.get("__lp0_last_error")
+        self._reset = self._context.get("__lp0_reset")
+        # Running the top level once up front keeps its errors a load-time failure.
+        self._entry_point = self._context.eval("__lp0_entry_point()")
+        self._context.set_time_limit(time_limit_ms / 1000 if time_limit_ms else -1)
+        if memory_limit_bytes:
+            # The limit is on the whole runtime, so allow each call its budget on top of
+            # what the loaded decoder already holds.
+            baseline = self._context.memory()["memory_used_size"]
+            self._context.set_memory_limit(baseline + memory_limit_bytes)
+
+    def entry_point(self) -> str | None:
+        return self._entry_point
+
+    def decode(self, payload: bytes, fport: int | None) -> Any:
+        call = self.call(payload, fport)
+        if call.error is not None:
+            raise DecoderError(call.error)
+        return call.value
+
+    # One JS call per frame: the time and memory limits apply to each frame on its own.
+    def call(self, payload: bytes, fport: int | None) -> DecoderCall:
+        data = payload.decode("latin-1").translate(_BYTE_CHARS)
+        started = time.perf_counter()
+        try:
+            result = self._decode_frame(data, fport or 0)
+        except quickjs.JSException as exc:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            message = str(exc)
+            # An interrupt unwinds past the JS finally block, so the frame's globals are still set.
+            self._reset()
+            if message.startswith(_INTERRUPTED):
+                return DecoderCall(None, f"time limit of {self.time_limit_ms} ms exceeded", True, elapsed_ms)
+            if message.startswith(_OUT_OF_MEMORY):
+                return self._out_of_memory(elapsed_ms)
+            return DecoderCall(None, message, False, elapsed_ms)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if result is not None:
+            return DecoderCall(json.loads(result), None, False, elapsed_ms)
+        error = self._last_error()
+        if error.startswith(_OUT_OF_MEMORY):
+            return self._out_of_memory(elapsed_ms)
+        return DecoderCall(None, error, False, elapsed_ms)
+
+    def _out_of_memory(self, elapsed_ms: float) -> DecoderCall:
+        self._context.gc()
+        return DecoderCall(None, f"memory limit of {self.memory_limit_bytes} bytes exceeded", True, elapsed_ms)
+
+
+class DecoderMemo:
+    def __init__(self, max_items: int = 10000) -> None:
+        self._max_items = max(1, max_items)
+        self._items: OrderedDict[tuple[str, int, bytes], tuple[Any, str | None]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, int, bytes]) -> tuple[Any, str | None] | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple[str, int, bytes], value: tuple[Any, str | None]) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+
+class DecoderPool:
+    def __init__(
+        self,
+        max_size: int = 16,
+        time_limit_ms: int | None = None,
+        memory_limit_bytes: int | None = None,
+    ) -> None:
+        self._max_size = max(1, max_size)
+        self._time_limit_ms = time_limit_ms
+        self._memory_limit_bytes = memory_limit_bytes
+        self._idle: OrderedDict[str, list[DecoderContext]] = OrderedDict()
+        self._idle_count = 0
+        self._lock = Lock()
+
+    def _checkout(self, key: str) -> DecoderContext | None:
+        with self._lock:
+            contexts = self._idle.get(key)
+            if not contexts:
+                return None
+            context = contexts.pop()
+            self._idle_count -= 1
+            if not contexts:
+                self._idle.pop(key, None)
+            return context
+
+    def _checkin(self, context: DecoderContext) -> None:
+        with self._lock:
+            self._idle.setdefault(context.source_hash, []).append(context)
+            self._idle.move_to_end(context.source_hash)
+            self._idle_count += 1
+            self._enforce_max()
+
+    def _enforce_max(self) -> None:
+        while self._idle_count > self._max_size:
+            key, contexts = next(iter(self._idle.items()))
+            contexts.pop(0)
+            self._idle_count -= 1
+            if not contexts:
+                self._idle.pop(key, None)
+
+    def _create(self, source: str, key: str) -> DecoderContext:
+        return DecoderContext(
+            source,
+            key,
+            time_limit_ms=self._time_limit_ms,
+            memory_limit_bytes=self._memory_limit_bytes,
+        )
+
+    def compile(self, source: str) -> str:
+        key = decoder_hash(source)
+        try:
+            context = self._checkout(key) or self._create(source, key)
+        except quickjs.JSException as exc:
+            raise DecoderError(str(exc).strip()) from exc
+        if context.entry_point() is None:
+            raise DecoderError("Decoder must define decodeUplink(input) or Decoder(bytes, port)")
+        self._checkin(context)
+        return key
+
+    # Contexts are checked out exclusively: a QuickJS runtime must never be
+    # entered from two threads at once.
+    @contextmanager
+    def acquire(self, source: str) -> Iterator[DecoderContext]:
+        key = decoder_hash(source)
+        context = self._checkout(key) or self._create(source, key)
+        try:
+            yield context
+        finally:
+            self._checkin(context)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._idle_count
@@ -0,0 +1,158 @@
+import os
+import pickle
+from array import array
+from functools import lru_cache
+from heapq import merge
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.services.log_io import log_compression, open_log
+
+# The decoder reads a frame header (MHDR, DevAddr, FCtrl, FCnt) only from PHYPayloads of at least
+# this many bytes; shorter frames, like unreadable lines, decode to error rows for any device filter.
+MIN_FRAME_SIZE = 8
+BUCKET_SECONDS = 3600
+_INDEX_SUFFIX = ".index"
+
+
+class FrameIndex:
+    def __init__(self) -> None:
+        self.log_size = 0
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.times = array("d")
+        self.by_devaddr: dict[str | None, array] = {}
+        self.by_gateway: dict[str | None, array] = {}
+        self.by_bucket: dict[int | None, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def add(
+        self,
+        offset: int,
+        length: int,
+        devaddr: str | None = None,
+        gateway: str | None = None,
+        moment: float | None = None,
+    ) -> None:
+        number = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.times.append(moment if moment is not None else float("nan"))
+        self.by_devaddr.setdefault(devaddr, array("I")).append(number)
+        self.by_gateway.setdefault(gateway, array("I")).append(number)
+        bucket = int(moment // BUCKET_SECONDS) if moment is not None else None
+        self.by_bucket.setdefault(bucket, array("I")).append(number)
+
+    def extend(self, other: "FrameIndex") -> None:
+        # Appends the frames of the log range that follows this one.
+        base = len(self.offsets)
+        self.offsets.extend(other.offsets)
+        self.lengths.extend(other.lengths)
+        self.times.extend(other.times)
+        for postings, others in (
+            (self.by_devaddr, other.by_devaddr),
+            (self.by_gateway, other.by_gateway),
+            (self.by_bucket, other.by_bucket),
+        ):
+            for key, numbers in others.items():
+                postings.setdefault(key, array("I")).extend(number + base for number in numbers)
+
+    def select(
+        self,
+        devaddrs: Iterable[str] | None = None,
+        gateways: Iterable[str] | None = None,
+        time_from: float | None = None,
+        time_to: float | None = None,
+        include_unaddressed: bool = False,
+    ) -> list[int]:
+        # Each filter is a union of posting lists; the filters given are intersected.
+        selections = []
+        if devaddrs is not None:
+            keys: list[str | None] = list(devaddrs)
+            if include_unaddressed:
+                keys.append(None)
+            selections.append(_union(self.by_devaddr, keys))
+        if gateways is not None:
+            selections.append(_union(self.by_gateway, gateways))
+        if time_from is not None or time_to is not None:
+            low = int(time_from // BUCKET_SECONDS) if time_from is not None else None
+            high = int(time_to // BUCKET_SECONDS) if time_to is not None else None
+            buckets = [
+                bucket
+                for bucket in self.by_bucket
+                if bucket is not None and (low is None or bucket >= low) and (high is None or bucket <= high)
+            ]
+            selections.append(
+                [
+                    number
+                    for number in _union(self.by_bucket, buckets)
+                    if (time_from is None or self.times[number] >= time_from)
+                    and (time_to is None or self.times[number] <= time_to)
+                ]
+            )
+
+        if not selections:
+            return list(range(len(self.offsets)))
+        selections.sort(key=len)
+        numbers = selections[0]
+        for other in selections[1:]:
+            wanted = set(other)
+            numbers = [number for number in numbers if number in wanted]
+        return numbers
+
+    def read_lines(self, path: Path, numbers: Iterable[int]) -> Iterator[str]:
+        # Offsets are into the decompressed log. Compressed logs are read forward once, skipping
+        # what is not selected, which still spares every later stage the unselected lines.
+        if log_compression(path) is not None:
+            with open_log(path) as handle:
+                for number in numbers:
+                    handle.seek(self.offsets[number])
+                    yield handle.read(self.lengths[number]).decode("utf-8")
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            for number in numbers:
+                yield os.pread(fd, self.lengths[number], self.offsets[number]).decode("utf-8")
+        finally:
+            os.close(fd)
+
+
+def _union(postings: dict, keys: Iterable) -> list[int]:
+    return list(merge(*(postings[key] for key in set(keys) if key in postings)))
+
+
+def frame_index_path(log_path: Path) -> Path:
+    return log_path.with_suffix(_INDEX_SUFFIX)
+
+
+def save_frame_index(log_path: Path, index: FrameIndex) -> None:
+    index.log_size = log_path.stat().st_size
+    target = frame_index_path(log_path)
+    target_tmp = target.with_suffix(".index.tmp")
+    with target_tmp.open("wb") as handle:
+        pickle.dump(index, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(target_tmp, target)
+
+
+@lru_cache(maxsize=32)
+def _read_frame_index(path: str, mtime_ns: int, size: int) -> FrameIndex | None:
+    try:
+        with open(path, "rb") as handle:
+            return pickle.load(handle)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def load_frame_index(log_path: Path) -> FrameIndex | None:
+    path = frame_index_path(log_path)
+    try:
+        stat = path.stat()
+        log_size = log_path.stat().st_size
+    except OSError:
+        return None
+    index = _read_frame_index(str(path), stat.st_mtime_ns, stat.st_size)
+    if index is None or index.log_size != log_size:
+        return None
+    return index
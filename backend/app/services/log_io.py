@@ -0,0 +1,79 @@
+import gzip
+import io
+import zlib
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional; gzip is always available.
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+COMPRESSION_SUFFIXES = {GZIP: ".gz", ZSTD: ".zst"}
+_MAGIC = {GZIP: b"\x1f\x8b", ZSTD: b"\x28\xb5\x2f\xfd"}
+# Errors a corrupt or truncated compressed stream can raise while it is read.
+DECOMPRESSION_ERRORS: tuple[type[Exception], ...] = (OSError, EOFError, gzip.BadGzipFile, zlib.error)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+
+def available_compressions() -> set[str]:
+    return {GZIP, ZSTD} if zstandard is not None else {GZIP}
+
+
+def compression_for_name(filename: str) -> str | None:
+    lowered = filename.lower()
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if lowered.endswith(suffix):
+            return compression
+    return None
+
+
+def strip_compression_suffix(filename: str) -> str:
+    compression = compression_for_name(filename)
+    return filename[: -len(COMPRESSION_SUFFIXES[compression])] if compression else filename
+
+
+def log_compression(path: Path) -> str | None:
+    with path.open("rb") as handle:
+        head = handle.read(4)
+    for compression, magic in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_log(path: Path) -> BinaryIO:
+    # Stored logs may be plain or compressed; either way callers read decompressed bytes as a stream.
+    compression = log_compression(path)
+    if compression == GZIP:
+        return gzip.open(path, "rb")
+    if compression == ZSTD:
+        if zstandard is None:
+            raise OSError(f"{path.name} is zstd-compressed but the zstandard package is not installed")
+        return zstandard.open(path, "rb")
+    return path.open("rb")
+
+
+def open_log_text(path: Path) -> TextIO:
+    if log_compression(path) is None:
+        return path.open("r", encoding="utf-8")
+    return io.TextIOWrapper(open_log(path), encoding="utf-8")
+
+
+def open_log_writer(path: Path, compression: str | None) -> BinaryIO:
+    if compression == GZIP:
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == ZSTD:
+        return zstandard.open(path, "wb")
+    return path.open("wb")
+
+
+def decompressing_reader(handle: BinaryIO, compression: str | None) -> BinaryIO:
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=handle, mode="rb")
+    if compression == ZSTD:
+        return zstandard.ZstdDecompressor().stream_reader(handle)
+    return handle
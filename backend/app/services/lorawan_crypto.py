@@ -0,0 +1,162 @@
+from functools import lru_cache
+from threading import local
+from typing import Sequence
+
+from Crypto.Cipher import AES
+
+_BLOCK_MASK = (1 << 128) - 1
+_FCNT_HALF = 0x8000
+_CBC_CACHE_MAX = 4096
+_cbc_state = local()
+
+
+@lru_cache(maxsize=4096)
+def _cipher(skey_hex: str):
+    return AES.new(bytes.fromhex(skey_hex), AES.MODE_ECB)
+
+
+def _double(value: int) -> int:
+    shifted = (value << 1) & _BLOCK_MASK
+    return shifted ^ 0x87 if value >> 127 else shifted
+
+
+@lru_cache(maxsize=4096)
+def _cmac_subkeys(nwkskey_hex: str) -> tuple[int, int]:
+    k1 = _double(int.from_bytes(_cipher(nwkskey_hex).encrypt(bytes(16)), "big"))
+    return k1, _double(k1)
+
+
+@lru_cache(maxsize=65536)
+def _b0_prefix(devaddr_le: bytes) -> bytes:
+    return b"\x49" + bytes(5) + devaddr_le
+
+
+@lru_cache(maxsize=65536)
+def _block_prefix(devaddr_le: bytes) -> bytes:
+    return b"\x01" + bytes(5) + devaddr_le
+
+
+def _a_blocks(devaddr_le: bytes, fcnt: int, length: int) -> bytes:
+    head = _block_prefix(devaddr_le) + (fcnt & 0xFFFFFFFF).to_bytes(4, "little") + b"\x00"
+    return b"".join(head + bytes((index & 0xFF,)) for index in range(1, (length + 15) // 16 + 1))
+
+
+def _xor(payload: bytes, keystream: bytes) -> bytes:
+    size = len(payload)
+    mixed = int.from_bytes(payload, "big") ^ int.from_bytes(keystream[:size], "big")
+    return mixed.to_bytes(size, "big")
+
+
+def decrypt_frm_payload(skey_hex: str, devaddr_le: bytes, fcnt: int, payload: bytes) -> bytes:
+    if not payload:
+        return b""
+    keystream = _cipher(skey_hex).encrypt(_a_blocks(devaddr_le, fcnt, len(payload)))
+    return _xor(payload, keystream)
+
+
+def decrypt_frm_payloads(frames: Sequence[tuple[str, bytes, int, bytes]]) -> list[bytes]:
+    results = [b""] * len(frames)
+    by_key: dict[str, list[int]] = {}
+    for index, (skey_hex, _, _, payload) in enumerate(frames):
+        if payload:
+            by_key.setdefault(skey_hex, []).append(index)
+
+    # One ECB call per session key generates the keystream for every frame in the batch.
+    for skey_hex, indices in by_key.items():
+        blocks = b"".join(_a_blocks(frames[i][1], frames[i][2], len(frames[i][3])) for i in indices)
+        keystream = _cipher(skey_hex).encrypt(blocks)
+        offset = 0
+        for i in indices:
+            payload = frames[i][3]
+            results[i] = _xor(payload, keystream[offset : offset + len(payload)])
+            offset += (len(payload) + 15) // 16 * 16
+    return results
+
+
+def _cbc_chain(nwkskey_hex: str) -> list:
+    # One CBC cipher per key and thread. pycryptodome carries the last ciphertext block over as the next
+    # IV; compute_mic cancels it in each message's first block instead of building a new cipher per frame.
+    chains = getattr(_cbc_state, "chains", None)
+    if chains is None or len(chains) > _CBC_CACHE_MAX:
+        chains = _cbc_state.chains = {}
+    chain = chains.get(nwkskey_hex)
+    if chain is None:
+        chain = chains[nwkskey_hex] = [AES.new(bytes.fromhex(nwkskey_hex), AES.MODE_CBC, iv=bytes(16)), 0]
+    return chain
+
+
+def compute_mic(nwkskey_hex: str, devaddr_le: bytes, fcnt: int, msg: bytes) -> bytes:
+    data = _b0_prefix(devaddr_le) + (fcnt & 0xFFFFFFFF).to_bytes(4, "little") + bytes((0, len(msg) & 0xFF)) + msg
+    k1, k2 = _cmac_subkeys(nwkskey_hex)
+    # AES-CMAC as a single CBC pass; B0 makes data at least one full block.
+    tail = len(data) % 16
+    if tail:
+        body = len(data) - tail
+        last = int.from_bytes(data[body:] + b"\x80" + bytes(15 - tail), "big") ^ k2
+    else:
+        body = len(data) - 16
+        last = int.from_bytes(data[body:], "big") ^ k1
+
+    chain = _cbc_chain(nwkskey_hex)
+    cipher, carried = chain
+    if body:
+        first = (int.from_bytes(data[:16], "big") ^ carried).to_bytes(16, "big")
+        out = cipher.encrypt(first + data[16:body] + last.to_bytes(16, "big"))
+    else:
+        out = cipher.encrypt((last ^ carried).to_bytes(16, "big"))
+    chain[1] = int.from_bytes(out[-16:], "big")
+    return out[-16:-12]
+
+
+def verify_mic(nwkskey_hex: str, devaddr_le: bytes, fcnt: int, phy_payload: bytes) -> bool:
+    if len(phy_payload) < 12:
+        return False
+    return compute_mic(nwkskey_hex, devaddr_le, fcnt, phy_payload[:-4]) == phy_payload[-4:]
+
+
+class UplinkCounters:
+    # Frame headers carry only the low 16 bits of the 32-bit uplink counter the MIC covers. The high
+    # bits are rebuilt from the last counter that verified for the device. Until one has, a device's
+    # first max_searches frames are tried against up to max_rollovers rollovers; later frames of a
+    # device that never verified are only checked without rollover.
+    def __init__(self, max_rollovers: int = 15, max_searches: int = 3) -> None:
+        self.max_rollovers = max_rollovers
+        self.max_searches = max_searches
+        self._last: dict[tuple[str, bytes], int] = {}
+        self._searches: dict[tuple[str, bytes], int] = {}
+
+    def _candidates(self, key: tuple[str, bytes], low: int) -> range | list[int]:
+        last = self._last.get(key)
+        if last is None:
+            searches = self._searches.get(key, 0)
+            if searches >= self.max_searches:
+                return [low]
+            self._searches[key] = searches + 1
+            return range(low, low + ((self.max_rollovers + 1) << 16), 1 << 16)
+        full = (last & ~0xFFFF) | low
+        if full + _FCNT_HALF < last:
+            full += 1 << 16
+        elif full > last + _FCNT_HALF and full >> 16:
+            full -= 1 << 16
+        return [full]
+
+    def verify(self, nwkskey_hex: str, devaddr_le: bytes, fcnt: int, phy_payload: bytes) -> bool:
+        if len(phy_payload) < 12:
+            return False
+        key = (nwkskey_hex, devaddr_le)
+        msg, mic = phy_payload[:-4], phy_payload[-4:]
+        for candidate in self._candidates(key, fcnt & 0xFFFF):
+            if compute_mic(nwkskey_hex, devaddr_le, candidate, msg) == mic:
+                if candidate > self._last.get(key, -1):
+                    self._last[key] = candidate
+                return True
+        return False
+
+
+def verify_mics(
+    frames: Sequence[tuple[str, bytes, int, bytes]],
+    counters: UplinkCounters | None = None,
+) -> list[bool]:
+    if counters is None:
+        return [verify_mic(*frame) for frame in frames]
+    return [counters.verify(*frame) for frame in frames]
@@ -2,8 +2,11 @@ import json
 import socket
 from dataclasses import dataclass
 from secrets import token_bytes
+from time import perf_counter
 from typing import Iterable
 
+from app.core.metrics import StageTimings
+
 
 @dataclass(frozen=True)
 class ReplayRow:
@@ -33,7 +36,9 @@ def replay_jsonl_lines(
     udp_host: str,
     udp_port: int,
     timeout_seconds: float = 2.0,
+    timings: StageTimings | None = None,
 ) -> list[ReplayRow]:
+    timings = timings if timings is not None else StageTimings()
     rows: list[ReplayRow] = []
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.settimeout(timeout_seconds)
@@ -43,6 +48,7 @@ def replay_jsonl_lines(
             line = line.strip()
             if not line:
                 continue
+            started = perf_counter()
             try:
                 record = json.loads(line)
             except json.JSONDecodeError:
@@ -56,6 +62,8 @@ def replay_jsonl_lines(
                     )
                 )
                 continue
+            finally:
+                timings.add("json", perf_counter() - started)
 
             gateway = record.get("gatewayEui")
             rxpk = record.get("rxpk")
@@ -72,8 +80,12 @@ def replay_jsonl_lines(
                 continue
 
             try:
+                started = perf_counter()
                 packet = _build_packet(gateway, rxpk)
+                built = perf_counter()
+                timings.add("packet", built - started)
                 sock.sendto(packet, (udp_host, udp_port))
+                timings.add("send", perf_counter() - built)
                 rows.append(
                     ReplayRow(
                         status="sent",
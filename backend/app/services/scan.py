@@ -1,8 +1,36 @@
 import base64
+import binascii
 import json
+import math
+import mmap
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
+from time import perf_counter
 from typing import IO, Any
 
+from app.core.metrics import StageTimings
+from app.services.frame_index import MIN_FRAME_SIZE, FrameIndex
+from app.services.log_io import open_log
+from app.services.scan_stats import BoundedTable, DeviceStats, GatewayStats
+
+_JSON_WS = b" \t\n\r"
+# Escapes and control characters are the only string contents that can change how a line parses.
+_UNSAFE_BYTES = bytes(range(32)) + b"\\\x7f"
+_MEMBER_EDGES = _JSON_WS + b":,}"
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+# JSON's number grammar only tells zero apart from the other digits (no leading zeros).
+_SKELETON_DIGITS = bytes.maketrans(b"23456789", b"11111111")
+_MAX_PLANS = 4096
+# Per-gateway and per-device statistics stay exact up to this many keys each; see scan_stats.
+DEFAULT_EXACT_MAX_KEYS = 4096
+_SUMMARY_SUFFIX = ".scan.json"
+# What a LogFile row keeps of a scan; the full summary, with its per-key lists and statistics,
+# is stored next to the log.
+_COMPACT_KEYS = ("record_count", "time_from", "time_to", "gateway_count", "device_count", "approximate")
+
 
 def _normalize_b64(data: str) -> str:
     stripped = data.strip()
@@ -12,54 +40,434 @@ def _normalize_b64(data: str) -> str:
     return stripped
 
 
-def _extract_devaddr(payload_b64: str) -> str | None:
+def _decode_header(payload_b64: str) -> tuple[str | None, int, int | None]:
     try:
         raw = base64.b64decode(_normalize_b64(payload_b64), validate=False)
     except (ValueError, TypeError):
-        return None
+        return None, 0, None
 
     if len(raw) < 5:
-        return None
+        return None, len(raw), None
 
     devaddr_le = raw[1:5]
-    return devaddr_le[::-1].hex().upper()
+    fcnt = int.from_bytes(raw[6:8], "little") if len(raw) >= MIN_FRAME_SIZE else None
+    return devaddr_le[::-1].hex().upper(), len(raw), fcnt
+
+
+def _decode_header_fast(payload_b64: bytes) -> tuple[str | None, int, int | None]:
+    # DevAddr and FCnt sit in bytes 1-7, inside the first three base64 quanta; only those are
+    # decoded, and only when the whole string is plain base64 that the full decoder would accept.
+    stripped = payload_b64.rstrip(b"=")
+    padding = len(payload_b64) - len(stripped)
+    if (
+        len(stripped) >= 8
+        and not stripped.translate(None, _BASE64_ALPHABET)
+        and (len(payload_b64) % 4 == 0 and padding <= 2 if padding else len(payload_b64) % 4 != 1)
+    ):
+        head = payload_b64[:12]
+        raw = binascii.a2b_base64(head + b"=" * (-len(head) % 4))
+        frame_size = len(stripped) * 3 // 4
+        fcnt = int.from_bytes(raw[6:8], "little") if frame_size >= MIN_FRAME_SIZE else None
+        return raw[4:0:-1].hex().upper(), frame_size, fcnt
+    return _decode_header(payload_b64.decode("ascii"))
+
+
+def _finite_number(value: Any) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    try:
+        number = float(value)
+    except OverflowError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _number_member(part: bytes) -> float | None:
+    # The text between a key and the next string holds its value and only closing braces and
+    # commas after it; a string value leaves nothing, any other non-number fails to parse.
+    try:
+        number = float(part.strip(_MEMBER_EDGES))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _parse_time(value: str) -> datetime | None:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class _LineFields:
+    gateway: Any
+    devaddr: str | None
+    frame_size: int
+    time: str | None
+    fcnt: int | None = None
+    rssi: float | None = None
+    snr: float | None = None
+
+
+def _record_fields(record: Any) -> _LineFields | None:
+    if not isinstance(record, dict):
+        return None
+    fields = _LineFields(record.get("gatewayEui") or record.get("gateway_eui"), None, 0, None)
+    rxpk = record.get("rxpk")
+    if isinstance(rxpk, dict):
+        data = rxpk.get("data")
+        if isinstance(data, str):
+            fields.devaddr, fields.frame_size, fields.fcnt = _decode_header(data)
+        if isinstance(rxpk.get("time"), str):
+            fields.time = rxpk["time"]
+        fields.rssi = _finite_number(rxpk.get("rssi"))
+        fields.snr = _finite_number(rxpk.get("lsnr"))
+    return fields
+
+
+class ScanTotals:
+    def __init__(self, exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS) -> None:
+        self.record_count = 0
+        self.gateways = BoundedTable(GatewayStats, exact_max_keys)
+        self.devices = BoundedTable(DeviceStats, exact_max_keys)
+        self.earliest: tuple[datetime, str] | None = None
+        self.latest: tuple[datetime, str] | None = None
+
+    def add(self, fields: _LineFields) -> datetime | None:
+        self.record_count += 1
+        moment = _parse_time(fields.time) if fields.time else None
+        if moment is not None:
+            if self.earliest is None or moment < self.earliest[0]:
+                self.earliest = (moment, fields.time)
+            if self.latest is None or moment > self.latest[0]:
+                self.latest = (moment, fields.time)
+        gateway = fields.gateway
+        if isinstance(gateway, str) and gateway.strip():
+            gateway_stats = self.gateways.get(gateway.strip())
+            if gateway_stats is not None:
+                gateway_stats.add(fields.rssi, fields.snr)
+        if fields.devaddr:
+            device_stats = self.devices.get(fields.devaddr)
+            if device_stats is not None:
+                device_stats.add(fields.fcnt, moment, fields.time)
+        return moment
+
+    def merge(self, other: "ScanTotals") -> None:
+        self.record_count += other.record_count
+        if other.earliest is not None and (self.earliest is None or other.earliest[0] < self.earliest[0]):
+            self.earliest = other.earliest
+        if other.latest is not None and (self.latest is None or other.latest[0] > self.latest[0]):
+            self.latest = other.latest
+        self.gateways.merge(other.gateways)
+        self.devices.merge(other.devices)
+
+    def as_dict(self) -> dict[str, Any]:
+        untracked = None
+        if self.gateways.approximate or self.devices.approximate:
+            untracked = {
+                "gateways": self.gateways.untracked_dict("gateway_eui"),
+                "devices": self.devices.untracked_dict("devaddr"),
+            }
+        gateway_count = self.gateways.count()
+        device_count = self.devices.count()
+        return {
+            "record_count": self.record_count,
+            "gateway_euis": sorted(self.gateways.items),
+            "devaddrs": sorted(self.devices.items),
+            # Keys past the exact limit are counted but not listed; these say how many were left out.
+            "gateway_euis_truncated": max(0, gateway_count - len(self.gateways.items)),
+            "devaddrs_truncated": max(0, device_count - len(self.devices.items)),
+            "time_from": self.earliest[1] if self.earliest else None,
+            "time_to": self.latest[1] if self.latest else None,
+            "gateway_count": gateway_count,
+            "device_count": device_count,
+            "approximate": untracked is not None,
+            "gateways": self.gateways.as_dict(),
+            "devices": self.devices.as_dict(),
+            "untracked": untracked,
+        }
+
+
+class _LinePlan:
+    # Where the members sit in a line split on '"', for every line sharing one skeleton and one
+    # set of key names. A skeleton is the line with string contents removed and digits reduced to
+    # zero or non-zero; with escapes, control characters and non-ASCII ruled out, it alone decides
+    # whether a line parses, so a skeleton json.loads accepted once is accepted for every line.
+    def __init__(self, parts: list[bytes]) -> None:
+        keys = []
+        depth = 0
+        for index in range(1, len(parts), 2):
+            before = parts[index - 1]
+            depth += before.count(b"{") + before.count(b"[") - before.count(b"}") - before.count(b"]")
+            if parts[index + 1].lstrip(_JSON_WS)[:1] == b":":
+                keys.append((index, depth, parts[index]))
+
+        self.supported = parts[0].lstrip(_JSON_WS)[:1] == b"{" and bool(keys)
+        self.gateway_indices: list[int] = []
+        self.data_index: int | None = None
+        self.time_index: int | None = None
+        self.rssi_index: int | None = None
+        self.snr_index: int | None = None
+        if not self.supported:
+            return
+        self._names_of = itemgetter(*(index for index, _, _ in keys))
+        self.names = self._names_of(parts)
+
+        top = [(index, name) for index, depth, name in keys if depth == 1]
+        for wanted in (b"gatewayEui", b"gateway_eui"):
+            found = [index for index, name in top if name == wanted]
+            if not found:
+                continue
+            if not self._is_string_value(parts, found[-1]):
+                self.supported = False
+            self.gateway_indices.append(found[-1] + 2)
+
+        rxpk = [index for index, name in top if name == b"rxpk"]
+        if rxpk and parts[rxpk[-1] + 1].lstrip(_JSON_WS)[1:].lstrip(_JSON_WS)[:1] == b"{":
+            following = [index for index, _ in top if index > rxpk[-1]]
+            end = following[0] if following else len(parts)
+            members = {name: index for index, depth, name in keys if rxpk[-1] < index < end and depth == 2}
+            if b"data" in members and self._is_string_value(parts, members[b"data"]):
+                self.data_index = members[b"data"] + 2
+            if b"time" in members and self._is_string_value(parts, members[b"time"]):
+                self.time_index = members[b"time"] + 2
+            if b"rssi" in members:
+                self.rssi_index = members[b"rssi"] + 1
+            if b"lsnr" in members:
+                self.snr_index = members[b"lsnr"] + 1
+
+    @staticmethod
+    def _is_string_value(parts: list[bytes], key_index: int) -> bool:
+        return parts[key_index + 1].strip(_JSON_WS) == b":"
 
+    def matches(self, parts: list[bytes]) -> bool:
+        return self._names_of(parts) == self.names
 
-def scan_jsonl_stream(stream: IO[str]) -> dict[str, Any]:
-    record_count = 0
-    gateway_euis: set[str] = set()
-    devaddrs: set[str] = set()
+    def fields(self, parts: list[bytes]) -> _LineFields:
+        gateway = None
+        for index in self.gateway_indices:
+            gateway = parts[index].decode("ascii")
+            if gateway:
+                break
+        fields = _LineFields(gateway, None, 0, None)
+        if self.data_index is not None:
+            fields.devaddr, fields.frame_size, fields.fcnt = _decode_header_fast(parts[self.data_index])
+        if self.time_index is not None:
+            fields.time = parts[self.time_index].decode("ascii")
+        if self.rssi_index is not None:
+            fields.rssi = _number_member(parts[self.rssi_index])
+        if self.snr_index is not None:
+            fields.snr = _number_member(parts[self.snr_index])
+        return fields
+
+
+def _split_line(line: bytes) -> list[bytes] | None:
+    if not line.isascii() or len(line.translate(None, _UNSAFE_BYTES)) != len(line):
+        return None
+    parts = line.split(b'"')
+    return parts if len(parts) % 2 else None
+
+
+def scan_jsonl_stream(
+    stream: IO[str],
+    timings: StageTimings | None = None,
+    exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS,
+) -> dict[str, Any]:
+    totals = ScanTotals(exact_max_keys)
+    # Stage times are summed locally and reported once; per-line bookkeeping would rival the scan itself.
+    parsed_lines = 0
+    json_seconds = 0.0
 
     for line in stream:
         line = line.strip()
         if not line:
             continue
+        started = perf_counter()
         try:
             record = json.loads(line)
         except json.JSONDecodeError:
             continue
+        finally:
+            json_seconds += perf_counter() - started
+            parsed_lines += 1
+        fields = _record_fields(record)
+        if fields is not None:
+            totals.add(fields)
 
-        record_count += 1
+    if timings is not None:
+        timings.add("json", json_seconds, parsed_lines)
+    return totals.as_dict()
 
-        gateway = record.get("gatewayEui") or record.get("gateway_eui")
-        if isinstance(gateway, str) and gateway.strip():
-            gateway_euis.add(gateway.strip())
-
-        rxpk = record.get("rxpk")
-        if isinstance(rxpk, dict):
-            data = rxpk.get("data")
-            if isinstance(data, str):
-                devaddr = _extract_devaddr(data)
-                if devaddr:
-                    devaddrs.add(devaddr)
-
-    return {
-        "record_count": record_count,
-        "gateway_euis": sorted(gateway_euis),
-        "devaddrs": sorted(devaddrs),
-    }
-
-
-def scan_jsonl_path(path: Path) -> dict[str, Any]:
-    with path.open("r", encoding="utf-8") as handle:
-        return scan_jsonl_stream(handle)
+
+class _LineScanner:
+    def __init__(self, index: FrameIndex | None = None, exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS) -> None:
+        self.totals = ScanTotals(exact_max_keys)
+        self._index = index
+        self._plans: dict[bytes, _LinePlan] = {}
+        self._fast_lines = self._fallback_lines = 0
+        self._fast_seconds = self._fallback_seconds = 0.0
+
+    def scan(self, line: bytes, offset: int = 0) -> None:
+        # Lines end at \r as well as \n, as they do for the text-mode readers in decode and replay.
+        if b"\r" not in line:
+            self._scan_line(line, offset)
+            return
+        for piece in line.split(b"\r"):
+            self._scan_line(piece, offset)
+            offset += len(piece) + 1
+
+    def _scan_line(self, raw_line: bytes, offset: int) -> None:
+        line = raw_line.strip()
+        if not line:
+            return
+        started = perf_counter()
+        fields = None
+        parts = _split_line(line)
+        skeleton = None
+        if parts is not None:
+            skeleton = b'"'.join(parts[::2]).translate(_SKELETON_DIGITS)
+            plan = self._plans.get(skeleton)
+            if plan is not None and plan.supported and plan.matches(parts):
+                fields = plan.fields(parts)
+                self._add(fields, offset, len(raw_line))
+                self._fast_seconds += perf_counter() - started
+                self._fast_lines += 1
+                return
+        try:
+            text = line.decode("utf-8").strip()
+            if text:
+                fields = _record_fields(json.loads(text))
+                if skeleton is not None:
+                    if len(self._plans) >= _MAX_PLANS:
+                        self._plans.clear()
+                    self._plans[skeleton] = _LinePlan(parts)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            pass
+        self._add(fields, offset, len(raw_line))
+        self._fallback_seconds += perf_counter() - started
+        self._fallback_lines += 1
+
+    def _add(self, fields: _LineFields | None, offset: int, length: int) -> None:
+        moment = self.totals.add(fields) if fields is not None else None
+        if self._index is None:
+            return
+        if fields is None:
+            self._index.add(offset, length)
+            return
+        gateway = fields.gateway.strip() if isinstance(fields.gateway, str) and fields.gateway.strip() else None
+        self._index.add(
+            offset,
+            length,
+            fields.devaddr if fields.frame_size >= MIN_FRAME_SIZE else None,
+            gateway,
+            moment.timestamp() if moment is not None else None,
+        )
+
+    def record_timings(self, timings: StageTimings) -> None:
+        timings.add("fast", self._fast_seconds, self._fast_lines)
+        timings.add("json", self._fallback_seconds, self._fallback_lines)
+
+
+class ChunkScanner:
+    # Scans a log as it is written, from chunks that need not end on a line boundary.
+    def __init__(self, index: FrameIndex | None = None, exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS) -> None:
+        self._scanner = _LineScanner(index, exact_max_keys)
+        self._pending = b""
+        self._offset = 0
+
+    def feed(self, chunk: bytes) -> None:
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._scanner.scan(line, self._offset)
+            self._offset += len(line) + 1
+
+    def finish(self, timings: StageTimings | None = None) -> dict[str, Any]:
+        if self._pending:
+            self._scanner.scan(self._pending, self._offset)
+            self._offset += len(self._pending)
+            self._pending = b""
+        if timings is not None:
+            self._scanner.record_timings(timings)
+        return self._scanner.totals.as_dict()
+
+
+def scan_jsonl_bytes(
+    stream: IO[bytes],
+    timings: StageTimings | None = None,
+    index: FrameIndex | None = None,
+    exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS,
+) -> dict[str, Any]:
+    scanner = _LineScanner(index, exact_max_keys)
+    offset = 0
+    for line in stream:
+        scanner.scan(line, offset)
+        offset += len(line)
+    if timings is not None:
+        scanner.record_timings(timings)
+    return scanner.totals.as_dict()
+
+
+def scan_jsonl_range(
+    path: Path,
+    start: int,
+    end: int,
+    timings: StageTimings | None = None,
+    index: FrameIndex | None = None,
+    exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS,
+) -> ScanTotals:
+    # One newline-aligned byte range of a log, read through a memory map; the partial totals of
+    # consecutive ranges merge into those of the whole file.
+    scanner = _LineScanner(index, exact_max_keys)
+    if end > start:
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            position = start
+            while position < end:
+                newline = view.find(b"\n", position, end)
+                stop = end if newline < 0 else newline + 1
+                scanner.scan(view[position:stop], position)
+                position = stop
+    if timings is not None:
+        scanner.record_timings(timings)
+    return scanner.totals
+
+
+def scan_jsonl_path(
+    path: Path,
+    timings: StageTimings | None = None,
+    index: FrameIndex | None = None,
+    exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS,
+) -> dict[str, Any]:
+    with open_log(path) as handle:
+        return scan_jsonl_bytes(handle, timings, index, exact_max_keys)
+
+
+def compact_scan_summary(summary: dict[str, Any]) -> dict[str, Any]:
+    compact = {key: summary[key] for key in _COMPACT_KEYS if key in summary}
+    compact.setdefault("gateway_count", len(summary.get("gateway_euis") or ()))
+    compact.setdefault("device_count", len(summary.get("devaddrs") or ()))
+    return compact
+
+
+def scan_summary_path(log_path: Path) -> Path:
+    return log_path.with_suffix(_SUMMARY_SUFFIX)
+
+
+def save_scan_summary(log_path: Path, summary: dict[str, Any]) -> None:
+    target = scan_summary_path(log_path)
+    target_tmp = target.with_suffix(".json.tmp")
+    target_tmp.write_text(json.dumps({"log_size": log_path.stat().st_size, "summary": summary}), encoding="utf-8")
+    os.replace(target_tmp, target)
+
+
+def load_scan_summary(log_path: Path) -> dict[str, Any] | None:
+    try:
+        stored = json.loads(scan_summary_path(log_path).read_text(encoding="utf-8"))
+        log_size = log_path.stat().st_size
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stored, dict) or stored.get("log_size") != log_size:
+        return None
+    return stored.get("summary")
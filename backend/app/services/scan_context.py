@@ -4,6 +4,8 @@ from secrets import token_urlsafe
 from threading import Lock
 from typing import Any
 
+from app.services.cache_backend import CacheBackend, MemoryCacheBackend
+
 
 @dataclass(frozen=True)
 class ScanContext:
@@ -15,25 +17,13 @@ class ScanContext:
 
 
 class ScanContextCache:
-    def __init__(self, ttl_minutes: int = 30, max_items: int = 200) -> None:
+    def __init__(self, ttl_minutes: int = 30, max_items: int = 200, backend: CacheBackend | None = None) -> None:
         self._ttl = timedelta(minutes=ttl_minutes)
-        self._max_items = max(1, max_items)
-        self._items: dict[str, ScanContext] = {}
+        self._backend = backend or MemoryCacheBackend(max_items)
+        self._hits = 0
+        self._misses = 0
         self._lock = Lock()
 
-    def _prune_expired(self, now: datetime) -> None:
-        expired = [token for token, ctx in self._items.items() if ctx.expires_at <= now]
-        for token in expired:
-            self._items.pop(token, None)
-
-    def _enforce_max(self) -> None:
-        if len(self._items) <= self._max_items:
-            return
-        overflow = len(self._items) - self._max_items
-        oldest = sorted(self._items.items(), key=lambda item: item[1].created_at)[:overflow]
-        for token, _ in oldest:
-            self._items.pop(token, None)
-
     def create(self, log_file_id: str, summary: dict[str, Any]) -> ScanContext:
         now = datetime.utcnow()
         context = ScanContext(
@@ -43,18 +33,22 @@ class ScanContextCache:
             created_at=now,
             expires_at=now + self._ttl,
         )
-        with self._lock:
-            self._prune_expired(now)
-            self._items[context.token] = context
-            self._enforce_max()
+        self._backend.put(context.token, context, context.created_at, context.expires_at)
         return context
 
     def get(self, token: str) -> ScanContext | None:
+        context = self._backend.get(token)
+        if context is not None and context.expires_at <= datetime.utcnow():
+            self._backend.remove(token)
+            context = None
+        with self._lock:
+            if context is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return context
+
+    def stats(self) -> dict[str, int]:
+        items = self._backend.stats()["items"]
         with self._lock:
-            context = self._items.get(token)
-            if not context:
-                return None
-            if context.expires_at <= datetime.utcnow():
-                self._items.pop(token, None)
-                return None
-            return context
+            return {"hits": self._hits, "misses": self._misses, "items": items}
@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Any
+
+from app.core.metrics import StageTimings
+from app.services.decode_parallel import split_byte_ranges
+from app.services.frame_index import FrameIndex
+from app.services.scan import DEFAULT_EXACT_MAX_KEYS, ScanTotals, scan_jsonl_range
+from app.services.worker_pool import map_in_order
+
+
+def _scan_shard(
+    path: str,
+    start: int,
+    end: int,
+    exact_max_keys: int,
+    with_index: bool,
+) -> tuple[ScanTotals, FrameIndex | None, StageTimings]:
+    timings = StageTimings()
+    index = FrameIndex() if with_index else None
+    totals = scan_jsonl_range(Path(path), start, end, timings, index, exact_max_keys)
+    return totals, index, timings
+
+
+def scan_jsonl_path_parallel(
+    path: Path,
+    workers: int = 2,
+    timings: StageTimings | None = None,
+    index: FrameIndex | None = None,
+    exact_max_keys: int = DEFAULT_EXACT_MAX_KEYS,
+) -> dict[str, Any]:
+    workers = max(1, workers)
+    ranges = split_byte_ranges(path, workers)
+    totals = ScanTotals(exact_max_keys)
+    if not ranges:
+        return totals.as_dict()
+
+    shards = map_in_order(
+        _scan_shard,
+        ((str(path), start, end, exact_max_keys, index is not None) for start, end in ranges),
+        workers,
+    )
+    # Shards come back in file order, so index entries and first/last times merge as a
+    # sequential scan would have produced them.
+    for shard_totals, shard_index, shard_timings in shards:
+        totals.merge(shard_totals)
+        if index is not None:
+            index.extend(shard_index)
+        if timings is not None:
+            timings.merge(shard_timings)
+    return totals.as_dict()
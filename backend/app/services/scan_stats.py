@@ -0,0 +1,286 @@
+import hashlib
+import math
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+_FCNT_SET_MAX = 128
+_FCNT_SPACE = 1 << 16
+_HEAVY_HITTERS = 10
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 12) -> None:
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        value = _hash64(key)
+        bucket = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[bucket]:
+            self.registers[bucket] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0**-rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+
+class CountMinSketch:
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self.counters = array("Q", bytes(8 * width * depth))
+
+    def _cells(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (first + row * second) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        estimate = None
+        for cell in self._cells(key):
+            self.counters[cell] += count
+            value = self.counters[cell]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate or 0
+
+    def estimate(self, key: str) -> int:
+        return min(self.counters[cell] for cell in self._cells(key))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        for cell, value in enumerate(other.counters):
+            self.counters[cell] += value
+
+
+@dataclass
+class _Series:
+    count: int = 0
+    total: float = 0.0
+    low: float = math.inf
+    high: float = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+    def merge(self, other: "_Series") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+    def as_dict(self) -> dict[str, float] | None:
+        if not self.count:
+            return None
+        return {"min": self.low, "mean": round(self.total / self.count, 3), "max": self.high}
+
+
+@dataclass
+class DeviceStats:
+    frames: int = 0
+    first_seen: tuple[datetime, str] | None = None
+    last_seen: tuple[datetime, str] | None = None
+    fcnt_frames: int = 0
+    fcnt_min: int | None = None
+    fcnt_max: int | None = None
+    # Distinct 16-bit FCnts: a set while small, then a bitmap over the whole counter space.
+    fcnts: set[int] | bytearray = field(default_factory=set)
+
+    def add(self, fcnt: int | None, moment: datetime | None, time: str | None) -> None:
+        self.frames += 1
+        if moment is not None:
+            self._seen(moment, time)
+        if fcnt is None:
+            return
+        self.fcnt_frames += 1
+        if self.fcnt_min is None or fcnt < self.fcnt_min:
+            self.fcnt_min = fcnt
+        if self.fcnt_max is None or fcnt > self.fcnt_max:
+            self.fcnt_max = fcnt
+        if isinstance(self.fcnts, set):
+            self.fcnts.add(fcnt)
+            if len(self.fcnts) > _FCNT_SET_MAX:
+                self.fcnts = _bitmap(self.fcnts)
+        else:
+            self.fcnts[fcnt >> 3] |= 1 << (fcnt & 7)
+
+    def _seen(self, moment: datetime, time: str | None) -> None:
+        if self.first_seen is None or moment < self.first_seen[0]:
+            self.first_seen = (moment, time)
+        if self.last_seen is None or moment > self.last_seen[0]:
+            self.last_seen = (moment, time)
+
+    def merge(self, other: "DeviceStats") -> None:
+        self.frames += other.frames
+        self.fcnt_frames += other.fcnt_frames
+        for seen in (other.first_seen, other.last_seen):
+            if seen is not None:
+                self._seen(*seen)
+        if other.fcnt_min is not None:
+            self.fcnt_min = other.fcnt_min if self.fcnt_min is None else min(self.fcnt_min, other.fcnt_min)
+            self.fcnt_max = other.fcnt_max if self.fcnt_max is None else max(self.fcnt_max, other.fcnt_max)
+        if isinstance(self.fcnts, set) and isinstance(other.fcnts, set):
+            self.fcnts |= other.fcnts
+            if len(self.fcnts) <= _FCNT_SET_MAX:
+                return
+        mine = _bitmap(self.fcnts) if isinstance(self.fcnts, set) else self.fcnts
+        theirs = _bitmap(other.fcnts) if isinstance(other.fcnts, set) else other.fcnts
+        union = int.from_bytes(mine, "little") | int.from_bytes(theirs, "little")
+        self.fcnts = bytearray(union.to_bytes(_FCNT_SPACE // 8, "little"))
+
+    def distinct_fcnts(self) -> int:
+        if isinstance(self.fcnts, set):
+            return len(self.fcnts)
+        return int.from_bytes(self.fcnts, "little").bit_count()
+
+    def as_dict(self) -> dict[str, Any]:
+        distinct = self.distinct_fcnts()
+        span = self.fcnt_max - self.fcnt_min + 1 if self.fcnt_min is not None else 0
+        return {
+            "frames": self.frames,
+            "first_seen": self.first_seen[1] if self.first_seen else None,
+            "last_seen": self.last_seen[1] if self.last_seen else None,
+            "fcnt_min": self.fcnt_min,
+            "fcnt_max": self.fcnt_max,
+            "duplicates": self.fcnt_frames - distinct,
+            # Missing counters inside the observed range; a 16-bit rollover widens the range.
+            "gaps": span - distinct,
+        }
+
+
+def _bitmap(values: set[int]) -> bytearray:
+    bitmap = bytearray(_FCNT_SPACE // 8)
+    for value in values:
+        bitmap[value >> 3] |= 1 << (value & 7)
+    return bitmap
+
+
+@dataclass
+class GatewayStats:
+    frames: int = 0
+    rssi: _Series = field(default_factory=_Series)
+    snr: _Series = field(default_factory=_Series)
+
+    def add(self, rssi: float | None, snr: float | None) -> None:
+        self.frames += 1
+        if rssi is not None:
+            self.rssi.add(rssi)
+        if snr is not None:
+            self.snr.add(snr)
+
+    def merge(self, other: "GatewayStats") -> None:
+        self.frames += other.frames
+        self.rssi.merge(other.rssi)
+        self.snr.merge(other.snr)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"frames": self.frames, "rssi": self.rssi.as_dict(), "snr": self.snr.as_dict()}
+
+
+class BoundedTable:
+    # Exact per-key statistics for the first max_keys keys. Past that, keys are no longer added:
+    # their number is estimated with HyperLogLog and their frame counts with a count-min sketch,
+    # which also keeps the heaviest untracked keys.
+    def __init__(self, factory: type, max_keys: int) -> None:
+        self.factory = factory
+        self.max_keys = max_keys
+        self.items: dict[str, Any] = {}
+        self.distinct: HyperLogLog | None = None
+        self.untracked: CountMinSketch | None = None
+        self.untracked_frames = 0
+        self.heavy: dict[str, int] = {}
+
+    def get(self, key: str) -> Any | None:
+        item = self.items.get(key)
+        if item is not None:
+            return item
+        if len(self.items) < self.max_keys:
+            item = self.items[key] = self.factory()
+            if self.distinct is not None:
+                self.distinct.add(key)
+            return item
+        self._count_untracked(key, 1)
+        return None
+
+    def _start_sketches(self) -> None:
+        if self.distinct is not None:
+            return
+        self.distinct = HyperLogLog()
+        self.untracked = CountMinSketch()
+        for tracked in self.items:
+            self.distinct.add(tracked)
+
+    def _count_untracked(self, key: str, count: int) -> None:
+        self._start_sketches()
+        self.distinct.add(key)
+        self.untracked_frames += count
+        self._note_heavy(key, self.untracked.add(key, count))
+
+    def _note_heavy(self, key: str, estimate: int) -> None:
+        if key in self.heavy or len(self.heavy) < _HEAVY_HITTERS:
+            self.heavy[key] = estimate
+            return
+        lightest = min(self.heavy, key=self.heavy.__getitem__)
+        if estimate > self.heavy[lightest]:
+            del self.heavy[lightest]
+            self.heavy[key] = estimate
+
+    def merge(self, other: "BoundedTable") -> None:
+        # Keys the other side tracked stay exact while there is room; the rest join the sketches.
+        for key, item in other.items.items():
+            mine = self.items.get(key)
+            if mine is not None:
+                mine.merge(item)
+            elif len(self.items) < self.max_keys:
+                self.items[key] = item
+                if self.distinct is not None:
+                    self.distinct.add(key)
+            else:
+                self._count_untracked(key, item.frames)
+        if other.distinct is None:
+            return
+        self._start_sketches()
+        self.distinct.merge(other.distinct)
+        self.untracked.merge(other.untracked)
+        self.untracked_frames += other.untracked_frames
+        for key in {*self.heavy, *other.heavy}:
+            self._note_heavy(key, self.untracked.estimate(key))
+
+    @property
+    def approximate(self) -> bool:
+        return self.distinct is not None
+
+    def count(self) -> int:
+        return self.distinct.estimate() if self.distinct is not None else len(self.items)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {key: self.items[key].as_dict() for key in sorted(self.items)}
+
+    def untracked_dict(self, key_name: str) -> dict[str, Any] | None:
+        if self.distinct is None:
+            return None
+        heavy = sorted(self.heavy.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "frames": self.untracked_frames,
+            "heavy_hitters": [{key_name: key, "frames_estimate": estimate} for key, estimate in heavy],
+        }
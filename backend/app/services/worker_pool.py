@@ -0,0 +1,78 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Iterable, Iterator
+
+_lock = Lock()
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+
+
+# One spawned pool per server process: workers start once and keep their warm state
+# between requests instead of paying interpreter start-up on every call.
+def get_worker_pool(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    workers = max(1, workers)
+    with _lock:
+        if _executor is None or _executor_workers < workers:
+            if _executor is not None:
+                # Work already queued on the smaller pool still finishes before it exits.
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown_worker_pool() -> None:
+    global _executor, _executor_workers
+    with _lock:
+        executor, _executor, _executor_workers = _executor, None, 0
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_broken(executor: ProcessPoolExecutor) -> None:
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is executor:
+            _executor, _executor_workers = None, 0
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def map_in_order(
+    fn: Callable[..., Any],
+    tasks: Iterable[tuple[Any, ...]],
+    workers: int,
+    max_in_flight: int | None = None,
+) -> Iterator[Any]:
+    executor = get_worker_pool(workers)
+    limit = max(1, max_in_flight or workers)
+    pending: deque[Future] = deque()
+    try:
+        # Only `limit` tasks are submitted ahead of the consumer, so finished results never
+        # pile up in this process faster than they are used.
+        for task in tasks:
+            try:
+                future = executor.submit(fn, *task)
+            except BrokenProcessPool:
+                raise
+            except RuntimeError:
+                # Another request grew the pool; carry on in the replacement.
+                executor = get_worker_pool(workers)
+                future = executor.submit(fn, *task)
+            pending.append(future)
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        _discard_broken(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
@@ -1,11 +1,24 @@
 import os
 from pathlib import Path
-from typing import BinaryIO, Iterable
+from typing import Any, BinaryIO, Iterable
 from uuid import uuid4
 
 from fastapi import HTTPException, UploadFile, status
 
 from app.core.config import get_settings
+from app.services.frame_index import FrameIndex, frame_index_path, save_frame_index
+from app.services.log_io import (
+    COMPRESSION_SUFFIXES,
+    DECOMPRESSION_ERRORS,
+    GZIP,
+    ZSTD,
+    available_compressions,
+    compression_for_name,
+    decompressing_reader,
+    open_log_writer,
+    strip_compression_suffix,
+)
+from app.services.scan import ChunkScanner, save_scan_summary, scan_summary_path
 
 
 def _safe_original_name(filename: str | None) -> str:
@@ -15,11 +28,31 @@ def _safe_original_name(filename: str | None) -> str:
 
 
 def _ensure_jsonl(filename: str) -> None:
-    if not filename.lower().endswith(".jsonl"):
+    compression = compression_for_name(filename)
+    if not strip_compression_suffix(filename).lower().endswith(".jsonl"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only .jsonl uploads are allowed",
+            detail="Only .jsonl, .jsonl.gz or .jsonl.zst uploads are allowed",
         )
+    if compression is not None and compression not in available_compressions():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="zstd uploads are not supported on this server",
+        )
+
+
+def _storage_compression() -> str | None:
+    wanted = get_settings().log_storage_compression.lower()
+    if wanted in available_compressions():
+        return wanted
+    # Without the zstandard package, zstd at rest falls back to gzip rather than failing uploads.
+    return GZIP if wanted == ZSTD else None
+
+
+def _storage_path(uploads_dir: Path) -> tuple[Path, str | None]:
+    compression = _storage_compression()
+    suffix = COMPRESSION_SUFFIXES[compression] if compression else ""
+    return uploads_dir / f"{uuid4()}.jsonl{suffix}", compression
 
 
 def _ensure_data_dir() -> Path:
@@ -30,73 +63,104 @@ def _ensure_data_dir() -> Path:
     return uploads_dir
 
 
-def _write_stream(handle: BinaryIO, target: Path, max_bytes: int) -> int:
+def _write_stream(
+    handle: BinaryIO,
+    target: Path,
+    max_bytes: int,
+    scanner: ChunkScanner,
+    compression: str | None = None,
+) -> int:
+    # The limit applies to the decompressed log, so a small compressed upload cannot expand past it.
     total = 0
     target_tmp = target.with_suffix(".tmp")
-    with target_tmp.open("wb") as out:
-        while True:
-            chunk = handle.read(1024 * 1024)
-            if not chunk:
-                break
-            total += len(chunk)
-            if total > max_bytes:
-                out.close()
-                target_tmp.unlink(missing_ok=True)
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Upload exceeds size limit",
-                )
-            out.write(chunk)
-    os.replace(target_tmp, target)
+    try:
+        with open_log_writer(target_tmp, compression) as out:
+            while True:
+                try:
+                    chunk = handle.read(1024 * 1024)
+                except DECOMPRESSION_ERRORS as exc:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Upload is not valid compressed data",
+                    ) from exc
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Upload exceeds size limit",
+                    )
+                out.write(chunk)
+                scanner.feed(chunk)
+        os.replace(target_tmp, target)
+    finally:
+        # Whatever stopped the write, a partial file is never left behind.
+        target_tmp.unlink(missing_ok=True)
     return total
 
 
-def _write_lines(lines: Iterable[str], target: Path, max_bytes: int) -> int:
+def _write_lines(
+    lines: Iterable[str],
+    target: Path,
+    max_bytes: int,
+    scanner: ChunkScanner,
+    compression: str | None = None,
+) -> int:
     total = 0
     target_tmp = target.with_suffix(".tmp")
-    with target_tmp.open("w", encoding="utf-8") as out:
-        for line in lines:
-            encoded = line.encode("utf-8")
-            total += len(encoded)
-            if total > max_bytes:
-                out.close()
-                target_tmp.unlink(missing_ok=True)
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Generated file exceeds size limit",
-                )
-            out.write(line)
-    os.replace(target_tmp, target)
+    try:
+        with open_log_writer(target_tmp, compression) as out:
+            for line in lines:
+                encoded = line.encode("utf-8")
+                total += len(encoded)
+                if total > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Generated file exceeds size limit",
+                    )
+                out.write(encoded)
+                scanner.feed(encoded)
+        os.replace(target_tmp, target)
+    finally:
+        target_tmp.unlink(missing_ok=True)
     return total
 
 
-def save_upload(upload: UploadFile) -> tuple[str, str, int]:
+def save_upload(upload: UploadFile) -> tuple[str, str, int, dict[str, Any]]:
     settings = get_settings()
     original_name = _safe_original_name(upload.filename)
     _ensure_jsonl(original_name)
 
-    uploads_dir = _ensure_data_dir()
-    storage_name = f"{uuid4()}.jsonl"
-    storage_path = uploads_dir / storage_name
+    storage_path, compression = _storage_path(_ensure_data_dir())
+    index = FrameIndex()
+    scanner = ChunkScanner(index, settings.scan_stats_exact_max_keys)
+    source = decompressing_reader(upload.file, compression_for_name(original_name))
+    size_bytes = _write_stream(source, storage_path, settings.upload_max_bytes, scanner, compression)
+    summary = scanner.finish()
+    save_frame_index(storage_path, index)
+    save_scan_summary(storage_path, summary)
+    return original_name, str(storage_path), size_bytes, summary
 
-    size_bytes = _write_stream(upload.file, storage_path, settings.upload_max_bytes)
-    return original_name, str(storage_path), size_bytes
 
-
-def save_generated(lines: Iterable[str], filename: str | None = None) -> tuple[str, str, int]:
+def save_generated(lines: Iterable[str], filename: str | None = None) -> tuple[str, str, int, dict[str, Any]]:
     settings = get_settings()
     original_name = _safe_original_name(filename or f"generated-{uuid4()}.jsonl")
     _ensure_jsonl(original_name)
 
-    uploads_dir = _ensure_data_dir()
-    storage_name = f"{uuid4()}.jsonl"
-    storage_path = uploads_dir / storage_name
-
-    size_bytes = _write_lines(lines, storage_path, settings.upload_max_bytes)
-    return original_name, str(storage_path), size_bytes
+    storage_path, compression = _storage_path(_ensure_data_dir())
+    index = FrameIndex()
+    scanner = ChunkScanner(index, settings.scan_stats_exact_max_keys)
+    size_bytes = _write_lines(lines, storage_path, settings.upload_max_bytes, scanner, compression)
+    summary = scanner.finish()
+    save_frame_index(storage_path, index)
+    save_scan_summary(storage_path, summary)
+    return original_name, str(storage_path), size_bytes, summary
 
 
 def delete_file(path: str) -> None:
     file_path = Path(path)
     if file_path.exists():
         file_path.unlink()
+    frame_index_path(file_path).unlink(missing_ok=True)
+    scan_summary_path(file_path).unlink(missing_ok=True)
@@ -0,0 +1,101 @@
+import argparse
+import base64
+import gc
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db.models import DeviceCredential  # noqa: E402
+from app.services.decode import iter_decode_rows  # noqa: E402
+from app.services.decode_rows import DecodeRowBatch  # noqa: E402
+from app.services.lorawan_crypto import decrypt_frm_payload  # noqa: E402
+
+
+def _synthetic_log(frames: int, devices: int, unknown_ratio: float, payload_size: int):
+    addrs = [os.urandom(4).hex().upper() for _ in range(devices)]
+    credentials = {
+        devaddr: DeviceCredential(devaddr=devaddr, nwkskey=os.urandom(16).hex(), appskey=os.urandom(16).hex())
+        for devaddr in addrs[: int(devices * (1 - unknown_ratio))]
+    }
+
+    def lines():
+        for index in range(frames):
+            devaddr = addrs[index % devices]
+            devaddr_le = bytes.fromhex(devaddr)[::-1]
+            fcnt = index // devices
+            key = credentials[devaddr].appskey if devaddr in credentials else "00" * 16
+            frm = decrypt_frm_payload(key, devaddr_le, fcnt, os.urandom(payload_size))
+            phy = b"\x40" + devaddr_le + b"\x00" + (fcnt & 0xFFFF).to_bytes(2, "little") + b"\x01" + frm + bytes(4)
+            seconds = index % 86400
+            stamp = f"2025-01-01T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}Z"
+            yield json.dumps({"rxpk": {"time": stamp, "data": base64.b64encode(phy).decode("ascii")}})
+
+    return lines, credentials
+
+
+def _serialized(row) -> dict:
+    return {
+        "status": row.status,
+        "devaddr": row.devaddr,
+        "fcnt": row.fcnt,
+        "fport": row.fport,
+        "time": row.time,
+        "payload_hex": row.payload_hex,
+        "decoded_json": row.decoded_json,
+        "error": row.error,
+        "mic_ok": row.mic_ok,
+    }
+
+
+def _deep_size(root) -> int:
+    seen: set[int] = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def _report(label: str, held, baseline: int | None = None) -> int:
+    size = _deep_size(held)
+    ratio = f"  {baseline / size:5.1f}x smaller" if baseline else ""
+    print(f"{label:<14} {size / 1024 / 1024:9.1f} MiB  {size / len(held):7.1f} B/row{ratio}")
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory held by decode results: rows, dicts and columnar batch")
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--unknown-ratio", type=float, default=0.2)
+    parser.add_argument("--payload-size", type=int, default=16)
+    args = parser.parse_args()
+
+    lines, credentials = _synthetic_log(args.frames, args.devices, args.unknown_ratio, args.payload_size)
+
+    start = time.perf_counter()
+    rows = list(iter_decode_rows(lines(), credentials, None, batch_size=64))
+    print(f"decoded {len(rows):,} frames in {time.perf_counter() - start:.1f} s")
+
+    dicts = _report("dict per row", [_serialized(row) for row in rows])
+    _report("DecodeRow", rows, dicts)
+    start = time.perf_counter()
+    batch = DecodeRowBatch(rows)
+    built = time.perf_counter() - start
+    _report("DecodeRowBatch", batch, dicts)
+    start = time.perf_counter()
+    assert all(view == row for view, row in zip(batch, rows))
+    print(f"batch build {built:.1f} s, full view scan {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
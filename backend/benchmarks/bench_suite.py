@@ -0,0 +1,307 @@
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import zip_longest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db.models import DeviceCredential  # noqa: E402
+from app.services.generate_log import GenerateLogParams, generate_jsonl  # noqa: E402
+from app.services.lorawan_crypto import compute_mic, decrypt_frm_payload  # noqa: E402
+
+_TTN_DECODER = "builtin:ttn_decoder-v6.15.3.js"
+_STAGES = ("scan", "decode_raw", "decode_ttn", "decrypt", "replay", "export_csv", "export_json")
+
+
+def _synthesize(path: Path, frames: int, devices: int, payload_size: int) -> dict[str, tuple[str, str]]:
+    # generate_log supplies the gateway envelope and radio metadata; the PHYPayload is replaced
+    # with a complete, encrypted and signed uplink so decoding exercises every stage.
+    keys = {}
+    streams = []
+    for device in range(devices):
+        devaddr = f"{0x26000000 + device:08X}"
+        keys[devaddr] = (os.urandom(16).hex().upper(), os.urandom(16).hex().upper())
+        params = GenerateLogParams(
+            gateway_eui=f"{0xAA555A0000000000 + device % 8:016X}",
+            devaddr=devaddr,
+            frames=frames // devices + (device < frames % devices),
+            interval_seconds=60,
+            start_time=datetime(2025, 1, 1),
+            frequency_mhz=868.1,
+            datarate="SF7BW125",
+            coding_rate="4/5",
+        )
+        streams.append((devaddr, generate_jsonl(params)))
+
+    with path.open("w", encoding="utf-8") as handle:
+        for lines in zip_longest(*(stream for _, stream in streams)):
+            for (devaddr, _), line in zip(streams, lines):
+                if line is None:
+                    continue
+                record = json.loads(line)
+                nwkskey, appskey = keys[devaddr]
+                devaddr_le = bytes.fromhex(devaddr)[::-1]
+                fcnt = record["rxpk"]["tmst"] // 1000 - 1000
+                frm = decrypt_frm_payload(appskey, devaddr_le, fcnt, os.urandom(payload_size))
+                msg = b"\x40" + devaddr_le + b"\x00" + (fcnt & 0xFFFF).to_bytes(2, "little") + b"\x02" + frm
+                phy = msg + compute_mic(nwkskey, devaddr_le, fcnt, msg)
+                record["rxpk"]["data"] = base64.b64encode(phy).decode("ascii")
+                record["rxpk"]["size"] = len(phy)
+                handle.write(json.dumps(record) + "\n")
+    return keys
+
+
+def _credentials(keys: dict[str, tuple[str, str]]) -> dict[str, DeviceCredential]:
+    return {
+        devaddr: DeviceCredential(devaddr=devaddr, nwkskey=nwkskey, appskey=appskey)
+        for devaddr, (nwkskey, appskey) in keys.items()
+    }
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _decode_rows(path: Path, keys: dict[str, tuple[str, str]], decoder_source: str | None = None):
+    from app.services.decode import DecodeSummary, iter_decode_rows
+    from app.services.decoder_runtime import DecoderPool
+
+    summary = DecodeSummary()
+    with path.open("r", encoding="utf-8") as handle:
+        rows = list(
+            iter_decode_rows(
+                handle,
+                _credentials(keys),
+                decoder_source,
+                decoder_pool=DecoderPool(max_size=1),
+                batch_size=64,
+                summary=summary,
+            )
+        )
+    return rows, summary
+
+
+def _stage_scan(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.services.scan import scan_jsonl_path
+
+    def run():
+        return scan_jsonl_path(path)["record_count"], {}
+
+    return run
+
+
+def _stage_decode_raw(path: Path, keys: dict[str, tuple[str, str]]):
+    def run():
+        rows, summary = _decode_rows(path, keys)
+        return len(rows), {"ok_rows": summary.ok_rows, "error_rows": summary.error_rows}
+
+    return run
+
+
+def _stage_decode_ttn(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.services.decode import _load_decoder_source
+
+    source = _load_decoder_source(_TTN_DECODER)
+
+    def run():
+        rows, summary = _decode_rows(path, keys, source)
+        return len(rows), {
+            "ok_rows": summary.ok_rows,
+            "error_rows": summary.error_rows,
+            "decoder_latency_ms": summary.decoder_latency_ms.as_dict(),
+        }
+
+    return run
+
+
+def _stage_decrypt(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.services.decode import _decode_b64, _decrypt_frm_payload, _parse_phy_payload
+
+    frames = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            devaddr, fcnt, _, frm = _parse_phy_payload(_decode_b64(json.loads(line)["rxpk"]["data"]))
+            frames.append((keys[devaddr][1], bytes.fromhex(devaddr)[::-1], fcnt, frm))
+
+    def run():
+        for frame in frames:
+            _decrypt_frm_payload(*frame)
+        return len(frames), {}
+
+    return run
+
+
+def _stage_replay(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.services.replay import replay_jsonl_lines
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sink.bind(("127.0.0.1", 0))
+    received = [0]
+
+    def drain():
+        # An empty datagram, never produced by a replay, tells the sink to stop.
+        while sink.recv(65535):
+            received[0] += 1
+
+    def run():
+        drainer = threading.Thread(target=drain, daemon=True)
+        drainer.start()
+        with path.open("r", encoding="utf-8") as handle:
+            rows = replay_jsonl_lines(handle, *sink.getsockname())
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as stop:
+            stop.sendto(b"", sink.getsockname())
+        drainer.join()
+        sink.close()
+        return len(rows), {"sent": sum(row.status == "sent" for row in rows), "received": received[0]}
+
+    return run
+
+
+def _stage_export(path: Path, keys: dict[str, tuple[str, str]], export):
+    from app.api.routes import decode as decode_routes
+
+    rows, summary = _decode_rows(path, keys)
+    result = decode_routes._decode_cache.create(rows, summary.as_dict())
+    del rows
+
+    async def consume(response) -> int:
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+
+    def run():
+        size = asyncio.run(consume(export(result.token, _user=None)))
+        return result.row_count, {"bytes": size}
+
+    return run
+
+
+def _stage_export_csv(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.api.routes.decode import export_csv
+
+    return _stage_export(path, keys, export_csv)
+
+
+def _stage_export_json(path: Path, keys: dict[str, tuple[str, str]]):
+    from app.api.routes.decode import export_json
+
+    return _stage_export(path, keys, export_json)
+
+
+def _run_stage(stage: str, path: str, keys: dict[str, tuple[str, str]], data_dir: str) -> dict:
+    # Runs in a fresh interpreter, so peak RSS belongs to this stage alone.
+    os.environ["SMARTPARKS_DATA_DIR"] = data_dir
+    run = globals()[f"_stage_{stage}"](Path(path), keys)
+    rss_before = _peak_rss_bytes()
+    start = time.perf_counter()
+    count, details = run()
+    elapsed = time.perf_counter() - start
+    return {
+        "stage": stage,
+        "items": count,
+        "seconds": elapsed,
+        "items_per_second": count / elapsed if elapsed else None,
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "stage_rss_bytes": _peak_rss_bytes() - rss_before,
+        "details": details,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def _print_result(frames: int, result: dict, previous: dict | None) -> None:
+    change = ""
+    if previous and previous.get("items_per_second") and result["items_per_second"]:
+        change = f"  {result['items_per_second'] / previous['items_per_second'] - 1:+7.1%}"
+    print(
+        f"{frames:>9,} {result['stage']:<12} {result['seconds'] * 1000:10.1f} ms"
+        f" {result['items_per_second']:12,.0f} /s"
+        f" {result['peak_rss_bytes'] / 1024 / 1024:8.1f} MiB peak"
+        f" {result['stage_rss_bytes'] / 1024 / 1024:+8.1f} MiB{change}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput and memory of the scan, decode, replay and export paths")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated frame counts")
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--payload-size", type=int, default=16)
+    parser.add_argument("--stages", default=",".join(_STAGES))
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to report throughput changes against")
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(stages) - set(_STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    previous = {}
+    if args.compare:
+        for entry in json.loads(args.compare.read_text(encoding="utf-8"))["results"]:
+            previous[(entry["frames"], entry["stage"])] = entry
+
+    started = datetime.now(timezone.utc)
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="lp0-bench-") as workdir:
+        for frames in [int(size) for size in args.sizes.split(",") if size]:
+            path = Path(workdir) / f"log-{frames}.jsonl"
+            start = time.perf_counter()
+            keys = _synthesize(path, frames, min(args.devices, frames), args.payload_size)
+            size_mib = path.stat().st_size / 1024 / 1024
+            print(f"{frames:>9,} synthesized {size_mib:.1f} MiB in {time.perf_counter() - start:.1f} s")
+            for stage in stages:
+                with spawn.Pool(1) as pool:
+                    result = pool.apply(_run_stage, (stage, str(path), keys, workdir))
+                result["frames"] = frames
+                results.append(result)
+                _print_result(frames, result, previous.get((frames, stage)))
+            path.unlink()
+
+    output = args.output or Path(__file__).resolve().parent / "results" / f"{started:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "started_at": started.isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "devices": args.devices,
+        "payload_size": args.payload_size,
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
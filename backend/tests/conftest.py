@@ -0,0 +1,28 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+
+
+# Route modules build their caches and stores from the settings at import time, so the
+# app is imported once, against a throwaway data directory, for every API test.
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    patch = pytest.MonkeyPatch()
+    patch.setenv("SMARTPARKS_DATA_DIR", str(tmp_path_factory.mktemp("data")))
+    patch.setenv("SMARTPARKS_ADMIN_EMAIL", "admin@example.org")
+    patch.setenv("SMARTPARKS_ADMIN_PASSWORD", "admin-password")
+    get_settings.cache_clear()
+    main = importlib.import_module("app.main")
+    with TestClient(main.app) as test_client:
+        yield test_client
+    patch.undo()
+    get_settings.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/api/v1/auth/login", json={"email": "admin@example.org", "password": "admin-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.services.cache_backend import SQLiteCacheBackend
+from app.services.decode import DecodeRow
+from app.services.decode_cache import DecodeCache
+from app.services.decode_store import DecodeStore
+from app.services.scan_context import ScanContextCache
+
+
+def _row(index: int) -> DecodeRow:
+    return DecodeRow(
+        status="ok",
+        devaddr="26011BDA",
+        fcnt=index,
+        fport=1,
+        time=None,
+        payload_hex="01",
+        decoded_json={"n": index},
+        error=None,
+    )
+
+
+def _caches(directory: str) -> tuple[ScanContextCache, DecodeCache]:
+    database = Path(directory) / "cache.db"
+    scan_cache = ScanContextCache(backend=SQLiteCacheBackend(database, "scan"))
+    decode_cache = DecodeCache(
+        storage_dir=Path(directory) / "results",
+        backend=SQLiteCacheBackend(database, "decode", max_bytes=1024 * 1024),
+    )
+    return scan_cache, decode_cache
+
+
+def _issue(directory: str) -> tuple[str, str]:
+    scan_cache, decode_cache = _caches(directory)
+    context = scan_cache.create("log-1", {"record_count": 3})
+    result = decode_cache.create([_row(index) for index in range(50)], {"total_rows": 50})
+    return context.token, result.token
+
+
+def _redeem(directory: str, scan_token: str, decode_token: str) -> tuple[str, dict, list[DecodeRow]]:
+    scan_cache, decode_cache = _caches(directory)
+    context = scan_cache.get(scan_token)
+    result = decode_cache.get(decode_token)
+    return context.log_file_id, context.summary, list(result.iter_rows(start=48))
+
+
+def _attach_backdated(directory: str) -> str:
+    _, decode_cache = _caches(directory)
+    store = DecodeStore(Path(directory) / "store")
+    store.put("key", decode_cache.create([_row(index) for index in range(50)], {"total_rows": 50}))
+    stored = store.get("key")
+    backdated = time.time() - 24 * 3600
+    for path in (stored.rows_path, stored.index_path):
+        os.utime(path, (backdated, backdated))
+    return decode_cache.attach(stored.rows_path, stored.row_count, stored.size_bytes, stored.index_path).token
+
+
+def _decode_then_redeem(directory: str, decode_token: str) -> tuple[list[DecodeRow], list[DecodeRow]]:
+    _, decode_cache = _caches(directory)
+    decode_cache.create([_row(0)])
+    result = decode_cache.get(decode_token)
+    return list(result.iter_rows(start=48)), result.page(offset=48)[0]
+
+
+def test_tokens_issued_by_one_worker_process_resolve_in_another(tmp_path):
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as first:
+        scan_token, decode_token = first.submit(_issue, str(tmp_path)).result()
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as second:
+        log_file_id, summary, rows = second.submit(_redeem, str(tmp_path), scan_token, decode_token).result()
+
+    assert (log_file_id, summary) == ("log-1", {"record_count": 3})
+    assert rows == [_row(48), _row(49)]
+    scan_cache, _ = _caches(str(tmp_path))
+    assert scan_cache.get("unknown") is None
+    assert scan_cache.stats() == {"hits": 0, "misses": 1, "items": 1}
+
+
+def test_attached_token_survives_another_process_starting_its_decode_cache(tmp_path):
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as first:
+        decode_token = first.submit(_attach_backdated, str(tmp_path)).result()
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as second:
+        rows, page = second.submit(_decode_then_redeem, str(tmp_path), decode_token).result()
+
+    assert rows == page == [_row(48), _row(49)]
+
+
+def test_sqlite_backend_expires_evicts_and_sees_other_processes_removals(tmp_path):
+    database = tmp_path / "cache.db"
+    writer = SQLiteCacheBackend(database, "test", max_items=2)
+    reader = SQLiteCacheBackend(database, "test", max_items=2)
+    now = datetime.utcnow()
+
+    assert writer.put("expired", "a", now - timedelta(minutes=2), now - timedelta(minutes=1)) == []
+    assert writer.put("first", "b", now, now + timedelta(minutes=1)) == ["a"]
+    writer.put("second", "c", now + timedelta(seconds=1), now + timedelta(minutes=1))
+    assert writer.put("third", "d", now + timedelta(seconds=2), now + timedelta(minutes=1)) == ["b"]
+    assert [reader.get(token) for token in ("first", "second", "third")] == [None, "c", "d"]
+
+    assert writer.remove("second") == "c"
+    assert reader.get("second") is None
+    assert reader.stats() == {"items": 1, "bytes": 0}
+    assert SQLiteCacheBackend(database, "other").get("third") is None
@@ -1,8 +1,11 @@
 import base64
 import json
 
+from app.core.metrics import StageTimings
 from app.db.models import DeviceCredential
-from app.services.decode import _decrypt_frm_payload, decode_jsonl_lines
+from app.services.decode import DecoderRoutes, DecodeSummary, _decrypt_frm_payload, decode_jsonl_lines
+from app.services.decoder_runtime import DecoderMemo, DecoderPool
+from app.services.lorawan_crypto import compute_mic
 
 
 def _build_phy_payload(devaddr_hex: str, fcnt: int, fport: int, payload: bytes, appskey: str) -> bytes:
@@ -47,3 +50,209 @@ def test_decode_jsonl_lines_decrypts_and_runs_decoder():
     assert row.devaddr == devaddr
     assert row.payload_hex == plaintext.hex().upper()
     assert row.decoded_json == {"data": {"sum": 10}}
+
+
+def test_decode_jsonl_lines_in_batches_matches_one_frame_at_a_time():
+    devaddr = "26011BDA"
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credential = DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey)
+    lines = ["not json"]
+    for fcnt in range(7):
+        phy_payload = _build_phy_payload(devaddr, fcnt, 1, bytes([fcnt, 1, 2]), appskey)
+        payload_b64 = base64.b64encode(phy_payload).decode("ascii")
+        lines.append(json.dumps({"rxpk": {"time": f"2025-01-01T00:00:0{fcnt}Z", "data": payload_b64}}))
+    decoder_source = """
+    function Decoder(bytes, port) {
+      if (bytes[0] === 3) { throw new Error("bad frame"); }
+      return { first: bytes[0], port: port };
+    }
+    """
+
+    per_frame = decode_jsonl_lines(lines, {devaddr: credential}, decoder_source, None, batch_size=1)
+    summary = DecodeSummary()
+    batched = decode_jsonl_lines(lines, {devaddr: credential}, decoder_source, None, batch_size=4, summary=summary)
+
+    assert batched == per_frame
+    assert summary.decoder_calls == 7
+    assert [row.status for row in batched].count("error") == 2
+    assert batched[4].error.startswith("Decoder error: Error: bad frame")
+    assert batched[5].decoded_json == {"first": 4, "port": 1}
+
+
+def test_decode_jsonl_lines_memoizes_repeated_payloads():
+    devaddr = "26011BDA"
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credential = DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey)
+    lines = []
+    for fcnt in range(6):
+        # Same plaintext every frame; the decrypted bytes repeat even though the ciphertext does not.
+        phy_payload = _build_phy_payload(devaddr, fcnt, 1, bytes([9, 9]), appskey)
+        payload_b64 = base64.b64encode(phy_payload).decode("ascii")
+        lines.append(json.dumps({"rxpk": {"data": payload_b64}}))
+    decoder_source = "function Decoder(bytes, port) { return { value: bytes[0] }; }"
+    memo = DecoderMemo(max_items=8)
+    summary = DecodeSummary()
+
+    rows = decode_jsonl_lines(
+        lines,
+        {devaddr: credential},
+        decoder_source,
+        None,
+        batch_size=4,
+        decoder_memo=memo,
+        summary=summary,
+    )
+
+    assert [row.decoded_json for row in rows] == [{"value": 9}] * 6
+    assert summary.decoder_calls == 1
+    assert summary.memo_hits == 5
+    assert memo.stats()["size"] == 1
+
+
+def test_decode_jsonl_lines_verifies_mic_when_requested():
+    devaddr = "26011BDA"
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    nwkskey = "F0E0D0C0B0A090807060504030201000"
+    credential = DeviceCredential(devaddr=devaddr, nwkskey=nwkskey, appskey=appskey)
+    devaddr_le = bytes.fromhex(devaddr)[::-1]
+    lines = []
+    for fcnt in range(3):
+        msg = _build_phy_payload(devaddr, fcnt, 1, bytes([fcnt]), appskey)[:-4]
+        mic = compute_mic(nwkskey, devaddr_le, fcnt, msg)
+        if fcnt == 1:
+            mic = bytes(4)
+        payload_b64 = base64.b64encode(msg + mic).decode("ascii")
+        lines.append(json.dumps({"rxpk": {"data": payload_b64}}))
+    summary = DecodeSummary()
+
+    unchecked = decode_jsonl_lines(lines, {devaddr: credential}, None, None)
+    checked = decode_jsonl_lines(lines, {devaddr: credential}, None, None, batch_size=2, summary=summary, verify_mic=True)
+
+    assert [row.mic_ok for row in unchecked] == [None, None, None]
+    assert [row.mic_ok for row in checked] == [True, False, True]
+    assert [row.payload_hex for row in checked] == [row.payload_hex for row in unchecked]
+    assert (summary.mic_ok, summary.mic_failed) == (2, 1)
+
+
+def test_decode_jsonl_lines_cuts_off_decoder_after_repeated_limit_trips():
+    devaddr = "26011BDA"
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credential = DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey)
+    lines = []
+    for fcnt in range(5):
+        phy_payload = _build_phy_payload(devaddr, fcnt, 1, bytes([fcnt % 2]), appskey)
+        lines.append(json.dumps({"rxpk": {"data": base64.b64encode(phy_payload).decode("ascii")}}))
+    decoder_source = "function Decoder(bytes, port) { if (bytes[0] === 1) { for (;;) {} } return { ok: true }; }"
+    summary = DecodeSummary()
+
+    rows = decode_jsonl_lines(
+        lines,
+        {devaddr: credential},
+        decoder_source,
+        None,
+        decoder_pool=DecoderPool(max_size=1, time_limit_ms=20),
+        batch_size=2,
+        summary=summary,
+        max_limit_trips=2,
+    )
+
+    assert [row.status for row in rows] == ["ok", "limit_exceeded", "ok", "limit_exceeded", "error"]
+    assert rows[4].error == "Decoder error: disabled after 2 limit violations"
+    assert (summary.ok_rows, summary.limit_rows, summary.error_rows) == (2, 2, 1)
+    assert summary.decoder_cutoffs == 1
+    latency = summary.as_dict()["decoder_latency_ms"]
+    assert latency["p50"] <= latency["p95"] <= latency["max"]
+    assert latency["max"] >= 20
+
+
+def test_decode_jsonl_lines_redecodes_only_changed_devices():
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    devaddrs = ["26011BDA", "26011BDB", "26011BDC"]
+    lines = ["not json"]
+    for fcnt in range(6):
+        devaddr = devaddrs[fcnt % 3]
+        phy_payload = _build_phy_payload(devaddr, fcnt, 1, bytes([fcnt]), appskey)
+        lines.append(json.dumps({"rxpk": {"data": base64.b64encode(phy_payload).decode("ascii")}}))
+    decoder_source = "function Decoder(bytes, port) { return { value: bytes[0] }; }"
+    before = {devaddrs[0]: DeviceCredential(devaddr=devaddrs[0], nwkskey=appskey, appskey=appskey)}
+    after = dict(before)
+    after[devaddrs[1]] = DeviceCredential(devaddr=devaddrs[1], nwkskey=appskey, appskey=appskey)
+
+    previous = decode_jsonl_lines(lines, before, decoder_source, None)
+    summary = DecodeSummary()
+    incremental = decode_jsonl_lines(
+        lines,
+        after,
+        decoder_source,
+        None,
+        batch_size=4,
+        summary=summary,
+        previous_rows=iter(previous),
+        changed_devaddrs={devaddrs[1]},
+    )
+
+    assert incremental == decode_jsonl_lines(lines, after, decoder_source, None)
+    assert [row.error for row in previous].count("Missing device credentials") == 4
+    assert [row.error for row in incremental].count("Missing device credentials") == 2
+    assert summary.decoder_calls == 2
+    assert incremental[1] is previous[1]
+
+
+def test_decode_jsonl_lines_routes_frames_to_per_device_and_port_decoders():
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    tracker, sensor, other = "26011BDA", "26011BDB", "26011BDC"
+    credentials = {
+        devaddr: DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey)
+        for devaddr in (tracker, sensor, other)
+    }
+    frames = [(tracker, 1), (sensor, 1), (other, 2), (other, 1), (tracker, 2), (sensor, 3)]
+    lines = []
+    for fcnt, (devaddr, fport) in enumerate(frames):
+        phy_payload = _build_phy_payload(devaddr, fcnt, fport, bytes([fcnt]), appskey)
+        lines.append(json.dumps({"rxpk": {"data": base64.b64encode(phy_payload).decode("ascii")}}))
+    default = "function Decoder(bytes, port) { return { kind: 'default', value: bytes[0] }; }"
+    gps = "function Decoder(bytes, port) { return { kind: 'gps', value: bytes[0] }; }"
+    status = "function Decoder(bytes, port) { return { kind: 'status', value: bytes[0] }; }"
+    routes = DecoderRoutes(by_devaddr={tracker: gps, sensor: None}, by_fport={2: status})
+    pool = DecoderPool(max_size=4)
+    summary = DecodeSummary()
+
+    rows = decode_jsonl_lines(
+        lines, credentials, default, None, decoder_pool=pool, batch_size=4, summary=summary, decoder_routes=routes
+    )
+
+    assert [row.decoded_json for row in rows] == [
+        {"kind": "gps", "value": 0},
+        None,
+        {"kind": "status", "value": 2},
+        {"kind": "default", "value": 3},
+        {"kind": "gps", "value": 4},
+        None,
+    ]
+    assert all(row.status == "ok" for row in rows)
+    assert summary.decoder_calls == 4
+    assert pool.size() == 3
+
+
+def test_decode_jsonl_lines_records_stage_timings():
+    devaddr = "26011BDA"
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credential = DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey)
+    lines = ["not json"]
+    for fcnt in range(5):
+        phy_payload = _build_phy_payload(devaddr, fcnt, 1, bytes([fcnt]), appskey)
+        lines.append(json.dumps({"rxpk": {"data": base64.b64encode(phy_payload).decode("ascii")}}))
+    timings = StageTimings()
+
+    decode_jsonl_lines(
+        lines,
+        {devaddr: credential},
+        "function Decoder(bytes, port) { return { first: bytes[0] }; }",
+        None,
+        batch_size=2,
+        verify_mic=True,
+        timings=timings,
+    )
+
+    assert timings.counts == {"json": 6, "base64": 5, "aes": 5, "decoder": 5, "mic": 5, "rows": 5}
+    assert all(seconds >= 0 for seconds in timings.seconds.values())
@@ -0,0 +1,112 @@
+import json
+import pickle
+from datetime import datetime, timezone
+
+from app.services.cache_backend import SQLiteCacheBackend
+from app.services.decode import DecodeRow, decode_jsonl_lines
+from app.services.decode_cache import DecodeCache
+
+
+def _row(index: int) -> DecodeRow:
+    return DecodeRow(
+        status="ok",
+        devaddr="26011BDA",
+        fcnt=index,
+        fport=1,
+        time=None,
+        payload_hex="01",
+        decoded_json={"n": index},
+        error=None,
+    )
+
+
+def test_decode_cache_reads_rows_back_from_disk(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path)
+    rows = [_row(index) for index in range(600)]
+
+    result = cache.create(rows, {"total_rows": 600})
+
+    assert result.path.parent == tmp_path
+    assert result.row_count == 600
+    assert list(result.iter_rows()) == rows
+    assert list(result.iter_rows(start=510, limit=3)) == rows[510:513]
+    assert cache.get(result.token).summary == {"total_rows": 600}
+
+
+def test_decode_cache_eviction_deletes_backing_files(tmp_path):
+    cache = DecodeCache(ttl_minutes=0, storage_dir=tmp_path)
+    expired = cache.create([_row(0)])
+
+    assert cache.get(expired.token) is None
+    assert not expired.path.exists()
+
+    capped = DecodeCache(storage_dir=tmp_path, max_disk_bytes=1)
+    first = capped.create([_row(1)])
+    second = capped.create([_row(2)])
+
+    assert capped.get(first.token) is None
+    assert not first.path.exists()
+    assert list(capped.get(second.token).iter_rows()) == [_row(2)]
+
+
+def test_decode_result_keeps_its_index_beside_the_rows(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path, backend=SQLiteCacheBackend(tmp_path / "cache.db", "decode"))
+    rows = [_row(index) for index in range(2000)]
+
+    result = cache.create(rows)
+
+    assert result.index_path.exists() and result.index_path.parent == tmp_path
+    assert len(pickle.dumps(result)) < 1024
+    assert cache.stats()["disk_bytes"] == result.size_bytes + result.index_path.stat().st_size
+    assert cache.get(result.token).page(offset=1998)[0] == rows[1998:]
+
+    cache.get(result.token).index_path.unlink()
+    assert list(cache.get(result.token).iter_rows()) == rows
+
+
+def test_decode_result_pages_with_filters_and_cursor(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path)
+    rows = [
+        DecodeRow(
+            status="ok" if index % 4 else "error",
+            devaddr="26011BDA" if index % 2 else "01020304",
+            fcnt=index,
+            fport=index % 3,
+            time=f"2025-01-01T00:{index // 60:02d}:{index % 60:02d}Z",
+            payload_hex=None,
+            decoded_json=None,
+            error=None,
+        )
+        for index in range(300)
+    ]
+    result = cache.create(rows)
+
+    page, cursor = result.page(limit=5, devaddr="26011BDA", fport=1)
+    assert [row.fcnt for row in page] == [1, 7, 13, 19, 25]
+    assert cursor == 31
+
+    page, cursor = result.page(start=cursor, limit=5, devaddr="26011BDA", fport=1)
+    assert [row.fcnt for row in page] == [31, 37, 43, 49, 55]
+
+    page, cursor = result.page(offset=2, limit=2, status="error")
+    assert [row.fcnt for row in page] == [8, 12]
+
+    start = datetime(2025, 1, 1, 0, 4, 58, tzinfo=timezone.utc).timestamp()
+    end = datetime(2025, 1, 1, 0, 5, 0, tzinfo=timezone.utc).timestamp()
+    page, cursor = result.page(time_from=start, time_to=end)
+    assert [row.fcnt for row in page] == [298, 299]
+    assert cursor is None
+
+
+def test_decode_cache_accepts_rows_with_non_string_times(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path)
+    times = [12345, 1.5, True, {"at": 1}, "2025-01-01T00:00:00Z"]
+    lines = [json.dumps({"rxpk": {"time": value, "data": "QNobASYAAQAB"}}) for value in times]
+
+    rows = decode_jsonl_lines(lines, {}, None, None)
+    result = cache.create(rows)
+
+    assert [row.time for row in result.iter_rows()] == ["12345", "1.5", None, None, "2025-01-01T00:00:00Z"]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    page, _ = result.page(time_from=start)
+    assert [row.time for row in page] == ["2025-01-01T00:00:00Z"]
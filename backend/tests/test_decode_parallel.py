@@ -0,0 +1,101 @@
+import base64
+import json
+
+from app.db.models import DeviceCredential
+from app.services.decode import _decrypt_frm_payload, decode_jsonl_lines
+from app.services.decode_parallel import decode_jsonl_path_parallel, split_byte_ranges
+from app.services.worker_pool import get_worker_pool, map_in_order
+
+
+def _line(devaddr_hex: str, fcnt: int, appskey: str) -> str:
+    devaddr_le = bytes.fromhex(devaddr_hex)[::-1]
+    encrypted = _decrypt_frm_payload(appskey, devaddr_le, fcnt, bytes([fcnt & 0xFF, 7]))
+    phy_payload = b"\x40" + devaddr_le + bytes([0x00, fcnt & 0xFF, 0x00, 0x02]) + encrypted + b"\x00" * 4
+    payload_b64 = base64.b64encode(phy_payload).decode("ascii")
+    return json.dumps({"rxpk": {"time": f"t{fcnt}", "data": payload_b64}}) + "\n"
+
+
+def test_split_byte_ranges_aligns_to_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text("".join(f'{{"n": {index}}}\n' for index in range(50)), encoding="utf-8")
+
+    ranges = split_byte_ranges(path, 7)
+    content = path.read_bytes()
+
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(content)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert content[start - 1 : start] == b"\n"
+
+
+def test_decode_jsonl_path_parallel_matches_sequential(tmp_path):
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credentials = {
+        "26011BDA": DeviceCredential(devaddr="26011BDA", nwkskey=appskey, appskey=appskey),
+    }
+    lines = [_line("26011BDA" if index % 3 else "01020304", index, appskey) for index in range(120)]
+    lines.insert(10, "garbage\n")
+    path = tmp_path / "log.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    decoder_source = "function Decoder(bytes, port) { return { first: bytes[0] }; }"
+
+    sequential = decode_jsonl_lines(lines, credentials, decoder_source, None)
+    parallel = decode_jsonl_path_parallel(path, credentials, decoder_source, None, workers=2, batch_size=8)
+
+    assert parallel == sequential
+
+
+def test_decode_jsonl_path_parallel_matches_sequential_with_mixed_line_endings(tmp_path):
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credentials = {
+        "26011BDA": DeviceCredential(devaddr="26011BDA", nwkskey=appskey, appskey=appskey),
+    }
+    endings = ["\n", "\r\n", "\r"]
+    content = "".join(_line("26011BDA", index, appskey)[:-1] + endings[index % 3] for index in range(60))
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(content.encode("utf-8"))
+    decoder_source = "function Decoder(bytes, port) { return { first: bytes[0] }; }"
+
+    with path.open("r", encoding="utf-8") as handle:
+        sequential = decode_jsonl_lines(handle, credentials, decoder_source, None)
+    parallel = decode_jsonl_path_parallel(path, credentials, decoder_source, None, workers=2, batch_size=8)
+
+    assert len(sequential) == 60
+    assert parallel == sequential
+
+
+def test_decode_jsonl_path_parallel_matches_sequential_on_non_string_times(tmp_path):
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    credentials = {
+        "26011BDA": DeviceCredential(devaddr="26011BDA", nwkskey=appskey, appskey=appskey),
+    }
+    times = [12345, 1.5, None, ["t"], "2025-01-01T00:00:00Z"]
+    lines = []
+    for index in range(40):
+        record = json.loads(_line("26011BDA", index, appskey))
+        record["rxpk"]["time"] = times[index % len(times)]
+        lines.append(json.dumps(record) + "\n")
+    path = tmp_path / "log.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    sequential = decode_jsonl_lines(lines, credentials, None, None)
+    parallel = decode_jsonl_path_parallel(path, credentials, None, None, workers=2, batch_size=8)
+
+    assert [row.time for row in sequential[:5]] == ["12345", "1.5", None, None, "2025-01-01T00:00:00Z"]
+    assert parallel == sequential
+
+
+def test_map_in_order_bounds_tasks_in_flight_and_reuses_the_pool():
+    submitted = []
+
+    def tasks():
+        for value in range(10):
+            submitted.append(value)
+            yield (value, 2)
+
+    results = map_in_order(pow, tasks(), workers=2)
+    assert next(results) == 0
+    assert len(submitted) == 2
+    assert list(results) == [value**2 for value in range(1, 10)]
+    assert get_worker_pool(2) is get_worker_pool(1)
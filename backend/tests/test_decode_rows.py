@@ -0,0 +1,29 @@
+import pickle
+
+from app.services.decode import DecodeRow
+from app.services.decode_rows import DecodeRowBatch
+
+
+def test_decode_row_batch_round_trips_rows():
+    rows = [
+        DecodeRow("error", None, None, None, None, None, None, "Invalid JSON"),
+        DecodeRow("error", "26011BDA", 7, 1, "2025-01-01T00:00:00Z", None, None, "Missing device credentials"),
+        DecodeRow("ok", "26011BDA", 8, 0, None, "", None, None, mic_ok=True),
+        DecodeRow("ok", "26011BDA", 2**32 - 1, 223, "2025-01-01T00:00:01Z", "00FF10", {"data": [1, 2.5, "x"]}, None),
+        DecodeRow("limit_exceeded", "01020304", 9, 2, None, "AB", None, "Decoder limit exceeded", mic_ok=False),
+    ]
+
+    batch = DecodeRowBatch(rows)
+
+    assert len(batch) == len(rows)
+    assert list(batch) == rows
+    assert batch[-1] == rows[-1]
+    assert list(pickle.loads(pickle.dumps(batch))) == rows
+
+
+def test_decode_row_batch_interns_repeated_strings():
+    row = DecodeRow("error", "26011BDA", 1, 1, None, None, None, "Missing device credentials")
+    batch = DecodeRowBatch([row] * 1000)
+
+    assert batch._strings == [None, "error", "26011BDA", "Missing device credentials"]
+    assert batch[999] == row
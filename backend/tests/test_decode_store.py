@@ -0,0 +1,147 @@
+import os
+import time
+
+from app.db.models import DeviceCredential
+from app.services import decode_store
+from app.services.cache_backend import SQLiteCacheBackend
+from app.services.decode import DecodeRow
+from app.services.decode_cache import DecodeCache
+from app.services.decode_store import (
+    DecodeStore,
+    changed_devaddrs,
+    credential_fingerprints,
+    decode_base_key,
+    decode_key,
+)
+
+
+def _rows(count: int) -> list[DecodeRow]:
+    return [DecodeRow("ok", "26011BDA", index, 1, None, "01", {"n": index}, None) for index in range(count)]
+
+
+def test_decode_store_survives_restart_and_outlives_tokens(tmp_path):
+    cache = DecodeCache(ttl_minutes=0, storage_dir=tmp_path / "results")
+    result = cache.create(_rows(50), {"total_rows": 50})
+    DecodeStore(tmp_path / "store").put("key", result)
+
+    assert cache.get(result.token) is None
+    assert not result.path.exists()
+
+    stored = DecodeStore(tmp_path / "store").get("key")
+    attached = DecodeCache(storage_dir=tmp_path / "results").attach(
+        stored.rows_path, stored.row_count, stored.size_bytes, stored.index_path, stored.summary
+    )
+    assert attached.summary == {"total_rows": 50}
+    assert list(attached.iter_rows()) == _rows(50)
+    assert attached.page(devaddr="26011BDA", offset=48)[0] == _rows(50)[48:]
+
+
+def test_attached_store_entry_survives_a_fresh_cache_on_the_same_directory(tmp_path):
+    store = DecodeStore(tmp_path / "store")
+    store.put("key", DecodeCache(storage_dir=tmp_path / "scratch").create(_rows(20), {"total_rows": 20}))
+    stored = store.get("key")
+    backdated = time.time() - 24 * 3600
+    for path in (stored.rows_path, stored.index_path):
+        os.utime(path, (backdated, backdated))
+    orphan = tmp_path / "results" / "orphan.rows"
+    orphan.parent.mkdir()
+    orphan.write_bytes(b"[]\n")
+    os.utime(orphan, (backdated, backdated))
+
+    def _cache() -> DecodeCache:
+        backend = SQLiteCacheBackend(tmp_path / "cache.db", "decode")
+        return DecodeCache(storage_dir=tmp_path / "results", backend=backend)
+
+    attached = _cache().attach(stored.rows_path, stored.row_count, stored.size_bytes, stored.index_path, stored.summary)
+    fresh = _cache()
+    fresh.create(_rows(1))
+
+    result = fresh.get(attached.token)
+    assert list(result.iter_rows()) == _rows(20)
+    assert result.page(offset=18)[0] == _rows(20)[18:]
+    assert not orphan.exists()
+
+
+def test_decode_store_writes_each_put_through_its_own_temporary_files(tmp_path, monkeypatch):
+    cache = DecodeCache(storage_dir=tmp_path / "results")
+    first, second = cache.create(_rows(5)), cache.create(_rows(8))
+    store = DecodeStore(tmp_path / "store")
+    temporaries = []
+    original = decode_store._tmp_path
+
+    def _recording_tmp_path(path):
+        temporaries.append(original(path))
+        return temporaries[-1]
+
+    monkeypatch.setattr(decode_store, "_tmp_path", _recording_tmp_path)
+    store.put("key", first)
+    DecodeStore(tmp_path / "store").put("key", second)
+
+    assert len(set(temporaries)) == len(temporaries) == 6
+    assert not list((tmp_path / "store").glob("*.tmp"))
+    assert list(DecodeStore(tmp_path / "store").get("key").open_rows()) == _rows(8)
+
+
+def test_decode_store_evicts_least_recently_used(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path / "results")
+    results = [cache.create(_rows(count)) for count in (10, 20, 30)]
+    probe = DecodeStore(tmp_path / "probe")
+    probe.put("probe", results[1])
+    store = DecodeStore(tmp_path / "store", max_bytes=probe.size_bytes() * 2)
+
+    store.put("a", results[0])
+    store.put("b", results[1])
+    assert store.get("a") is not None
+    store.put("c", results[2])
+
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("c") is not None
+    assert not (tmp_path / "store" / "b.rows").exists()
+
+
+def test_decode_key_changes_with_credentials_and_decoder():
+    credentials = {"26011BDA": DeviceCredential(devaddr="26011BDA", nwkskey="00" * 16, appskey="11" * 16)}
+    base = decode_base_key("file", "decoder", {})
+    key = decode_key(base, credential_fingerprints(credentials))
+
+    rotated = {"26011BDA": DeviceCredential(devaddr="26011BDA", nwkskey="00" * 16, appskey="22" * 16)}
+    assert decode_key(base, credential_fingerprints(rotated)) != key
+    assert decode_key(decode_base_key("file", "other", {}), credential_fingerprints(credentials)) != key
+    assert decode_key(base, credential_fingerprints(credentials, {"01020304"})) != key
+    assert decode_key(base, credential_fingerprints(dict(credentials))) == key
+    assert changed_devaddrs(credential_fingerprints(credentials), credential_fingerprints(rotated)) == {"26011BDA"}
+
+
+def test_decode_store_finds_latest_result_for_base_key(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path / "results")
+    store = DecodeStore(tmp_path / "store")
+    store.put("first", cache.create(_rows(3)), base_key="base", credentials={"26011BDA": "a"})
+    store.put("second", cache.create(_rows(4)), base_key="base", credentials={"26011BDA": "b"})
+
+    latest = DecodeStore(tmp_path / "store").latest("base")
+
+    assert latest.key == "second"
+    assert latest.credentials == {"26011BDA": "b"}
+    assert list(latest.open_rows()) == _rows(4)
+    assert store.latest("other") is None
+
+
+def test_decode_stores_sharing_a_directory_see_each_others_results_and_cap(tmp_path):
+    cache = DecodeCache(storage_dir=tmp_path / "results")
+    results = [cache.create(_rows(count)) for count in (20, 20)]
+    probe = DecodeStore(tmp_path / "probe")
+    probe.put("probe", results[0], base_key="base")
+    first = DecodeStore(tmp_path / "store", max_bytes=probe.size_bytes() + 1)
+    second = DecodeStore(tmp_path / "store", max_bytes=probe.size_bytes() + 1)
+    assert second.get("a") is None
+
+    first.put("a", results[0], base_key="base")
+    assert second.get("a") is not None
+    assert second.latest("base").key == "a"
+
+    second.put("b", results[1], base_key="base")
+    assert first.latest("base").key == "b"
+    assert first.get("a") is None
+    assert first.size_bytes() == second.size_bytes() <= probe.size_bytes() + 1
+    assert not (tmp_path / "store" / "a.rows").exists()
@@ -0,0 +1,100 @@
+import base64
+import json
+
+import pytest
+
+from app.services.decode import _decrypt_frm_payload
+
+APPSKEY = "000102030405060708090A0B0C0D0E0F"
+DEVADDRS = ["26011BDA", "01020304"]
+
+
+def _line(devaddr_hex: str, fcnt: int) -> str:
+    devaddr_le = bytes.fromhex(devaddr_hex)[::-1]
+    encrypted = _decrypt_frm_payload(APPSKEY, devaddr_le, fcnt, bytes([fcnt & 0xFF, 7]))
+    phy_payload = b"\x40" + devaddr_le + bytes([0x00, fcnt & 0xFF, 0x00, 0x02]) + encrypted + b"\x00" * 4
+    payload_b64 = base64.b64encode(phy_payload).decode("ascii")
+    time = f"2025-01-01T00:{fcnt % 60:02d}:00Z"
+    return json.dumps({"gatewayEui": "0102030405060708", "rxpk": {"time": time, "data": payload_b64}})
+
+
+def _upload(client, auth_headers, body: str) -> str:
+    response = client.post(
+        "/api/v1/files/upload",
+        files={"upload": ("field.jsonl", body.encode("utf-8"), "application/json")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest.fixture(scope="module")
+def file_id(client, auth_headers):
+    for devaddr in DEVADDRS:
+        device = {"devaddr": devaddr, "nwkskey": APPSKEY, "appskey": APPSKEY}
+        client.post("/api/v1/devices", json=device, headers=auth_headers)
+    body = "\n".join(_line(DEVADDRS[index % 2], index) for index in range(30)) + "\ngarbage\n"
+    return _upload(client, auth_headers, body)
+
+
+def _stream(client, auth_headers, payload: dict) -> tuple[list[dict], dict]:
+    response = client.post("/api/v1/decode/stream", json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert all(line for line in response.text.splitlines())
+    *rows, trailer = records
+    assert trailer["type"] == "summary"
+    assert all("type" not in row for row in rows)
+    return rows, trailer
+
+
+def test_decode_stream_writes_one_row_per_line_then_a_summary_trailer(client, auth_headers, file_id):
+    rows, trailer = _stream(client, auth_headers, {"file_id": file_id})
+
+    assert len(rows) == 31
+    assert [row["fcnt"] for row in rows[:30]] == list(range(30))
+    assert rows[-1]["status"] != "ok"
+    summary = trailer["summary"]
+    assert summary["total_rows"] == 31
+    assert summary["ok_rows"] == sum(row["status"] == "ok" for row in rows) == 30
+    assert summary["error_rows"] == 1
+
+    page = client.get(f"/api/v1/decode/{trailer['token']}/rows", headers=auth_headers).json()
+    assert page["total_rows"] == 31
+    assert page["rows"] == rows
+
+    # A repeat request is served from the stored result with the same rows and totals.
+    again_rows, again_trailer = _stream(client, auth_headers, {"file_id": file_id})
+    assert again_rows == rows
+    assert again_trailer["summary"]["total_rows"] == 31
+
+
+def test_decode_stream_ends_with_a_trailer_when_nothing_matches(client, auth_headers, file_id):
+    frames_only = _upload(client, auth_headers, "\n".join(_line(DEVADDRS[0], index) for index in range(5)) + "\n")
+
+    rows, trailer = _stream(client, auth_headers, {"file_id": frames_only, "devaddrs": ["DEADBEEF"]})
+
+    assert rows == []
+    assert trailer["summary"]["total_rows"] == 0
+    assert trailer["token"]
+
+
+def test_decode_stream_ends_with_a_trailer_when_the_decoder_throws(client, auth_headers, file_id):
+    source = b"function decodeUplink(input) { throw new Error('bad frame'); }"
+    decoder = client.post(
+        "/api/v1/decoders/upload",
+        files={"upload": ("throws.js", source, "text/javascript")},
+        headers=auth_headers,
+    ).json()
+
+    rows, trailer = _stream(client, auth_headers, {"file_id": file_id, "decoder_id": decoder["id"]})
+
+    assert len(rows) == 31
+    assert all(row["status"] != "ok" for row in rows)
+    assert all("bad frame" in row["error"] for row in rows[:30])
+    summary = trailer["summary"]
+    assert summary["total_rows"] == 31
+    assert summary["ok_rows"] == 0
+    assert summary["error_rows"] == 31
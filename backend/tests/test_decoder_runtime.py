@@ -0,0 +1,199 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+import quickjs
+
+from app.services import decoder_runtime
+from app.services.decoder_runtime import DecoderCall, DecoderContext, DecoderError, DecoderPool, decoder_hash
+
+LEAKY_DECODER = """
+function decodeUplink(input) {
+  const seen = typeof leaked === 'undefined' ? 0 : leaked;
+  leaked = input.bytes.length;
+  return { data: { seen: seen } };
+}
+"""
+
+
+def test_decoder_pool_reuses_context_for_same_source():
+    pool = DecoderPool(max_size=2)
+
+    with pool.acquire(LEAKY_DECODER) as first:
+        pass
+    with pool.acquire(LEAKY_DECODER) as second:
+        pass
+
+    assert first is second
+    assert first.source_hash == decoder_hash(LEAKY_DECODER)
+    assert pool.size() == 1
+
+
+def test_decoder_context_does_not_leak_globals_between_frames():
+    pool = DecoderPool(max_size=1)
+
+    with pool.acquire(LEAKY_DECODER) as context:
+        assert context.decode(b"\x01\x02\x03", 1) == {"data": {"seen": 0}}
+        assert context.decode(b"\x01", 1) == {"data": {"seen": 0}}
+
+
+COUNTER_DECODERS = [
+    """
+    var count = 0;
+    function decodeUplink(input) {
+      count++;
+      return { data: { count: count } };
+    }
+    """,
+    """
+    let count = 0;
+    const history = [];
+    function Decoder(bytes, port) {
+      count += bytes.length;
+      history.push(port);
+      return { count: count, history: history.length };
+    }
+    """,
+]
+
+
+def test_decoder_context_restores_decoder_globals_between_frames():
+    pool = DecoderPool(max_size=2)
+
+    for source in COUNTER_DECODERS:
+        for _ in range(2):
+            with pool.acquire(source) as context:
+                first = context.decode(b"\x01", 1)
+                assert context.decode(b"\x01", 2) == first
+                assert context.decode(b"\x01", 3) == first
+    assert pool.size() == 2
+
+
+def test_decoder_pool_evicts_least_recently_used():
+    pool = DecoderPool(max_size=1)
+    other = "function Decoder(bytes, port) { return { port: port }; }"
+
+    with pool.acquire(LEAKY_DECODER) as first:
+        pass
+    with pool.acquire(other):
+        pass
+    with pool.acquire(LEAKY_DECODER) as again:
+        pass
+
+    assert pool.size() == 1
+    assert again is not first
+
+
+def test_decoder_context_enforces_time_and_memory_limits():
+    source = """
+    function Decoder(bytes, port) {
+      if (port === 2) { for (;;) {} }
+      if (port === 3) { const chunks = []; for (;;) { chunks.push(new Array(4096).fill(port)); } }
+      return { port: port };
+    }
+    """
+    context = DecoderContext(source, time_limit_ms=50, memory_limit_bytes=2 * 1024 * 1024)
+
+    looping, hungry, fine = [context.call(b"\x00", port) for port in (2, 3, 1)]
+
+    assert looping.limit_exceeded and "time limit" in looping.error
+    assert hungry.limit_exceeded and "memory limit" in hungry.error
+    assert fine == DecoderCall({"port": 1}, None, False, fine.elapsed_ms)
+
+
+def test_decoder_pool_compile_rejects_broken_decoders_and_warms_valid_ones():
+    pool = DecoderPool(max_size=4, time_limit_ms=100)
+
+    with pytest.raises(DecoderError, match="SyntaxError"):
+        pool.compile("function decodeUplink(input) { return { data: ")
+    with pytest.raises(DecoderError, match="decodeUplink"):
+        pool.compile("const helper = 1;")
+    with pytest.raises(DecoderError, match="interrupted"):
+        pool.compile("for (;;) {} function Decoder(bytes, port) { return {}; }")
+
+    source_hash = pool.compile(LEAKY_DECODER)
+    assert source_hash == decoder_hash(LEAKY_DECODER)
+    assert pool.size() == 1
+
+
+def test_decoder_pool_bounds_loading_without_a_call_limit(monkeypatch):
+    monkeypatch.setattr(decoder_runtime, "_LOAD_TIME_LIMIT_MS", 50)
+    pool = DecoderPool(max_size=1, time_limit_ms=None)
+
+    for source in ("while (true) {}", "let spins = 0;\nwhile (true) { spins++; }\nfunction Decoder() {}"):
+        with pytest.raises(DecoderError, match="interrupted"):
+            pool.compile(source)
+
+    # Once loaded, calls stay unlimited as configured.
+    slow = "function Decoder(bytes) { const end = Date.now() + 120; while (Date.now() < end) {} return 1; }"
+    pool.compile(slow)
+    with pool.acquire(slow) as context:
+        assert context.call(b"\x01", 1).value == 1
+
+
+def test_builtin_decoders_compile():
+    pool = DecoderPool(max_size=4)
+    for path in sorted((Path(__file__).resolve().parents[2] / "decoders").glob("*.js")):
+        assert pool.compile(path.read_text(encoding="utf-8")) == decoder_hash(path.read_text(encoding="utf-8"))
+
+
+def _reference_decode(source: str, payload: bytes, fport: int) -> Any:
+    # The JSON-splicing wrapper the runtime bridge replaced.
+    context = quickjs.Context()
+    context.eval(source)
+    input_json = json.dumps({"bytes": list(payload), "fPort": fport})
+    result = context.eval(
+        "(function() {"
+        f"const input = {input_json};"
+        "if (typeof decodeUplink === 'function') {"
+        "  return JSON.stringify(decodeUplink({bytes: input.bytes, fPort: input.fPort}));"
+        "}"
+        "if (typeof Decoder === 'function') {"
+        "  return JSON.stringify(Decoder(input.bytes, input.fPort));"
+        "}"
+        "return JSON.stringify(null);"
+        "})()"
+    )
+    return json.loads(result) if result else None
+
+
+BRIDGE_DECODERS = [
+    """
+    function decodeUplink(input) {
+      const view = input.bytes.slice(1).map((value) => value ^ 0xFF);
+      return { data: { port: input.fPort, first: input.bytes[0], view: view, hex: input.bytes.join(':') } };
+    }
+    """,
+    """
+    function Decoder(bytes, port) {
+      if (!bytes.length) { return undefined; }
+      return { port: port, isArray: Array.isArray(bytes), value: (bytes[0] << 8) | bytes[bytes.length - 1] };
+    }
+    """,
+]
+
+
+def test_decoder_bridge_matches_json_wrapper():
+    payloads = [b"", b"\x00", b"\x00\xff\x80\x7f", bytes(range(256)), b"\x01\x00\x00\x02"]
+    for source in BRIDGE_DECODERS:
+        context = DecoderContext(source)
+        for payload in payloads:
+            for fport in (0, 1, 223):
+                assert context.decode(payload, fport) == _reference_decode(source, payload, fport)
+
+
+def test_decoder_bridge_matches_json_wrapper_for_builtin_decoders():
+    for path in sorted((Path(__file__).resolve().parents[2] / "decoders").glob("*.js")):
+        source = path.read_text(encoding="utf-8")
+        context = DecoderContext(source)
+        for fport in (1, 2, 3, 4, 5, 12, 15, 30):
+            for payload in (bytes(12), bytes(range(1, 40)), bytes([0xFF] * 24)):
+                call = context.call(payload, fport)
+                try:
+                    expected = _reference_decode(source, payload, fport)
+                except quickjs.JSException:
+                    assert call.error is not None
+                    continue
+                assert call.error is None
+                assert call.value == expected
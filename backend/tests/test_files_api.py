@@ -0,0 +1,40 @@
+import gzip
+import json
+from urllib.parse import unquote
+
+import pytest
+
+from app.core.config import get_settings
+
+
+def _content() -> bytes:
+    rxpk = {"time": "2025-01-01T00:00:00Z", "data": "QNobASYAAQAB"}
+    return (json.dumps({"gatewayEui": "0102030405060708", "rxpk": rxpk}) + "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_download_names_the_file_for_every_client(client, auth_headers, monkeypatch, compression):
+    monkeypatch.setenv("SMARTPARKS_LOG_STORAGE_COMPRESSION", compression)
+    get_settings.cache_clear()
+    try:
+        uploads = []
+        for name in ("field-log 1.jsonl", "Mätning Süd 2.jsonl"):
+            response = client.post(
+                "/api/v1/files/upload",
+                files={"upload": (f"{name}.gz", gzip.compress(_content()), "application/gzip")},
+                headers=auth_headers,
+            )
+            uploads.append(response.json()["id"])
+    finally:
+        monkeypatch.undo()
+        get_settings.cache_clear()
+
+    plain = client.get(f"/api/v1/files/{uploads[0]}/download", headers=auth_headers)
+    assert plain.content == _content()
+    assert plain.headers["content-disposition"] == 'attachment; filename="field-log 1.jsonl"'
+
+    accented = client.get(f"/api/v1/files/{uploads[1]}/download", headers=auth_headers)
+    assert accented.content == _content()
+    disposition = accented.headers["content-disposition"]
+    assert disposition.startswith('attachment; filename="M_tning S_d 2.jsonl"; ')
+    assert unquote(disposition.split("filename*=UTF-8''", 1)[1]) == "Mätning Süd 2.jsonl"
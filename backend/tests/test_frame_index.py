@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+from app.db.models import DeviceCredential
+from app.services.decode import _decrypt_frm_payload, decode_jsonl_lines
+from app.services.frame_index import FrameIndex, load_frame_index, save_frame_index
+from app.services.scan import ChunkScanner, scan_jsonl_path
+
+
+def _line(devaddr_hex: str, fcnt: int, appskey: str, gateway: str = "0102030405060708") -> str:
+    devaddr_le = bytes.fromhex(devaddr_hex)[::-1]
+    encrypted = _decrypt_frm_payload(appskey, devaddr_le, fcnt, bytes([fcnt & 0xFF, 7]))
+    phy_payload = b"\x40" + devaddr_le + bytes([0x00, fcnt & 0xFF, 0x00, 0x02]) + encrypted + b"\x00" * 4
+    payload_b64 = base64.b64encode(phy_payload).decode("ascii")
+    time = f"2025-01-01T{fcnt // 60:02d}:{fcnt % 60:02d}:00Z"
+    return json.dumps({"gatewayEui": gateway, "rxpk": {"time": time, "data": payload_b64}})
+
+
+def test_frame_index_selection_matches_filtered_full_decode(tmp_path):
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    devaddrs = ["26011BDA", "01020304", "26000001"]
+    credentials = {
+        devaddr: DeviceCredential(devaddr=devaddr, nwkskey=appskey, appskey=appskey) for devaddr in devaddrs
+    }
+    lines = [_line(devaddrs[index % 3], index, appskey) for index in range(90)]
+    lines.insert(5, "garbage")
+    lines.insert(9, json.dumps({"rxpk": {"data": base64.b64encode(b"\x40\x01\x02\x03\x04\x00").decode()}}))
+    lines.insert(12, "")
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(("\n".join(lines[:40]) + "\r\n" + "\n".join(lines[40:])).encode("utf-8"))
+
+    index = FrameIndex()
+    scan_jsonl_path(path, index=index)
+    save_frame_index(path, index)
+    loaded = load_frame_index(path)
+    assert loaded is not None and len(loaded) == len(index) == 92
+
+    allowed = {"01020304"}
+    numbers = loaded.select(devaddrs=allowed, include_unaddressed=True)
+    with path.open("r", encoding="utf-8") as handle:
+        expected = decode_jsonl_lines(handle, credentials, None, allowed)
+    assert decode_jsonl_lines(loaded.read_lines(path, numbers), credentials, None, allowed) == expected
+    assert len(numbers) == 32
+    assert sum(row.status == "error" for row in expected) == 2
+
+    start = datetime(2025, 1, 1, 0, 30, tzinfo=timezone.utc).timestamp()
+    end = datetime(2025, 1, 1, 1, 15, tzinfo=timezone.utc).timestamp()
+    window = loaded.select(devaddrs=["26011BDA"], gateways=["0102030405060708"], time_from=start, time_to=end)
+    fcnts = [json.loads(line)["rxpk"]["time"] for line in loaded.read_lines(path, window)]
+    assert fcnts == [f"2025-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z" for minute in range(30, 76, 3)]
+
+    path.write_bytes(path.read_bytes() + b"\n")
+    assert load_frame_index(path) is None
+
+
+def test_chunk_scanner_builds_the_same_index_as_a_file_scan(tmp_path):
+    appskey = "000102030405060708090A0B0C0D0E0F"
+    content = "\n".join(_line("26011BDA", index, appskey, f"{index % 4:016X}") for index in range(40)).encode()
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(content)
+
+    from_file = FrameIndex()
+    scan_jsonl_path(path, index=from_file)
+    from_chunks = FrameIndex()
+    scanner = ChunkScanner(from_chunks)
+    for start in range(0, len(content), 100):
+        scanner.feed(content[start : start + 100])
+    scanner.finish()
+
+    assert list(from_chunks.offsets) == list(from_file.offsets)
+    assert from_chunks.by_gateway.keys() == from_file.by_gateway.keys()
+    assert list(from_chunks.read_lines(path, from_chunks.select(gateways=["0000000000000002"]))) == [
+        line.rstrip("\n") for line in path.read_text().splitlines() if '"0000000000000002"' in line
+    ]
@@ -0,0 +1,77 @@
+import gzip
+import io
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import get_settings
+from app.services.frame_index import load_frame_index
+from app.services.log_io import log_compression, open_log_text
+from app.services.scan import load_scan_summary, scan_jsonl_path
+from app.storage.files import save_upload
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMARTPARKS_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SMARTPARKS_LOG_STORAGE_COMPRESSION", "gzip")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+def _content(count: int) -> bytes:
+    lines = []
+    for index in range(count):
+        rxpk = {"time": f"2025-01-01T00:00:{index % 60:02d}Z", "data": "QNobASYAAQAB"}
+        lines.append(json.dumps({"gatewayEui": f"{index % 2:016X}", "rxpk": rxpk}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_compressed_upload_is_stored_compressed_and_read_as_a_stream(settings, tmp_path):
+    content = _content(200)
+    upload = UploadFile(file=io.BytesIO(gzip.compress(content)), filename="field.jsonl.gz")
+
+    _, storage_path, size_bytes, summary = save_upload(upload)
+
+    stored = Path(storage_path)
+    assert stored.name.endswith(".jsonl.gz") and log_compression(stored) == "gzip"
+    assert size_bytes == len(content)
+    assert gzip.decompress(stored.read_bytes()) == content
+    plain = tmp_path / "plain.jsonl"
+    plain.write_bytes(content)
+    assert summary == scan_jsonl_path(stored) == scan_jsonl_path(plain) == load_scan_summary(stored)
+    with open_log_text(stored) as handle:
+        assert handle.read() == content.decode("utf-8")
+
+    index = load_frame_index(stored)
+    selected = index.select(gateways=["0000000000000001"])
+    assert list(index.read_lines(stored, selected)) == [
+        line for line in content.decode("utf-8").splitlines() if '"0000000000000001"' in line
+    ]
+
+
+def test_upload_limit_applies_to_decompressed_size(settings, monkeypatch):
+    content = _content(2000)
+    monkeypatch.setattr(settings, "upload_max_bytes", len(content) - 1)
+
+    with pytest.raises(HTTPException, match="size limit"):
+        save_upload(UploadFile(file=io.BytesIO(gzip.compress(content)), filename="field.jsonl.gz"))
+    with pytest.raises(HTTPException, match="compressed"):
+        save_upload(UploadFile(file=io.BytesIO(content), filename="field.jsonl.gz"))
+    with pytest.raises(HTTPException, match="uploads are allowed"):
+        save_upload(UploadFile(file=io.BytesIO(content), filename="field.json.gz"))
+
+
+def test_corrupt_compressed_upload_is_rejected_without_leftovers(settings, tmp_path):
+    compressed = gzip.compress(_content(2000))
+    garbled = compressed[:200] + bytes(byte ^ 0x5A for byte in compressed[200:400]) + compressed[400:]
+
+    for body in (garbled, compressed[: len(compressed) // 2]):
+        with pytest.raises(HTTPException) as raised:
+            save_upload(UploadFile(file=io.BytesIO(body), filename="field.jsonl.gz"))
+        assert raised.value.status_code == 400
+
+    assert list((tmp_path / "uploads").iterdir()) == []
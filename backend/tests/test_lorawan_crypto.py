@@ -0,0 +1,93 @@
+import os
+
+from Crypto.Cipher import AES
+from Crypto.Hash import CMAC
+
+from app.services.lorawan_crypto import (
+    UplinkCounters,
+    compute_mic,
+    decrypt_frm_payload,
+    decrypt_frm_payloads,
+    verify_mics,
+)
+
+
+def _per_block_decrypt(skey_hex: str, devaddr_le: bytes, fcnt: int, payload: bytes) -> bytes:
+    cipher = AES.new(bytes.fromhex(skey_hex), AES.MODE_ECB)
+    output = bytearray(len(payload))
+    for block_index in range(1, (len(payload) + 15) // 16 + 1):
+        a = bytearray(16)
+        a[0] = 0x01
+        a[6:10] = devaddr_le
+        a[10:14] = (fcnt & 0xFFFFFFFF).to_bytes(4, "little")
+        a[15] = block_index & 0xFF
+        s = cipher.encrypt(bytes(a))
+        start = (block_index - 1) * 16
+        for idx in range(start, min(block_index * 16, len(payload))):
+            output[idx] = payload[idx] ^ s[idx - start]
+    return bytes(output)
+
+
+def test_decrypt_frm_payload_matches_per_block_reference():
+    skey = "000102030405060708090A0B0C0D0E0F"
+    devaddr_le = bytes.fromhex("26011BDA")[::-1]
+    for length in (0, 1, 15, 16, 17, 51, 242):
+        payload = os.urandom(length)
+        for fcnt in (0, 1, 0xFFFF, 0x1234567):
+            expected = _per_block_decrypt(skey, devaddr_le, fcnt, payload)
+            assert decrypt_frm_payload(skey, devaddr_le, fcnt, payload) == expected
+
+
+def test_decrypt_frm_payloads_batches_across_keys():
+    keys = ["000102030405060708090A0B0C0D0E0F", "F0E0D0C0B0A090807060504030201000"]
+    frames = [
+        (keys[index % 2], bytes([index, 0, 1, 0x26]), index, os.urandom(index % 40))
+        for index in range(64)
+    ]
+
+    results = decrypt_frm_payloads(frames)
+
+    assert results == [_per_block_decrypt(*frame) for frame in frames]
+
+
+def _reference_mic(nwkskey_hex: str, devaddr_le: bytes, fcnt: int, msg: bytes) -> bytes:
+    b0 = bytearray(16)
+    b0[0] = 0x49
+    b0[6:10] = devaddr_le
+    b0[10:14] = (fcnt & 0xFFFFFFFF).to_bytes(4, "little")
+    b0[15] = len(msg) & 0xFF
+    mac = CMAC.new(bytes.fromhex(nwkskey_hex), ciphermod=AES)
+    mac.update(bytes(b0) + msg)
+    return mac.digest()[:4]
+
+
+def test_verify_mics_accepts_valid_and_rejects_tampered_frames():
+    nwkskey = "2B7E151628AED2A6ABF7158809CF4F3C"
+    devaddr_le = bytes.fromhex("26011BDA")[::-1]
+    frames = []
+    for fcnt in range(8):
+        msg = b"\x40" + devaddr_le + b"\x00" + fcnt.to_bytes(2, "little") + b"\x01" + os.urandom(10)
+        assert compute_mic(nwkskey, devaddr_le, fcnt, msg) == _reference_mic(nwkskey, devaddr_le, fcnt, msg)
+        phy_payload = msg + _reference_mic(nwkskey, devaddr_le, fcnt, msg)
+        if fcnt % 2:
+            phy_payload = phy_payload[:-1] + bytes((phy_payload[-1] ^ 0xFF,))
+        frames.append((nwkskey, devaddr_le, fcnt, phy_payload))
+    frames.append((nwkskey, devaddr_le, 0, b"\x40\x00"))
+
+    assert verify_mics(frames) == [True, False] * 4 + [False]
+
+
+def test_uplink_counters_rebuild_the_high_bits_across_rollovers():
+    nwkskey = "2B7E151628AED2A6ABF7158809CF4F3C"
+    devaddr_le = bytes.fromhex("26011BDA")[::-1]
+    frames = []
+    for fcnt in (0x2FFFE, 0x2FFFF, 0x30000, 0x2FFFF, 0x30001, 0x30002):
+        msg = b"\x40" + devaddr_le + b"\x00" + (fcnt & 0xFFFF).to_bytes(2, "little") + b"\x01" + os.urandom(10)
+        phy_payload = msg + _reference_mic(nwkskey, devaddr_le, fcnt, msg)
+        if fcnt == 0x30001:
+            phy_payload = phy_payload[:-1] + bytes((phy_payload[-1] ^ 0xFF,))
+        frames.append((nwkskey, devaddr_le, fcnt & 0xFFFF, phy_payload))
+
+    assert verify_mics(frames) == [False] * 6
+    assert verify_mics(frames, UplinkCounters()) == [True, True, True, True, False, True]
+    assert verify_mics(frames, UplinkCounters(max_rollovers=1)) == [False] * 6
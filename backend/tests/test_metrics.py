@@ -0,0 +1,41 @@
+from app.core.metrics import MetricsRegistry, StageTimings
+from app.services.scan_context import ScanContextCache
+
+
+def test_registry_renders_counters_histograms_and_cache_stats():
+    registry = MetricsRegistry()
+    cache = ScanContextCache()
+    context = cache.create("log-1", {})
+    cache.get(context.token)
+    cache.get("missing")
+    registry.register_cache("scan", cache)
+    timings = StageTimings()
+    timings.add("json", 0.002, 10)
+    timings.add("json", 0.001, 5)
+
+    registry.observe_timings("scan", timings)
+    registry.observe("lp0_request_seconds", "Request time.", 0.3, route='/a"b')
+    text = registry.render()
+
+    assert 'lp0_operations_total{operation="scan"} 1' in text
+    assert 'lp0_stage_items_total{operation="scan",stage="json"} 15' in text
+    assert 'lp0_stage_duration_seconds_bucket{operation="scan",stage="json",le="0.005"} 1' in text
+    assert 'lp0_stage_duration_seconds_bucket{operation="scan",stage="json",le="0.001"} 0' in text
+    assert 'lp0_request_seconds_bucket{route="/a\\"b",le="0.25"} 0' in text
+    assert 'lp0_request_seconds_bucket{route="/a\\"b",le="+Inf"} 1' in text
+    assert 'lp0_cache_hits_total{cache="scan"} 1' in text
+    assert 'lp0_cache_misses_total{cache="scan"} 1' in text
+    assert 'lp0_cache_items{cache="scan"} 1' in text
+    assert "# TYPE lp0_cache_items gauge" in text
+
+
+def test_stage_timings_merge_and_report_milliseconds():
+    timings = StageTimings()
+    timings.add("aes", 0.0015, 64)
+    other = StageTimings()
+    other.add("aes", 0.0005, 36)
+    other.add("decoder", 0.25, 100)
+
+    timings.merge(other)
+
+    assert timings.as_dict() == {"aes": {"ms": 2.0, "count": 100}, "decoder": {"ms": 250.0, "count": 100}}
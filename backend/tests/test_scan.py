@@ -1,6 +1,10 @@
+import base64
+import io
+import json
+import random
 from pathlib import Path
 
-from app.services.scan import scan_jsonl_path
+from app.services.scan import ChunkScanner, scan_jsonl_bytes, scan_jsonl_path, scan_jsonl_stream
 
 
 def test_scan_jsonl_path_extracts_gateway_euis_and_devaddrs():
@@ -12,3 +16,66 @@ def test_scan_jsonl_path_extracts_gateway_euis_and_devaddrs():
     assert summary["record_count"] == 3
     assert summary["gateway_euis"] == ["0102030405060708", "AABBCCDDEEFF0011"]
     assert summary["devaddrs"] == ["01020304", "26011BDA"]
+
+    with sample_path.open("r", encoding="utf-8") as handle:
+        assert summary == scan_jsonl_stream(handle)
+
+
+def test_scan_jsonl_bytes_matches_full_parser_on_fuzzed_lines():
+    rng = random.Random(19)
+    templates = []
+    for _ in range(8):
+        record = {
+            "gatewayEui": rng.choice(["0102030405060708", " AABB ", "", 7, None]),
+            "rxpk": {
+                "tmst": rng.randint(0, 10**9),
+                "rssi": -rng.randint(0, 120),
+                "lsnr": rng.choice([7.5, -3, "7", True, 1e400]),
+                "data": base64.b64encode(rng.randbytes(rng.randint(0, 30))).decode("ascii"),
+            },
+        }
+        if rng.random() < 0.5:
+            record["gateway_eui"] = "AABBCCDDEEFF0011"
+        templates.append(json.dumps(record, separators=rng.choice([(",", ":"), (", ", ": ")])))
+
+    for _ in range(300):
+        lines = []
+        for _ in range(20):
+            line = rng.choice(templates)
+            position = rng.randrange(len(line))
+            mutation = rng.random()
+            if mutation < 0.3:
+                line = line[:position] + line[position + 1 :]
+            elif mutation < 0.6:
+                line = line[:position] + rng.choice('{}[]",:0123456789.-eAx=\\\x1c') + line[position:]
+            elif mutation < 0.7:
+                line = line[:position] + rng.choice("0123456789") + line[position + 1 :]
+            lines.append(line)
+        text = "\n".join(lines)
+
+        assert scan_jsonl_bytes(io.BytesIO(text.encode("utf-8"))) == scan_jsonl_stream(io.StringIO(text))
+
+
+def test_chunk_scanner_matches_file_scan_across_chunk_boundaries():
+    lines = [
+        json.dumps(
+            {
+                "gatewayEui": "0102030405060708",
+                "rxpk": {"time": f"2025-01-01T00:{minute:02d}:00Z", "data": "QNobASYA"},
+            }
+        )
+        for minute in (30, 5, 59, 12)
+    ]
+    lines.append('{"gatewayEui": "AABBCCDDEEFF0011", "rxpk": {"time": "not-a-time", "data": "QAQDAgEA"}}')
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+
+    scanner = ChunkScanner()
+    for start in range(0, len(content), 7):
+        scanner.feed(content[start : start + 7])
+    summary = scanner.finish()
+
+    assert summary == scan_jsonl_bytes(io.BytesIO(content))
+    assert summary["record_count"] == 5
+    assert summary["devaddrs"] == ["01020304", "26011BDA"]
+    assert summary["time_from"] == "2025-01-01T00:05:00Z"
+    assert summary["time_to"] == "2025-01-01T00:59:00Z"
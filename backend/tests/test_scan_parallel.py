@@ -0,0 +1,46 @@
+import base64
+import json
+
+from app.services.frame_index import FrameIndex
+from app.services.scan import scan_jsonl_path
+from app.services.scan_parallel import scan_jsonl_path_parallel
+
+
+def _line(devaddr_hex: str, fcnt: int, gateway: str) -> str:
+    phy_payload = b"\x40" + bytes.fromhex(devaddr_hex)[::-1] + bytes([0x00, fcnt & 0xFF, fcnt >> 8]) + b"\x01\x02"
+    rxpk = {
+        "time": f"2025-01-01T{fcnt // 60 % 24:02d}:{fcnt % 60:02d}:00Z",
+        "rssi": -40 - fcnt % 70,
+        "lsnr": fcnt % 11 - 5,
+        "data": base64.b64encode(phy_payload).decode("ascii"),
+    }
+    return json.dumps({"gatewayEui": gateway, "rxpk": rxpk})
+
+
+def test_parallel_scan_matches_sequential_scan(tmp_path):
+    lines = [_line(f"2601{index % 7:04X}", index // 14, f"{index % 3:016X}") for index in range(600)]
+    lines[50] = "garbage"
+    lines[51] = ""
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(("\n".join(lines[:300]) + "\r\n" + "\n".join(lines[300:])).encode("utf-8"))
+
+    sequential_index = FrameIndex()
+    sequential = scan_jsonl_path(path, index=sequential_index)
+    parallel_index = FrameIndex()
+    parallel = scan_jsonl_path_parallel(path, workers=3, index=parallel_index)
+
+    assert parallel == sequential
+    assert sequential["devices"]["26010003"]["duplicates"] > 0
+    assert list(parallel_index.offsets) == list(sequential_index.offsets)
+    assert list(parallel_index.lengths) == list(sequential_index.lengths)
+    assert {key: list(value) for key, value in parallel_index.by_devaddr.items()} == {
+        key: list(value) for key, value in sequential_index.by_devaddr.items()
+    }
+
+    limited = scan_jsonl_path_parallel(path, workers=3, exact_max_keys=4)
+    assert limited["approximate"] is True
+    assert limited["device_count"] == 7 and len(limited["devices"]) == 4
+    tracked_frames = sum(device["frames"] for device in limited["devices"].values())
+    assert tracked_frames + limited["untracked"]["devices"]["frames"] == sum(
+        device["frames"] for device in sequential["devices"].values()
+    )
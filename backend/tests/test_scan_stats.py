@@ -0,0 +1,110 @@
+import base64
+import io
+import json
+
+from app.services.scan import compact_scan_summary, load_scan_summary, save_scan_summary, scan_jsonl_bytes
+from app.services.scan_stats import CountMinSketch, HyperLogLog
+
+
+def _frame(devaddr: str, fcnt: int) -> str:
+    raw = bytes([0x40]) + bytes.fromhex(devaddr)[::-1] + bytes([0x00]) + fcnt.to_bytes(2, "little") + b"\x01\x02"
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _line(devaddr: str, fcnt: int, gateway: str, rssi: float, lsnr: float, minute: int) -> str:
+    rxpk = {"time": f"2025-01-01T00:{minute:02d}:00Z", "rssi": rssi, "lsnr": lsnr, "data": _frame(devaddr, fcnt)}
+    return json.dumps({"gatewayEui": gateway, "rxpk": rxpk})
+
+
+def test_scan_summary_reports_per_device_and_per_gateway_statistics():
+    fcnts = [1, 2, 2, 3, 6, 7, 7, 7]
+    lines = [
+        _line("26011BDA", fcnt, "0102030405060708", -50 - index, 5.0, 10 + index) for index, fcnt in enumerate(fcnts)
+    ]
+    lines += [_line("01020304", 300 + index, "AABBCCDDEEFF0011", -100, -2.5, 59 - index) for index in range(200)]
+    lines.append(json.dumps({"gatewayEui": "AABBCCDDEEFF0011", "rxpk": {"rssi": "strong", "data": "QAE="}}))
+
+    summary = scan_jsonl_bytes(io.BytesIO("\n".join(lines).encode()))
+
+    assert summary["approximate"] is False and summary["untracked"] is None
+    assert summary["devaddrs_truncated"] == summary["gateway_euis_truncated"] == 0
+    assert summary["device_count"] == 2 and summary["gateway_count"] == 2
+    assert summary["devices"]["26011BDA"] == {
+        "frames": 8,
+        "first_seen": "2025-01-01T00:10:00Z",
+        "last_seen": "2025-01-01T00:17:00Z",
+        "fcnt_min": 1,
+        "fcnt_max": 7,
+        "duplicates": 3,
+        "gaps": 2,
+    }
+    busy = summary["devices"]["01020304"]
+    assert (busy["fcnt_min"], busy["fcnt_max"], busy["duplicates"], busy["gaps"]) == (300, 499, 0, 0)
+    assert summary["gateways"]["0102030405060708"] == {
+        "frames": 8,
+        "rssi": {"min": -57, "mean": -53.5, "max": -50},
+        "snr": {"min": 5.0, "mean": 5.0, "max": 5.0},
+    }
+    assert summary["gateways"]["AABBCCDDEEFF0011"]["frames"] == 201
+    assert summary["gateways"]["AABBCCDDEEFF0011"]["rssi"]["mean"] == -100
+
+
+def test_scan_summary_switches_to_sketches_above_the_exact_key_limit():
+    lines = [_line(f"{index:08X}", 1, "0102030405060708", -80, 1.0, 0) for index in range(3000)]
+    lines += [_line("FFFFFFFF", fcnt, "0102030405060708", -80, 1.0, 1) for fcnt in range(50)]
+
+    summary = scan_jsonl_bytes(io.BytesIO("\n".join(lines).encode()), exact_max_keys=100)
+
+    assert summary["approximate"] is True
+    assert len(summary["devices"]) == len(summary["devaddrs"]) == 100
+    assert abs(summary["device_count"] - 3001) < 3001 * 0.05
+    assert summary["devaddrs_truncated"] == summary["device_count"] - 100
+    untracked = summary["untracked"]["devices"]
+    assert untracked["frames"] == 2950
+    assert untracked["heavy_hitters"][0] == {"devaddr": "FFFFFFFF", "frames_estimate": 50}
+    assert summary["untracked"]["gateways"] is None
+
+
+def test_full_summary_is_kept_next_to_the_log_and_rows_get_counts(tmp_path):
+    log_path = tmp_path / "log.jsonl"
+    lines = [_line(f"{index:08X}", 1, "0102030405060708", -80, 1.0, 0) for index in range(50)]
+    log_path.write_text("\n".join(lines))
+    summary = scan_jsonl_bytes(io.BytesIO(log_path.read_bytes()), exact_max_keys=10)
+
+    save_scan_summary(log_path, summary)
+
+    assert load_scan_summary(log_path) == summary
+    assert compact_scan_summary(summary) == {
+        "record_count": 50,
+        "time_from": "2025-01-01T00:00:00Z",
+        "time_to": "2025-01-01T00:00:00Z",
+        "gateway_count": 1,
+        "device_count": summary["device_count"],
+        "approximate": True,
+    }
+    assert compact_scan_summary({"record_count": 2, "gateway_euis": ["A"], "devaddrs": ["B", "C"]}) == {
+        "record_count": 2,
+        "gateway_count": 1,
+        "device_count": 2,
+    }
+    with log_path.open("a") as handle:
+        handle.write("\n")
+    assert load_scan_summary(log_path) is None
+
+
+def test_sketches_estimate_within_bounds_and_merge():
+    first, second = HyperLogLog(), HyperLogLog()
+    for index in range(20000):
+        (first if index % 2 else second).add(f"key-{index}")
+    first.merge(second)
+    assert abs(first.estimate() - 20000) < 20000 * 0.05
+
+    small = HyperLogLog()
+    for index in range(50):
+        small.add(str(index))
+    assert small.estimate() == 50
+
+    sketch = CountMinSketch(width=64)
+    for index in range(1000):
+        sketch.add(f"key-{index % 100}")
+    assert all(sketch.estimate(f"key-{index}") >= 10 for index in range(100))
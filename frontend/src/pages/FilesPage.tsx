@@ -11,6 +11,8 @@ type ScanResponse = {
     record_count: number
     gateway_euis: string[]
     devaddrs: string[]
+    gateway_euis_truncated?: number
+    devaddrs_truncated?: number
   }
 }
 
@@ -65,7 +67,7 @@ function FilesPage() {
       return
     }
     if (!uploadFile) {
-      setFileError('Select a .jsonl file to upload.')
+      setFileError('Select a .jsonl, .jsonl.gz or .jsonl.zst file to upload.')
       return
     }
     setFileLoading(true)
@@ -222,10 +224,10 @@ function FilesPage() {
         <form className="form" onSubmit={handleUpload}>
           <div className="form__grid">
             <label>
-              Upload .jsonl
+              Upload .jsonl (.gz, .zst)
               <input
                 type="file"
-                accept=".jsonl"
+                accept=".jsonl,.gz,.zst"
                 onChange={(event) => setUploadFile(event.target.files?.[0] ?? null)}
               />
             </label>
@@ -333,9 +335,15 @@ function FilesPage() {
                   <p className="result__meta">Records: {scan.summary.record_count}</p>
                   <p className="result__meta">
                     Gateways: {scan.summary.gateway_euis.join(', ') || 'None'}
+                    {scan.summary.gateway_euis_truncated
+                      ? ` (+${scan.summary.gateway_euis_truncated} more, not listed)`
+                      : ''}
                   </p>
                   <p className="result__meta">
                     DevAddrs: {scan.summary.devaddrs.join(', ') || 'None'}
+                    {scan.summary.devaddrs_truncated
+                      ? ` (+${scan.summary.devaddrs_truncated} more, not listed)`
+                      : ''}
                   </p>
                 </div>
               )}